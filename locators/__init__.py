@@ -1,3 +1,4 @@
 from .bookInfoLocators import BookInfoLocators
 from .bookLocator import BooksLocator
+from .bookLocator import PagerLocator
 from .bookPagesInfoLocators import bookPagesInfoLocators
\ No newline at end of file
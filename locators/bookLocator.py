@@ -1,4 +1,4 @@
-"""Css Selectors for finding pages books"""
+"""Css Selectors for finding pages books and the pager"""
 #--------------------------------------------------------------#
 # -- IMPORTS --
 
@@ -10,4 +10,8 @@ from collections import namedtuple
 BOOKSLOCATOR = namedtuple("BooksLocator", ["BOOKS"])
 BooksLocator = BOOKSLOCATOR(BOOKS="section ol.row li.col-xs-6")
 
+# holds the "Page 1 of N" text
+PAGERLOCATOR = namedtuple("PagerLocator", ["CURRENT"])
+PagerLocator = PAGERLOCATOR(CURRENT="ul.pager li.current")
+
 #--------------------------------------------------------------#
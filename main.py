@@ -11,24 +11,90 @@ SCRAPE DATA FROM BOOKS.TOSCRAPE.COM
 #--------------------------------------------------------------#
 # -- IMPORTS --
 
+import os
 import json
+import time
+import queue
+import sqlite3
 import logging
-from pages import get_all_pages_books
+import argparse
+from functools import partial
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+from logging.handlers import RotatingFileHandler
+from queries import BookIndex
+from storage import JsonLinesWriter
+from storage import iter_books
+from storage import SqliteStore
+from storage import shard_file_name
+from storage import find_shard_files
+from storage import merge_shards
+from storage import Frontier
+from metrics import get_metrics
+
+# the scraping stack (pages, parsers, locators and their requests, aiohttp
+# and bs4 imports) and numpy backed snapshot files are imported where they
+# are first used, so querying saved books starts without them
 
 #--------------------------------------------------------------#
 # -- GLOBALS --
 
-# create main singleton logger
-logging.basicConfig(
-    format="%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s",
-    datefmt="%d-%m-%Y %H:%M:%S",
-    level=logging.DEBUG,
-    filename="logs/logs.txt")
+LOG_FILE_NAME = "logs/logs.txt"
+
+# level of the log file, changed with --log-level
+LOG_LEVEL = "INFO"
+
+# size the log file grows to before it is rotated, and how many rotated
+# files are kept next to it
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+LOG_FORMAT = "%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s"
 
 LOGGER = logging.getLogger("scraper")
 
+# legacy file, still read when there is no BOOKS_FILE_NAME
 JSON_FILE_NAME = "data/bookInfo.json"
 
+BOOKS_FILE_NAME = "data/bookInfo.jsonl"
+
+# "async" runs one event loop, "pipeline" fetches on threads
+# and parses on a process per cpu
+ENGINE = "async"
+
+# "json" keeps the latest scrape in BOOKS_FILE_NAME, "sqlite" keeps every
+# scrape in DB_FILE_NAME and runs queries in sqlite, "binary" keeps the
+# latest scrape in SNAPSHOT_FILE_NAME and memory maps it on load
+STORAGE = "json"
+
+DB_FILE_NAME = "data/books.db"
+
+SNAPSHOT_FILE_NAME = "data/bookInfo.bin"
+
+# metrics of the last scrape are written to this path with .prom and
+# .json extensions
+METRICS_FILE_NAME = "data/metrics"
+
+# skip detail pages while scraping, stock is saved as None and fetched for
+# the books a query returns when it is shown, changed with --lazy-stock
+LAZY_STOCK = False
+
+# books of each shard of a sharded crawl, merged into storage once every
+# shard is done
+SHARD_DIR = "data/shards"
+
+# state of the last scrape, every listing and detail url and the books of
+# finished pages, so a scrape that stopped can be resumed with --resume
+FRONTIER_FILE_NAME = "data/frontier.db"
+CHECKPOINT = True
+
+# fingerprint and book links of every listing page of the last scrape, a
+# refresh reuses the books of pages whose fingerprint is the same
+FINGERPRINT_FILE_NAME = "data/fingerprints.json"
+
+# port of the query server started with --serve
+SERVE_PORT = 8765
+
 #--------------------------------------------------------------#
 # -- CUSTOM ERRORS --
 
@@ -41,24 +107,57 @@ class NoBooksFoundError(Exception):
         super(NoBooksFoundError, self).__init__(msg)
 
 
+class MissingShardsError(Exception):
+    """Custom exception, some shards of a sharded crawl are not done
+    """
+
+    def __init__(self, msg):
+        super(MissingShardsError, self).__init__(msg)
+
+
 #--------------------------------------------------------------#
 # -- HELPERS  FUNCTIONS --
 
 
-def write_to_json(data: dict):
-    """write dict data to a json file
+def write_to_json(books, file_name: str = None):
+    """write books to a json lines file one at a time as they are produced.
+    Books go to a .partial file that is only swapped in once every book has
+    been written, after a crash it holds every book scraped so far
     
     Parameters
     ----------
-    data : dict
-        dict that contains an array of books
+    books : iterable
+        iterable of book dict's, can be a generator
+    file_name : str, optional
+        file to write (the default is None, which uses BOOKS_FILE_NAME)
     
     """
-    LOGGER.debug(f"WRITING BOOKS DATA TO {JSON_FILE_NAME}")
+    file_name = file_name or BOOKS_FILE_NAME
 
-    file_name = JSON_FILE_NAME
-    with open(file_name, "w") as j_file:
-        json.dump(data, j_file, indent=4)
+    LOGGER.debug("WRITING BOOKS DATA TO %s", file_name)
+
+    partial_name = f"{file_name}.partial"
+    with JsonLinesWriter(partial_name, mode="w") as writer:
+        for book in books:
+            writer.write(book)
+
+    os.replace(partial_name, file_name)
+
+
+def iter_books_from_json():
+    """get books one at a time from the json lines file, or from the legacy
+    json file when there is no json lines file yet
+
+    Yields
+    ------
+    dict
+        book dict's in file order
+    """
+    file_name = BOOKS_FILE_NAME if os.path.exists(BOOKS_FILE_NAME) else JSON_FILE_NAME
+
+    LOGGER.debug("LOADING BOOKS FROM %s", file_name)
+
+    yield from iter_books(file_name)
 
 
 def get_books_from_json() -> list:
@@ -69,112 +168,551 @@ def get_books_from_json() -> list:
     list
         list of dict books from json file books list
     """
-    LOGGER.debug(f"LOADING BOOKS FROM {JSON_FILE_NAME}")
+    books = list(iter_books_from_json())
+
+    if not books:
+        raise NoBooksFoundError("NO BOOKS FOUND WITHIN DATABASE")
+
+    return books
+
+
+def save_books(books):
+    """write books to the storage picked by STORAGE
+
+    Parameters
+    ----------
+    books : iterable
+        iterable of book dict's, can be a generator
+    """
+    if STORAGE == "sqlite":
+        with SqliteStore(DB_FILE_NAME) as store:
+            store.save(books)
+    elif STORAGE == "binary":
+        from storage import write_snapshot_file
+
+        partial_name = f"{SNAPSHOT_FILE_NAME}.partial"
+        write_snapshot_file(partial_name, books)
+        os.replace(partial_name, SNAPSHOT_FILE_NAME)
+    else:
+        write_to_json(books)
+
+
+def load_fingerprints() -> dict:
+    """get the listing page fingerprints of the last scrape, see
+    Snapshot.pages
+
+    Returns
+    -------
+    dict
+        fingerprint and links of each page by url, empty if there are none
+    """
+    try:
+        with open(FINGERPRINT_FILE_NAME, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        LOGGER.debug("NO LISTING PAGE FINGERPRINTS FOUND")
+        return {}
+
+
+def write_fingerprints(fingerprints: dict):
+    """add the listing page fingerprints of a scrape to FINGERPRINT_FILE_NAME,
+    pages that were not scraped keep their fingerprint
+
+    Parameters
+    ----------
+    fingerprints : dict
+        fingerprint and links of each page by url
+    """
+    pages = dict(load_fingerprints(), **fingerprints)
+
+    partial_name = f"{FINGERPRINT_FILE_NAME}.partial"
+    with open(partial_name, "w", encoding="utf-8") as file:
+        json.dump(pages, file)
+    os.replace(partial_name, FINGERPRINT_FILE_NAME)
+
+
+def load_books():
+    """get books from the storage picked by STORAGE, sqlite is returned as
+    the store so queries run in sqlite, a binary snapshot is memory mapped
+    and json is loaded and indexed
+
+    Raises
+    ------
+    NoBooksFoundError
+        nothing has been saved yet
+
+    Returns
+    -------
+    SqliteStore, SnapshotFile or BookIndex
+        books ready to query
+    """
+    if STORAGE == "binary":
+        if not os.path.exists(SNAPSHOT_FILE_NAME):
+            raise NoBooksFoundError("NO BOOKS FOUND WITHIN DATABASE")
+
+        # mapped without reading the body, python -m storage check
+        # verifies the checksum of the whole file
+        from storage import SnapshotFile
+        return SnapshotFile(SNAPSHOT_FILE_NAME)
 
-    file_name = JSON_FILE_NAME
-    data = None
-    with open(file_name, "r") as j_file:
-        data = json.load(j_file)
+    if STORAGE != "sqlite":
+        return BookIndex(get_books_from_json())
 
-    if data is None:
+    store = SqliteStore(DB_FILE_NAME)
+    if not len(store):
+        store.close()
         raise NoBooksFoundError("NO BOOKS FOUND WITHIN DATABASE")
 
-    return [book for book in data.get("books")]
+    return store
 
 
-def get_top_rated_books(books, amount: int) -> list:
-    """Sort list by rating and return most reviewed
+def get_books_file_name() -> str:
+    """file of the storage picked by STORAGE"""
+    if STORAGE == "sqlite":
+        return DB_FILE_NAME
+    if STORAGE == "binary":
+        return SNAPSHOT_FILE_NAME
+    return BOOKS_FILE_NAME
+
+
+def get_queryable(books):
+    """books as something with top(), stores and indexes are used as they
+    are and a list of book dict's is indexed
+
+    Parameters
+    ----------
+    books : SqliteStore, SnapshotFile, BookIndex or list
+        books to query
+
+    Returns
+    -------
+    SqliteStore, SnapshotFile or BookIndex
+        books ready to query
+    """
+    return books if hasattr(books, "top") else BookIndex(books)
+
+
+def get_top_rated_books(books, amount: int, where=None) -> list:
+    """Return the highest rated books
     
     Parameters
     ----------
-    books : list
-        list of book dict's
+    books : SqliteStore, SnapshotFile, BookIndex or list
+        books to query, a list of book dict's is indexed first
     amount : int
-        slice list via amount to return
+        max books to return
+    where : function, optional
+        only books where(book) is True are returned (the default is None)
     
     Raises
     ------
     IndexError
-        slice amount is bigger then the list
+        amount is negative
     
     Returns
     -------
     list
         list of books
     """
-    if amount >= len(books) or amount < 0:
-        raise IndexError("OUT OF RANGE")
+    return get_queryable(books).top("rating", amount, reverse=True, where=where)
 
-    return sorted(books, key=lambda x: x.get("rating"), reverse=True)[:amount]
 
-
-def get_cheepest_books(books, amount: int) -> list:
-    """Sort list by stock and return cheepest
+def get_cheepest_books(books, amount: int, where=None) -> list:
+    """Return the cheepest books
     
     Parameters
     ----------
-    books : list
-        list of book dict's
+    books : SqliteStore, SnapshotFile, BookIndex or list
+        books to query, a list of book dict's is indexed first
     amount : int
-        slice list via amount to return
+        max books to return
+    where : function, optional
+        only books where(book) is True are returned (the default is None)
     
     Raises
     ------
     IndexError
-        slice amount is bigger then the list
+        amount is negative
     
     Returns
     -------
     list
         list of books
     """
-    if amount >= len(books) or amount < 0:
-        raise IndexError("OUT OF RANGE")
-
-    return sorted(books, key=lambda x: x.get("price"))[:amount]
+    return get_queryable(books).top("price", amount, where=where)
 
 
-def get_most_stocked_books(books, amount: int) -> list:
-    """Sort list by stock and return most stocked
+def get_most_stocked_books(books, amount: int, where=None) -> list:
+    """Return the most stocked books
     
     Parameters
     ----------
-    books : list
-        list of book dict's
+    books : SqliteStore, SnapshotFile, BookIndex or list
+        books to query, a list of book dict's is indexed first
     amount : int
-        slice list via amount to return
+        max books to return
+    where : function, optional
+        only books where(book) is True are returned (the default is None)
     
     Raises
     ------
     IndexError
-        slice amount is bigger then the list
+        amount is negative
     
     Returns
     -------
     list
         list of sorted books by stock
     """
+    return get_queryable(books).top("stock", amount, reverse=True, where=where)
+
+
+def resolve_query(query, books, amount: int, resolver=None) -> list:
+    """Run a query and fetch the stock of the books it returns when they
+    were scraped with lazy_stock. A query that orders by stock needs every
+    stock first, which the resolver keeps until it is too old, the others
+    only fetch the amount of books they return
+    
+    Parameters
+    ----------
+    query : function
+        one of the get_*_books query functions
+    books : SqliteStore, SnapshotFile, BookIndex or list
+        books to query
+    amount : int
+        max books to return
+    resolver : StockResolver, optional
+        fetches and remembers stock (the default is None, stock is used
+        as it was saved)
+    
+    Returns
+    -------
+    list
+        list of books
+    """
+    if resolver is None:
+        return query(books, amount)
+
+    if query is get_most_stocked_books:
+        # resolved and indexed once, again only when the stock is too old
+        books = resolver.resolve_every(books, BookIndex)
+
+    return resolver.resolve(query(books, amount))
 
-    if amount >= len(books) or amount < 0:
-        raise IndexError("OUT OF RANGE")
 
-    return sorted(books, key=lambda x: x.get("stock"), reverse=True)[:amount]
+def get_resume_pages(frontier: Frontier):
+    """Listing pages a resumed scrape still has to fetch, the pager of the
+    first page says how many there are
 
+    Parameters
+    ----------
+    frontier : Frontier
+        state of the stopped scrape
 
-def scrape_books() -> list:
-    """Scrape website to obtain books"""
+    Returns
+    -------
+    list
+        indexes of the pages that are not done, None when there is no
+        pager and every page is fetched again
+    """
+    from pages import find_shard_pages
+    from parsers import page_url
+
+    try:
+        every_page = find_shard_pages(0, 1)
+    except ValueError:
+        LOGGER.warning("NO PAGER, EVERY LISTING PAGE IS FETCHED AGAIN")
+        return None
+
+    return frontier.plan({idx: page_url(idx) for idx in every_page})
+
+
+def scrape_books(incremental: bool = False, engine: str = None,
+                 pages: range = None, save=None,
+                 lazy_stock: bool = None, resume: bool = False) -> list:
+    """Scrape website to obtain books, each book is written to storage
+    as soon as its page has been scraped. Unless only some pages are
+    scraped, finished pages are checkpointed in FRONTIER_FILE_NAME
+    
+    Parameters
+    ----------
+    incremental : bool, optional
+        reuse the stock of unchanged books in storage and only fetch
+        detail pages for new, changed or old books (the default is False)
+    engine : str, optional
+        "async" or "pipeline" (the default is None, which uses ENGINE)
+    pages : range, optional
+        only scrape these pages (the default is None, every page)
+    save : function, optional
+        called with an iterable of the book dict's to write them (the
+        default is None, which uses save_books)
+    lazy_stock : bool, optional
+        skip every detail page, see resolve_query (the default is None,
+        which uses LAZY_STOCK)
+    resume : bool, optional
+        carry on from the checkpoint of the last scrape, only pages that
+        are not done and stock that failed are fetched, then every book
+        is written (the default is False, starts over)
+    
+    Returns
+    -------
+    list
+        list of book dict's
+    """
+
+    from pages import crawl_all_pages_books
+    from pages import get_all_pages_books_pipelined
+    from pages import ResponseCache
+    from pages import Snapshot
+    from pages import RateLimiter
+    from pages import AsyncRateLimiter
+    from storage import SnapshotFileError
 
     LOGGER.debug("STARTED SCRAPING NEW BOOK DATA")
 
-    to_dict = lambda book:  dict(title=book.title, price=book.price, stock=book.stock, rating=book.rating)
+    if lazy_stock is None:
+        lazy_stock = LAZY_STOCK
+
+    metrics = get_metrics()
+    metrics.reset()
+    started = time.perf_counter()
+
+    # an empty snapshot reuses nothing but still collects the fingerprints
+    # of the listing pages for the next refresh
+    snapshot = Snapshot([])
+    if incremental:
+        try:
+            books = load_books()
+            snapshot = Snapshot(list(books), pages=load_fingerprints())
+            if hasattr(books, "close"):
+                books.close()
+        except (OSError, ValueError, sqlite3.Error, SnapshotFileError,
+                NoBooksFoundError):
+            LOGGER.debug("NO PREVIOUS BOOKS FOUND, SCRAPING EVERY BOOK")
+
+    # fingerprints are kept for whole scrapes, not for a shard
+    keep_fingerprints = pages is None
+
+    # a shard is resumed by scraping it again
+    frontier = None
+    if CHECKPOINT and pages is None:
+        frontier = Frontier(FRONTIER_FILE_NAME, snapshot)
+        if resume:
+            pages = get_resume_pages(frontier)
+            LOGGER.info("RESUMING SCRAPE, %s PAGES LEFT",
+                        "EVERY" if pages is None else len(pages))
+        else:
+            frontier.reset()
+
+    cache = ResponseCache()
+    if (engine or ENGINE) == "pipeline":
+        crawl = get_all_pages_books_pipelined(
+            cache=cache, snapshot=frontier or snapshot,
+            limiter=RateLimiter(), pages=pages, lazy_stock=lazy_stock)
+    else:
+        crawl = crawl_all_pages_books(
+            cache=cache, snapshot=frontier or snapshot,
+            limiter=AsyncRateLimiter(), pages=pages, lazy_stock=lazy_stock)
+
+    books = []
+
+    def resumed():
+        # books of the pages done before the scrape stopped are only in
+        # the frontier, it hands every book over once the rest are done
+        for _ in crawl:
+            pass
+        yield from frontier.iter_books()
+
+    def collect():
+        for book in (resumed() if resume and frontier else crawl):
+            record = book if isinstance(book, dict) else book.to_dict()
+            books.append(record)
+
+            # time from handing a book over to asking for the next one
+            # is spent storing it
+            stored = time.perf_counter()
+            yield record
+            metrics.inc("scraper_store_seconds_total",
+                        time.perf_counter() - stored)
+            metrics.inc("scraper_books_stored_total")
 
-    books = dict(books=[to_dict(book) for book in get_all_pages_books()])
+    try:
+        (save or save_books)(collect())
+    finally:
+        if frontier is not None:
+            frontier.close()
 
     LOGGER.debug("FINISHED SCRAPING NEW BOOK DATA")
 
-    write_to_json(books)
+    seconds = time.perf_counter() - started
+    metrics.set("scraper_crawl_seconds", seconds)
+    metrics.set("scraper_books_per_second", len(books) / seconds if seconds else 0.0)
+    for result in ("hits", "revalidated", "misses"):
+        metrics.inc("scraper_cache_total", getattr(cache, result), result=result)
+    metrics.inc("scraper_fingerprint_total", snapshot.page_hits, result="hit")
+    metrics.inc("scraper_fingerprint_total", snapshot.page_misses, result="miss")
+
+    try:
+        metrics.dump(METRICS_FILE_NAME)
+    except OSError as err:
+        LOGGER.warning("COULD NOT WRITE METRICS, %s", err)
+
+    if frontier is None:
+        LOGGER.debug("STOCK REUSED FOR %d BOOKS, FETCHED FOR %d",
+                     snapshot.reused, snapshot.refetched)
+    else:
+        # the frontier counts every book, it asks the snapshot for those
+        # it did not checkpoint
+        LOGGER.debug("STOCK REUSED FOR %d BOOKS, %d FROM THE CHECKPOINT, "
+                     "FETCHED FOR %d", frontier.reused,
+                     frontier.reused - snapshot.reused, frontier.refetched)
+
+    checked = snapshot.page_hits + snapshot.page_misses
+    if checked:
+        LOGGER.info("%d OF %d LISTING PAGES UNCHANGED (%.0f%%), NOT PARSED",
+                    snapshot.page_hits, checked,
+                    100 * snapshot.page_hits / checked)
+
+    if keep_fingerprints:
+        try:
+            write_fingerprints(snapshot.fingerprints)
+        except OSError as err:
+            LOGGER.warning("COULD NOT WRITE FINGERPRINTS, %s", err)
+
+    failed = sum(book["stock"] == -1 for book in books)
+    if frontier is not None and failed:
+        LOGGER.warning("NO STOCK FOR %d BOOKS, RUN WITH --resume TO RETRY THEM",
+                       failed)
+
+    return books
+
+
+def scrape_shard(shard: int, shards: int, incremental: bool = False,
+                 engine: str = None) -> list:
+    """Scrape one range of pages of a crawl split into shards, its books
+    are written to their own file in SHARD_DIR. Each shard can run in its
+    own process or on its own host, a failed shard is re-run on its own
+    
+    Parameters
+    ----------
+    shard : int
+        index of the shard, 0 to shards - 1
+    shards : int
+        amount of shards
+    incremental : bool, optional
+        reuse the stock of unchanged books in storage (the default is False)
+    engine : str, optional
+        "async" or "pipeline" (the default is None, which uses ENGINE)
+    
+    Returns
+    -------
+    list
+        list of book dict's of the shard
+    """
+    from pages import find_shard_pages
+
+    pages = find_shard_pages(shard, shards)
+    LOGGER.info("SCRAPING SHARD %d OF %d, PAGES %s", shard, shards, pages)
+
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    file_name = shard_file_name(SHARD_DIR, shard, shards)
+
+    return scrape_books(incremental, engine, pages,
+                        save=partial(write_to_json, file_name=file_name))
+
+
+def merge_shard_books(shards: int = None) -> int:
+    """Write the books of every shard file in SHARD_DIR to storage
+    
+    Parameters
+    ----------
+    shards : int, optional
+        amount of shards of the crawl (the default is None, taken from
+        the files in SHARD_DIR)
+    
+    Raises
+    ------
+    MissingShardsError
+        some shards have no file, they have to be scraped again first
+    
+    Returns
+    -------
+    int
+        amount of books written
+    """
+    shards, files = find_shard_files(SHARD_DIR, shards)
+
+    missing = sorted(set(range(shards)) - set(files))
+    if not shards or missing:
+        raise MissingShardsError(f"SHARDS {missing} OF {shards} ARE NOT DONE")
+
+    merged = 0
+
+    def count(books):
+        nonlocal merged
+        for book in books:
+            merged += 1
+            yield book
 
-    return books.get("books")
+    save_books(count(merge_shards(list(files.values()))))
+
+    LOGGER.info("MERGED %d BOOKS FROM %d SHARDS", merged, shards)
+    return merged
+
+
+def _run_shard(base_url: str, shard: int, shards: int, incremental: bool,
+               engine: str):
+    """Run in a shard process, which may not have inherited the base url"""
+    from parsers import set_base_url
+
+    set_base_url(base_url)
+    scrape_shard(shard, shards, incremental, engine)
+
+
+def scrape_sharded(shards: int, incremental: bool = False,
+                   engine: str = None) -> int:
+    """Scrape every shard at once, one process each, then merge them into
+    storage
+    
+    Parameters
+    ----------
+    shards : int
+        amount of shards
+    incremental : bool, optional
+        reuse the stock of unchanged books in storage (the default is False)
+    engine : str, optional
+        "async" or "pipeline" (the default is None, which uses ENGINE)
+    
+    Raises
+    ------
+    MissingShardsError
+        some shards failed, re-run them with scrape_shard before merging
+    
+    Returns
+    -------
+    int
+        amount of books written
+    """
+    import multiprocessing
+    from parsers import get_base_url
+
+    # each shard starts its own process pool when using the pipeline,
+    # so the shards can not be daemon pool workers themselves
+    procs = [multiprocessing.Process(
+        target=_run_shard,
+        args=(get_base_url(), shard, shards, incremental, engine))
+        for shard in range(shards)]
+
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+
+    failed = [shard for shard, proc in enumerate(procs) if proc.exitcode]
+    if failed:
+        raise MissingShardsError(f"SHARDS {failed} OF {shards} FAILED")
+
+    return merge_shard_books(shards)
 
 
 #--------------------------------------------------------------#
@@ -281,7 +819,7 @@ def switch(sym: str):
     Example
     -------
         >> foo = switch("s")
-        >> foo("foo")
+        >> foo(BookIndex(books), 10)
     """
 
     try:
@@ -304,20 +842,30 @@ def user_interface():
     !! -- SCAPING MIGHT TAKE A WHILE TO GET ALL WEBSITES BOOKS -- !!
     !! -- ALSO MIGHT FAIL DUE TO SITE NOT RESPONGING TO REQUEST -- !!
     S - SCRAPE 
+    R - REFRESH PRE-DATA, ONLY NEW OR CHANGED BOOKS ARE RE-CHECKED
     D - USE PRE-DATA
     """
 
     print(start_info)
 
-    choice = get_choice("S[crape] or U[se json]", ["s", "u"])
+    choice = get_choice("S[crape], R[efresh] or U[se json]", ["s", "r", "u"])
 
     books = None
     if choice == "s":
         print("SCRAPING")
         books = scrape_books()
+    elif choice == "r":
+        print("REFRESHING")
+        books = scrape_books(incremental=True)
+    else:
+        print("USING PRE-DATA")
+
+    if choice == "u" or STORAGE != "json":
+        # indexed once, or queried in place from sqlite or the mapped
+        # snapshot, every query after this only reads the books it returns
+        books = load_books()
     else:
-        print("USING JSON")
-        books = get_books_from_json()
+        books = BookIndex(books)
 
     info = f"""
     SCRAPED BOOKS FROM 'BOOKS.TOSCRAPE.COM'
@@ -329,6 +877,11 @@ def user_interface():
     Q - QUIT
     """
 
+    resolver = None
+    if LAZY_STOCK:
+        from pages import StockResolver
+        resolver = StockResolver()
+
     # main loop
     running = True
     while running:
@@ -341,22 +894,131 @@ def user_interface():
         else:
             if usr_input in ["b", "c", "s"]:
                 task = switch(usr_input)
-                book_results = task(books, 10)
+                book_results = resolve_query(task, books, 10, resolver)
                 print_info(book_results, "RESULT")
 
+    if resolver is not None:
+        resolver.close()
+
     print("EXITING...")
     LOGGER.debug("TERMINATING APP...")
 
 
-def run():
+def serve(port: int = SERVE_PORT):
+    """Answer queries over local http until interrupted, books are loaded
+    once and loaded again whenever a scrape writes new ones
+
+    Parameters
+    ----------
+    port : int, optional
+        port to listen on (the default is SERVE_PORT)
+    """
+    from server import QueryServer
+
+    server = QueryServer(load_books, get_books_file_name(), port=port)
+    print(f"SERVING {len(server.index)} BOOKS ON {server.base_url}")
+    server.serve_forever()
+
+
+class LocalQueueHandler(QueueHandler):
+    """QueueHandler for a listener in the same process, records are queued
+    as they are so the message is formatted on the listener thread too"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level: str = LOG_LEVEL,
+                  file_name: str = LOG_FILE_NAME) -> QueueListener:
+    """Log to a rotating file_name from a listener thread, threads that
+    log only put the record on a queue. The file is only opened by the
+    first record
+    
+    Parameters
+    ----------
+    level : str, optional
+        name of the lowest level logged (the default is LOG_LEVEL)
+    file_name : str, optional
+        log file (the default is LOG_FILE_NAME)
+    
+    Returns
+    -------
+    QueueListener
+        started listener, stop() it to flush every record before exiting
+    """
+    handler = RotatingFileHandler(file_name, maxBytes=LOG_MAX_BYTES,
+                                  backupCount=LOG_BACKUPS, delay=True)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT,
+                                           datefmt="%d-%m-%Y %H:%M:%S"))
+
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, handler)
+
+    root = logging.getLogger()
+    root.addHandler(LocalQueueHandler(records))
+    root.setLevel(level.upper())
+
+    listener.start()
+    return listener
+
+
+def run(log_level: str = LOG_LEVEL):
     """Main app"""
-    user_interface()
+    listener = setup_logging(log_level)
+    try:
+        user_interface()
+    finally:
+        listener.stop()
 
 
 #--------------------------------------------------------------#
 # -- MAIN --
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="scrape data from books.toscrape.com")
+    parser.add_argument("--log-level", default=LOG_LEVEL,
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        type=str.upper)
+    parser.add_argument("--shards", type=int,
+                        help="scrape in this many shards, one process each, and merge them")
+    parser.add_argument("--shard", type=int,
+                        help="only scrape this shard of --shards, for running shards on other hosts")
+    parser.add_argument("--merge", action="store_true",
+                        help="merge the finished shards in SHARD_DIR into storage")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse the stock of unchanged books when sharding")
+    parser.add_argument("--lazy-stock", action="store_true",
+                        help="only fetch the stock of books a query shows")
+    parser.add_argument("--resume", action="store_true",
+                        help="carry on from where the last scrape stopped and retry what failed")
+    parser.add_argument("--serve", action="store_true",
+                        help="answer queries as json over local http, reloading new scrapes")
+    parser.add_argument("--port", type=int, default=SERVE_PORT,
+                        help="port of --serve")
+    args = parser.parse_args()
+
+    LAZY_STOCK = args.lazy_stock
+
+    if args.shard is not None and not args.shards:
+        parser.error("--shard needs --shards")
+
+    if args.merge or args.shards or args.resume or args.serve:
+        listener = setup_logging(args.log_level)
+        try:
+            if args.serve:
+                serve(args.port)
+            elif args.resume:
+                print(f"SCRAPED {len(scrape_books(resume=True))} BOOKS")
+            elif args.merge:
+                print(f"MERGED {merge_shard_books(args.shards)} BOOKS")
+            elif args.shard is not None:
+                books = scrape_shard(args.shard, args.shards, args.incremental)
+                print(f"SCRAPED {len(books)} BOOKS")
+            else:
+                print(f"MERGED {scrape_sharded(args.shards, args.incremental)} BOOKS")
+        finally:
+            listener.stop()
+    else:
+        run(args.log_level)
 
 #--------------------------------------------------------------#
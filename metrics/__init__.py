@@ -0,0 +1,3 @@
+from .registry import Metrics
+from .registry import Histogram
+from .registry import get_metrics
@@ -0,0 +1,296 @@
+"""
+In process metrics of a crawl, counters, gauges and latency histograms
+keyed by name and labels, read back as a dict or dumped as json and the
+Prometheus text format
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.metrics")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# upper bounds of histogram buckets in seconds, same as the prometheus
+# client defaults
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# help text of the metrics the scraper records
+HELP = {
+    "scraper_request_seconds": "Time of each http request",
+    "scraper_responses_total": "Responses by status code",
+    "scraper_response_bytes_total": "Bytes of response bodies",
+    "scraper_cache_total": "Cache lookups by result",
+    "scraper_fingerprint_total": "Listing pages whose books were reused by result",
+    "scraper_retries_total": "Requests retried after an overload",
+    "scraper_concurrency_limit": "AIMD limit on requests in flight",
+    "scraper_parse_seconds": "Time to parse one page",
+    "scraper_parse_book_seconds": "Time to parse one book of a listing page",
+    "scraper_books_parsed_total": "Books read from listing pages",
+    "scraper_queue_depth": "Pages waiting in a queue",
+    "scraper_queue_depth_max": "Most pages waiting in a queue",
+    "scraper_store_seconds_total": "Time spent writing books",
+    "scraper_books_stored_total": "Books written to storage",
+    "scraper_crawl_seconds": "Time of the whole crawl",
+    "scraper_books_per_second": "Books stored per second of crawl",
+}
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def _labels(labels: dict) -> tuple:
+    """Labels as a sorted tuple so they can key a dict"""
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    """{key="value",...} or nothing when there are no labels"""
+    pairs = labels + extra
+    if not pairs:
+        return ""
+
+    def escape(value):
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum and count
+
+    Parameters
+    ----------
+    buckets : tuple, optional
+        sorted upper bounds (the default is BUCKETS)
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), COUNT: {self.count}, SUM: {self.sum:.3f}>"
+
+    def observe(self, value: float):
+        """Add one observation"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q'th percentile, 0 to 100.
+        inf when it is past the last bucket, 0.0 when empty"""
+        if not self.count:
+            return 0.0
+
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self) -> list:
+        """(upper bound, observations at or under it) per bucket and +Inf"""
+        res = []
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            res.append((bound, seen))
+        return res
+
+    def to_dict(self) -> dict:
+        return dict(count=self.count, sum=self.sum,
+                    mean=self.sum / self.count if self.count else 0.0,
+                    p50=self.percentile(50), p90=self.percentile(90),
+                    p99=self.percentile(99),
+                    buckets={_format_value(bound): count
+                             for bound, count in self.cumulative()})
+
+
+class Metrics:
+    """Registry of every metric, safe to use from many threads. The kind
+    of a metric is set by the first call that records it
+
+    Example
+    -------
+        >> metrics = get_metrics()
+        >> metrics.inc("scraper_responses_total", status=200)
+        >> with metrics.time("scraper_parse_seconds", kind="listing"):
+        ..     parse(page)
+        >> print(metrics.to_prometheus())
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), METRICS: {len(self.__kinds)}>"
+
+    def reset(self):
+        """Forget every metric"""
+        with self.__lock:
+            self.__kinds = {}
+            self.__values = {}
+
+    def __record(self, kind: str, name: str, labels: dict, update):
+        with self.__lock:
+            known = self.__kinds.setdefault(name, kind)
+            if known != kind:
+                raise TypeError(f"{name} IS A {known}, NOT A {kind}")
+
+            key = (name, _labels(labels))
+            self.__values[key] = update(self.__values.get(key))
+
+    # -- RECORDING --
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add value to a counter"""
+        self.__record("counter", name, labels,
+                      lambda old: (old or 0) + value)
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge"""
+        self.__record("gauge", name, labels, lambda old: value)
+
+    def set_max(self, name: str, value: float, **labels):
+        """Set a gauge if value is bigger then it"""
+        self.__record("gauge", name, labels,
+                      lambda old: value if old is None else max(old, value))
+
+    def observe(self, name: str, value: float, **labels):
+        """Add an observation to a histogram"""
+        def update(old):
+            old = old or Histogram()
+            old.observe(value)
+            return old
+
+        self.__record("histogram", name, labels, update)
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        """Observe the seconds the with block took into a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # -- READING --
+
+    def get(self, name: str, **labels):
+        """Value of a counter or gauge, Histogram of a histogram, None if
+        it was never recorded"""
+        with self.__lock:
+            return self.__values.get((name, _labels(labels)))
+
+    def total(self, name: str) -> float:
+        """Sum of a counter or gauge over every label"""
+        with self.__lock:
+            return sum(value for (key, _), value in self.__values.items()
+                       if key == name)
+
+    def snapshot(self) -> dict:
+        """Every metric as plain data
+
+        Returns
+        -------
+        dict
+            name to {"type": kind, "values": [{"labels": {...}, "value": ...}]},
+            histograms have count, sum, mean, p50, p90, p99 and buckets
+        """
+        with self.__lock:
+            res = {name: dict(type=kind, values=[])
+                   for name, kind in sorted(self.__kinds.items())}
+
+            for (name, labels), value in sorted(self.__values.items(),
+                                                key=lambda item: item[0]):
+                if isinstance(value, Histogram):
+                    value = value.to_dict()
+                res[name]["values"].append(dict(labels=dict(labels),
+                                                value=value))
+        return res
+
+    def to_json(self) -> str:
+        """snapshot() as json"""
+        return json.dumps(self.snapshot(), indent=4)
+
+    def to_prometheus(self) -> str:
+        """Every metric in the Prometheus text format"""
+        lines = []
+        for name, metric in self.snapshot().items():
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+
+            for item in metric["values"]:
+                labels = _labels(item["labels"])
+                value = item["value"]
+
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+
+                for bound, count in value["buckets"].items():
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, file_name: str):
+        """Write file_name.prom and file_name.json
+
+        Parameters
+        ----------
+        file_name : str
+            path without an extension
+        """
+        LOGGER.debug("WRITING METRICS TO %s.prom AND %s.json", file_name, file_name)
+
+        with open(f"{file_name}.prom", "w") as p_file:
+            p_file.write(self.to_prometheus())
+        with open(f"{file_name}.json", "w") as j_file:
+            j_file.write(self.to_json())
+
+
+#--------------------------------------------------------------#
+# -- REGISTRY --
+
+_METRICS = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """The process wide Metrics every part of the scraper records into"""
+    return _METRICS
+
+
+#--------------------------------------------------------------#
@@ -1 +1,17 @@
-from .bookPages import get_all_pages_books
\ No newline at end of file
+from .bookPages import get_all_pages_books
+from .bookPages import get_shard_pages
+from .bookPages import find_shard_pages
+from .asyncBookPages import iter_pages_books_async
+from .asyncBookPages import get_all_pages_books_async
+from .asyncBookPages import crawl_all_pages_books
+from .pipeline import get_all_pages_books_pipelined
+from .fetcher import Fetcher
+from .asyncFetcher import AsyncFetcher
+from .parsePool import ParsePool
+from .httpCache import ResponseCache
+from .snapshot import Snapshot
+from .stockResolver import StockResolver
+from .rateLimiter import RateLimiter
+from .rateLimiter import AsyncRateLimiter
+from .rateLimiter import RetryPolicy
+from .rateLimiter import FetchError
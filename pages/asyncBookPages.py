@@ -0,0 +1,330 @@
+"""
+Using asyncio / aiohttp and BookParser to scrape every page concurrently
+instead of one blocking request after another
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import time
+import asyncio
+import logging
+from itertools import count
+from itertools import islice
+from collections import deque
+from parsers import BookParser
+from parsers import page_url
+from .bookPages import get_page_count
+from .bookPages import get_stale_books
+from .bookPages import is_past_last_page
+from .bookPages import finish_page
+from .bookPages import parse_listing
+from .bookPages import parse_stock
+from .bookPages import reuse_listing
+from .snapshot import Snapshot
+from .httpCache import ResponseCache
+from .asyncFetcher import AsyncFetcher
+from .asyncFetcher import LISTING_CONCURRENCY
+from .asyncFetcher import DETAIL_CONCURRENCY
+from .rateLimiter import AsyncRateLimiter
+from .rateLimiter import FetchError
+from metrics import get_metrics
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.async_book_pages")
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+async def get_books_stock_async(fetcher: AsyncFetcher, link: str) -> int:
+    """Async version of get_books_stock
+
+    Parameters
+    ----------
+    fetcher : AsyncFetcher
+        fetcher shared by every request
+    link : str
+        string format of the url link
+
+    Returns
+    -------
+    int
+        amount of stock, -1 if the page was not found or kept failing
+    """
+    try:
+        status, content = await fetcher.get(link, "detail")
+    except FetchError:
+        return -1
+
+    if status != 200:
+        LOGGER.debug("NO STOCK FOR %s, ANSWERED %d", link, status)
+        return -1
+
+    return parse_stock(content)
+
+
+async def get_pages_books_async(fetcher: AsyncFetcher, url: str,
+                                content: bytes,
+                                snapshot: Snapshot = None,
+                                lazy_stock: bool = False) -> list:
+    """Return a list of books on a single page with every books
+    stock fetched at the same time
+
+    Parameters
+    ----------
+    fetcher : AsyncFetcher
+        fetcher shared by every request
+    url : str
+        url the content was obtained from
+    content : bytes
+        body of the listing page
+    snapshot : Snapshot, optional
+        previous scrape, books it still holds a valid stock for skip their
+        detail page (the default is None, which fetches every stock)
+    lazy_stock : bool, optional
+        skip every detail page, stock is left None for a StockResolver
+        to fetch when it is needed (the default is False)
+
+    Returns
+    -------
+    list
+        list of BookParse obj's
+    """
+    fingerprint, records = reuse_listing(url, content, snapshot)
+    if records is None:
+        records = parse_listing(content)
+    res = [BookParser.from_record(book) for book in records]
+
+    todo = get_stale_books(res, snapshot, lazy_stock)
+    checked = time.time()
+
+    stocks = await asyncio.gather(
+        *[get_books_stock_async(fetcher, book.link) for book in todo])
+
+    for book, stock in zip(todo, stocks):
+        book.stock = stock
+        book.stock_checked = checked
+
+    finish_page(url, res, todo, snapshot, fingerprint)
+    return res
+
+
+# PUBLIC
+async def iter_pages_books_async(
+        listing_concurrency: int = LISTING_CONCURRENCY,
+        detail_concurrency: int = DETAIL_CONCURRENCY,
+        cache: ResponseCache = None,
+        snapshot: Snapshot = None,
+        limiter: AsyncRateLimiter = None,
+        pages: range = None,
+        lazy_stock: bool = False):
+    """Go over each page on book.toscrape concurrently and yield the books of
+    each page in page order. Up to twice `listing_concurrency` pages are
+    scheduled ahead of the one being yielded, up to the count of the first
+    page's pager or without a pager until a 404 status code is made. The
+    detail pages of each listing are scheduled as soon as it arrives, so
+    memory is bounded by the window however many pages there are
+
+    Parameters
+    ----------
+    listing_concurrency : int, optional
+        max listing pages in flight (the default is LISTING_CONCURRENCY)
+    detail_concurrency : int, optional
+        max detail pages in flight (the default is DETAIL_CONCURRENCY)
+    cache : ResponseCache, optional
+        on disk cache for every page (the default is None, no caching)
+    snapshot : Snapshot, optional
+        previous scrape, only new, changed or old stock is fetched
+        (the default is None, which fetches every stock)
+    limiter : AsyncRateLimiter, optional
+        per host limits and retries (the default is None, no limits or
+        retries)
+    pages : range, optional
+        only crawl these pages, see get_shard_pages (the default is None,
+        every page)
+    lazy_stock : bool, optional
+        skip every detail page, stock is left None for a StockResolver
+        to fetch when it is needed (the default is False)
+
+    Yields
+    ------
+    list
+        list of BookParse objs found on one page
+    """
+    LOGGER.info("SCRAPING BOOKS FROM 'BOOKS.TOSCRAPE.COM'")
+
+    async with AsyncFetcher(listing_concurrency, detail_concurrency,
+                            cache, limiter) as fetcher:
+
+        async def get_listing(idx):
+            url = page_url(idx)
+            status, content = await fetcher.get(url, "listing")
+
+            # a 404 marks the page after the last one
+            if is_past_last_page(url, status):
+                return None
+            return url, content
+
+        async def get_listing_books(idx):
+            listing = await get_listing(idx)
+            if listing is None:
+                return None
+
+            return await get_pages_books_async(fetcher, *listing, snapshot,
+                                               lazy_stock)
+
+        if pages is None:
+            first = await get_listing(1)
+            if first is None:
+                return
+
+            total = get_page_count(first[1])
+            books = await get_pages_books_async(fetcher, *first, snapshot,
+                                                lazy_stock)
+
+        if pages is not None:
+            # a slice of the site
+            books = None
+            todo = iter(pages)
+        elif total is not None:
+            LOGGER.debug("PAGER FOUND %d PAGES", total)
+            todo = iter(range(2, total + 1))
+        else:
+            # no pager, pages until a 404
+            todo = count(2)
+
+        # sliding window of pages, a page is only scheduled once one of
+        # the pages before it has been handed over, so pages that are done
+        # never pile up in memory waiting for a slow consumer
+        window = deque(
+            asyncio.ensure_future(get_listing_books(idx))
+            for idx in islice(todo, 2 * listing_concurrency))
+
+        metrics = get_metrics()
+        metrics.set_max("scraper_queue_depth_max", len(window), queue="listing")
+
+        try:
+            if books is not None:
+                yield books
+
+            while window:
+                metrics.set("scraper_queue_depth", len(window), queue="listing")
+                books = await window.popleft()
+
+                # stop once a 404 error has been made
+                if books is None:
+                    break
+
+                for idx in islice(todo, 1):
+                    window.append(
+                        asyncio.ensure_future(get_listing_books(idx)))
+
+                yield books
+        finally:
+            for task in window:
+                task.cancel()
+            await asyncio.gather(*window, return_exceptions=True)
+
+
+async def get_all_pages_books_async(
+        listing_concurrency: int = LISTING_CONCURRENCY,
+        detail_concurrency: int = DETAIL_CONCURRENCY,
+        cache: ResponseCache = None,
+        snapshot: Snapshot = None,
+        limiter: AsyncRateLimiter = None,
+        pages: range = None,
+        lazy_stock: bool = False) -> list:
+    """Collect every book from iter_pages_books_async into a list
+
+    Parameters
+    ----------
+    listing_concurrency : int, optional
+        max listing pages in flight (the default is LISTING_CONCURRENCY)
+    detail_concurrency : int, optional
+        max detail pages in flight (the default is DETAIL_CONCURRENCY)
+    cache : ResponseCache, optional
+        on disk cache for every page (the default is None, no caching)
+    snapshot : Snapshot, optional
+        previous scrape, only new, changed or old stock is fetched
+        (the default is None, which fetches every stock)
+    limiter : AsyncRateLimiter, optional
+        per host limits and retries (the default is None, no limits or
+        retries)
+    pages : range, optional
+        only crawl these pages, see get_shard_pages (the default is None,
+        every page)
+    lazy_stock : bool, optional
+        skip every detail page, stock is left None for a StockResolver
+        to fetch when it is needed (the default is False)
+
+    Returns
+    -------
+    list
+        list of BookParse objs in page order
+    """
+    return [
+        book async for books in iter_pages_books_async(
+            listing_concurrency, detail_concurrency, cache, snapshot,
+            limiter, pages, lazy_stock)
+        for book in books
+    ]
+
+
+def crawl_all_pages_books(
+        listing_concurrency: int = LISTING_CONCURRENCY,
+        detail_concurrency: int = DETAIL_CONCURRENCY,
+        cache: ResponseCache = None,
+        snapshot: Snapshot = None,
+        limiter: AsyncRateLimiter = None,
+        pages: range = None,
+        lazy_stock: bool = False):
+    """Sync wrapper around iter_pages_books_async for callers that are not
+    running an event loop. The loop is stepped one page at a time so books
+    are handed over as soon as their page is done
+
+    Parameters
+    ----------
+    listing_concurrency : int, optional
+        max listing pages in flight (the default is LISTING_CONCURRENCY)
+    detail_concurrency : int, optional
+        max detail pages in flight (the default is DETAIL_CONCURRENCY)
+    cache : ResponseCache, optional
+        on disk cache for every page (the default is None, no caching)
+    snapshot : Snapshot, optional
+        previous scrape, only new, changed or old stock is fetched
+        (the default is None, which fetches every stock)
+    limiter : AsyncRateLimiter, optional
+        per host limits and retries (the default is None, no limits or
+        retries)
+    pages : range, optional
+        only crawl these pages, see get_shard_pages (the default is None,
+        every page)
+    lazy_stock : bool, optional
+        skip every detail page, stock is left None for a StockResolver
+        to fetch when it is needed (the default is False)
+
+    Yields
+    ------
+    BookParser
+        books in page order
+    """
+    loop = asyncio.new_event_loop()
+    crawl = iter_pages_books_async(listing_concurrency, detail_concurrency,
+                                   cache, snapshot, limiter, pages,
+                                   lazy_stock)
+
+    try:
+        while True:
+            try:
+                books = loop.run_until_complete(crawl.__anext__())
+            except StopAsyncIteration:
+                break
+
+            yield from books
+    finally:
+        loop.run_until_complete(crawl.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
@@ -0,0 +1,188 @@
+"""
+aiohttp session shared by every request of an async crawl, with separate
+limits for listing and detail pages
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import time
+import asyncio
+import logging
+import aiohttp
+from .httpCache import ResponseCache
+from .rateLimiter import AsyncRateLimiter
+from metrics import get_metrics
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.async_fetcher")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# how many listing / detail pages can be in flight at once
+LISTING_CONCURRENCY = 5
+DETAIL_CONCURRENCY = 20
+
+# connect and read timeouts in seconds, same as the sync Fetcher
+TIMEOUT = aiohttp.ClientTimeout(sock_connect=5, sock_read=30)
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class AsyncFetcher:
+    """Owns the aiohttp session of an async crawl, must be entered with
+    `async with` from inside the event loop that will use it
+
+    Parameters
+    ----------
+    listing_concurrency : int, optional
+        max listing pages in flight (the default is LISTING_CONCURRENCY)
+    detail_concurrency : int, optional
+        max detail pages in flight (the default is DETAIL_CONCURRENCY)
+    cache : ResponseCache, optional
+        on disk cache used by get() (the default is None, no caching)
+    limiter : AsyncRateLimiter, optional
+        per host rate and concurrency limits, failed requests are retried
+        (the default is None, no limits or retries)
+    """
+
+    def __init__(self, listing_concurrency: int = LISTING_CONCURRENCY,
+                 detail_concurrency: int = DETAIL_CONCURRENCY,
+                 cache: ResponseCache = None,
+                 limiter: AsyncRateLimiter = None):
+        self.listing_concurrency = listing_concurrency
+        self.detail_concurrency = detail_concurrency
+        self.cache = cache
+        self.limiter = limiter
+
+        self.session = None
+        self.__limits = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), LISTING: {self.listing_concurrency}, DETAIL: {self.detail_concurrency}>"
+
+    async def __aenter__(self):
+        self.__limits = dict(
+            listing=asyncio.Semaphore(self.listing_concurrency),
+            detail=asyncio.Semaphore(self.detail_concurrency))
+
+        connector = aiohttp.TCPConnector(
+            limit=self.listing_concurrency + self.detail_concurrency)
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             timeout=TIMEOUT)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+
+        if self.cache is not None:
+            await self.__in_thread(self.cache.prune)
+
+    @staticmethod
+    async def __in_thread(func, *args):
+        """Run blocking cache gzip and file work on the loop's default
+        executor so other requests keep going meanwhile"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def __request(self, url: str, kind: str, headers: dict) -> tuple:
+        """Get a web page while holding a slot of the kind's semaphore,
+        through the limiter with retries if there is one"""
+        async with self.__limits[kind]:
+            if self.limiter is None:
+                return await self.__send(url, kind, headers)
+
+            retry = self.limiter.retry
+            for attempt in range(1, retry.retries + 2):
+                limit = await self.limiter.acquire(url)
+                start = time.monotonic()
+
+                try:
+                    status, content, page_headers = await self.__send(
+                        url, kind, headers)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                    await self.limiter.release(limit, time.monotonic() - start, True)
+                    reason, retry_after = err, None
+                else:
+                    if status not in retry.statuses:
+                        await self.limiter.release(limit, time.monotonic() - start, False)
+                        return status, content, page_headers
+
+                    reason = status
+                    retry_after = page_headers.get("Retry-After")
+                    await self.limiter.release(limit, time.monotonic() - start,
+                                               True, retry_after)
+
+                if attempt <= retry.retries:
+                    await asyncio.sleep(retry.delay(attempt, retry_after))
+
+            raise self.limiter.give_up(url, attempt, reason)
+
+    async def __send(self, url: str, kind: str, headers: dict) -> tuple:
+        """One request, (status code, body bytes, headers). Its latency,
+        status and size go to the metrics"""
+        metrics = get_metrics()
+        start = time.perf_counter()
+
+        try:
+            async with self.session.get(url, headers=headers) as page:
+                status, content = page.status, await page.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            metrics.inc("scraper_responses_total", kind=kind, status="error")
+            raise
+        finally:
+            metrics.observe("scraper_request_seconds",
+                            time.perf_counter() - start, kind=kind)
+
+        metrics.inc("scraper_responses_total", kind=kind, status=status)
+        metrics.inc("scraper_response_bytes_total", len(content), kind=kind)
+        return status, content, page.headers
+
+    async def get(self, url: str, kind: str = "detail") -> tuple:
+        """Get a web page. With a cache, fresh entries are returned without
+        a request and stale ones are revalidated with a conditional get,
+        the cache is read and written off the event loop
+
+        Parameters
+        ----------
+        url : str
+            string format of the url link
+        kind : str, optional
+            "listing" or "detail", picks the limit the request counts
+            against (the default is "detail")
+
+        Raises
+        ------
+        FetchError
+            with a limiter, the page still failed after every retry
+
+        Returns
+        -------
+        tuple
+            (status code, body bytes)
+        """
+        if self.cache is None:
+            status, content, _ = await self.__request(url, kind, None)
+            return status, content
+
+        entry = await self.__in_thread(self.cache.lookup, url)
+        if self.cache.is_fresh(entry):
+            return 200, entry.content
+
+        status, content, headers = await self.__request(
+            url, kind, self.cache.conditional_headers(entry))
+
+        if status == 304 and entry is not None:
+            await self.__in_thread(self.cache.touch, url)
+            return 200, entry.content
+
+        if status == 200:
+            await self.__in_thread(self.cache.put, url, content, headers)
+        return status, content
+
+
+#--------------------------------------------------------------#
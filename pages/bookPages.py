@@ -1,54 +1,394 @@
 """
-Using requests / BeautifulSoup soup and BookParser to scrape data from a single page
+Using requests / a parser backend and BookParser to scrape data from a single page
 or multiple pages 
 """
 
 #--------------------------------------------------------------#
 # -- IMPORTS --
 
+import time
+import hashlib
 import logging
-import requests
-from bs4 import BeautifulSoup
-from locators import BooksLocator
+from functools import partial
 from parsers import BookParser
-from parsers import InnerBookParser
+from parsers import get_backend
+from parsers import page_url
+from parsers import page_number
+from .fetcher import Fetcher
+from .rateLimiter import RateLimiter
+from .rateLimiter import FetchError
+from metrics import get_metrics
+from .snapshot import Snapshot
 
 #--------------------------------------------------------------#
 # -- LOG --
 
 LOGGER = logging.getLogger("scraper.book_pages")
 
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# shared by every call that is not given its own fetcher
+_DEFAULT_FETCHER = None
+
+# listing pages fetched ahead of the one whose books are being handed over
+PAGES_AHEAD = 4
+
+# the "section ol.row" of BooksLocator.BOOKS as it is written in the page,
+# found in the raw bytes so a page can be fingerprinted without parsing it
+BOOKS_START = b'<ol class="row">'
+BOOKS_END = b"</ol>"
+
 #--------------------------------------------------------------#
 # -- FUNCTIONS --
 
 
-def get_pages_books(page) -> list:
-    """Return a list of books on a single page
+def get_default_fetcher() -> Fetcher:
+    """Return the module wide Fetcher, creating it on first use
+
+    Returns
+    -------
+    Fetcher
+        pooled fetcher shared by calls made without one
+    """
+    global _DEFAULT_FETCHER
+
+    if _DEFAULT_FETCHER is None:
+        _DEFAULT_FETCHER = Fetcher(limiter=RateLimiter())
+    return _DEFAULT_FETCHER
+
+
+def get_pages_books(page, fetcher: Fetcher = None,
+                    snapshot: Snapshot = None, lazy_stock: bool = False) -> list:
+    """Return a list of books on a single page, the stock of each book is
+    fetched with fetcher.map() so a threaded fetcher gets them all at once
 
     Parameters
     ----------
     page : requests.Responce.content
         content obtained from a requests.get() call to a web url
+    fetcher : Fetcher, optional
+        fetcher used for the detail pages (the default is None, which
+        uses the shared default fetcher)
+    snapshot : Snapshot, optional
+        previous scrape, books it still holds a valid stock for skip their
+        detail page (the default is None, which fetches every stock)
+    lazy_stock : bool, optional
+        skip every detail page, stock is left None for a StockResolver
+        to fetch when it is needed (the default is False)
 
     Returns
     -------
     list
         list of BookParse obj's
     """
-    LOGGER.debug(f"GETTING BOOKS FROM PAGE {page.url}")
+    fetcher = fetcher or get_default_fetcher()
+
+    fingerprint, records = reuse_listing(page.url, page.content, snapshot)
+    if records is None:
+        records = parse_listing(page.content)
+    res = [BookParser.from_record(book) for book in records]
+
+    todo = get_stale_books(res, snapshot, lazy_stock)
+    checked = time.time()
 
-    soup = BeautifulSoup(page.content, "html.parser")
-    locator = BooksLocator.BOOKS
+    stocks = fetcher.map(lambda book: get_books_stock(book.link, fetcher), todo)
 
-    res = []
-    for book in soup.select(locator):
-        new_book = BookParser(book)
-        new_book.stock = get_books_stock(new_book.link)
-        res.append(new_book)
+    for book, stock in zip(todo, stocks):
+        book.stock = stock
+        book.stock_checked = checked
+
+    finish_page(page.url, res, todo, snapshot, fingerprint)
     return res
 
 
-def get_books_stock(link: str) -> int:
+def finish_page(url: str, books: list, fetched: list,
+                snapshot: Snapshot = None, fingerprint: str = None):
+    """Called once every book of a listing page has its stock. Logs one
+    record per page in place of one per book, a warning when some of its
+    stock could not be fetched, and hands the page to the snapshot so a
+    Frontier can checkpoint it
+
+    Parameters
+    ----------
+    url : str
+        url of the listing page
+    books : list
+        BookParser's found on the page
+    fetched : list
+        BookParser's whose stock was fetched
+    snapshot : Snapshot, optional
+        snapshot the crawl was given (the default is None)
+    fingerprint : str, optional
+        fingerprint of the page's books, see listing_fingerprint (the
+        default is None)
+    """
+    failed = sum(book.stock == -1 for book in fetched)
+    if failed:
+        LOGGER.warning("PAGE %s, NO STOCK FOR %d OF %d BOOKS",
+                       url, failed, len(fetched))
+    else:
+        LOGGER.debug("PAGE %s, %d BOOKS, %d STOCKS FETCHED",
+                     url, len(books), len(fetched))
+
+    if snapshot is not None:
+        snapshot.page_done(page_number(url), url, books, fingerprint)
+
+
+def listing_fingerprint(content: bytes):
+    """Hash of the books of a listing page, the bytes of its "section
+    ol.row". Pages with the same fingerprint hold the same books
+
+    Parameters
+    ----------
+    content : bytes
+        body of a listing page
+
+    Returns
+    -------
+    str
+        hex digest, None if the page has no list of books
+    """
+    start = content.find(BOOKS_START)
+    end = content.find(BOOKS_END, start)
+    if start == -1 or end == -1:
+        return None
+    return hashlib.blake2b(content[start:end], digest_size=16).hexdigest()
+
+
+def reuse_listing(url: str, content: bytes, snapshot: Snapshot = None) -> tuple:
+    """Fingerprint a listing page and take its books from the snapshot
+    when the page is the same as when the snapshot was scraped
+
+    Parameters
+    ----------
+    url : str
+        url of the listing page
+    content : bytes
+        body of the listing page
+    snapshot : Snapshot, optional
+        previous scrape (the default is None, nothing is reused)
+
+    Returns
+    -------
+    tuple
+        (fingerprint, list of BookRecord's or None when the page has
+        to be parsed)
+    """
+    fingerprint = listing_fingerprint(content)
+    if snapshot is None or fingerprint is None:
+        return fingerprint, None
+
+    return fingerprint, snapshot.reuse_page(url, fingerprint)
+
+
+def record_parse(kind: str, seconds: float, books: int = None):
+    """Add the parse of one page to the metrics
+
+    Parameters
+    ----------
+    kind : str
+        "listing" or "detail"
+    seconds : float
+        time the parse took
+    books : int, optional
+        books found on a listing page (the default is None)
+    """
+    metrics = get_metrics()
+    metrics.observe("scraper_parse_seconds", seconds, kind=kind)
+
+    if books:
+        metrics.inc("scraper_books_parsed_total", books)
+        metrics.observe("scraper_parse_book_seconds", seconds / books)
+
+
+def parse_listing(content: bytes) -> list:
+    """BookRecord's of a listing page, timed into the metrics
+
+    Parameters
+    ----------
+    content : bytes
+        body of a listing page
+
+    Returns
+    -------
+    list
+        list of BookRecord's
+    """
+    start = time.perf_counter()
+    records = get_backend().books(content)
+    record_parse("listing", time.perf_counter() - start, len(records))
+    return records
+
+
+def parse_stock(content: bytes) -> int:
+    """Stock of a book page, timed into the metrics
+
+    Parameters
+    ----------
+    content : bytes
+        body of a book page
+
+    Returns
+    -------
+    int
+        amount of stock
+    """
+    start = time.perf_counter()
+    stock = get_backend().stock(content)
+    record_parse("detail", time.perf_counter() - start)
+    return stock
+
+
+def get_stale_books(books: list, snapshot: Snapshot = None,
+                    lazy_stock: bool = False) -> list:
+    """Fill in stock from the snapshot where possible and return the books
+    whose detail page still has to be fetched, the snapshot is told of them
+
+    Parameters
+    ----------
+    books : list
+        list of BookParse obj's from one listing page
+    snapshot : Snapshot, optional
+        previous scrape (the default is None, every book is stale)
+    lazy_stock : bool, optional
+        no detail page is fetched now, books the snapshot can not fill in
+        get a stock of None, unknown, and a stock_checked of 0 (the default
+        is False)
+
+    Returns
+    -------
+    list
+        list of BookParse obj's that need their stock fetched
+    """
+    if snapshot is None:
+        stale = list(books)
+    else:
+        now = time.time()
+        stale = [book for book in books if not snapshot.reuse_stock(book, now)]
+
+    if lazy_stock:
+        for book in stale:
+            book.stock = None
+        return []
+
+    if snapshot is not None:
+        snapshot.fetching(stale)
+    return stale
+
+
+def get_page_count(content: bytes):
+    """Read the "Page 1 of N" pager of a listing page
+
+    Parameters
+    ----------
+    content : bytes
+        body of a listing page
+
+    Returns
+    -------
+    int
+        amount of pages, None if the page has no pager
+    """
+    return get_backend().page_count(content)
+
+
+def get_shard_pages(shard: int, shards: int, total: int) -> range:
+    """Split pages 1 to total into shards contiguous ranges of about the
+    same size, every page is in exactly one of them
+
+    Parameters
+    ----------
+    shard : int
+        index of the range, 0 to shards - 1
+    shards : int
+        amount of ranges
+    total : int
+        amount of pages
+
+    Raises
+    ------
+    ValueError
+        shard is not a index of shards
+
+    Returns
+    -------
+    range
+        page numbers of the shard, empty when there are more shards then
+        pages
+    """
+    if not 0 <= shard < shards:
+        raise ValueError(f"SHARD {shard} IS NOT ONE OF {shards} SHARDS")
+
+    size, extra = divmod(total, shards)
+    start = 1 + shard * size + min(shard, extra)
+    return range(start, start + size + (shard < extra))
+
+
+def find_shard_pages(shard: int, shards: int, fetcher: Fetcher = None) -> range:
+    """Pages of a shard of the whole site, the first page is fetched for
+    its pager. Every shard gets the same split wherever it runs
+
+    Parameters
+    ----------
+    shard : int
+        index of the shard, 0 to shards - 1
+    shards : int
+        amount of shards
+    fetcher : Fetcher, optional
+        fetcher for the first page (the default is None, which uses the
+        shared default fetcher)
+
+    Raises
+    ------
+    ValueError
+        the first page has no pager, a range of pages has to be given
+        instead
+
+    Returns
+    -------
+    range
+        page numbers of the shard
+    """
+    fetcher = fetcher or get_default_fetcher()
+
+    url = page_url(1)
+    page = fetcher.get(url, "listing")
+    total = 0 if is_past_last_page(url, page.status_code) else get_page_count(page.content)
+
+    if total is None:
+        raise ValueError("NO PAGER ON THE FIRST PAGE, SHARD BY A RANGE OF PAGES")
+    return get_shard_pages(shard, shards, total)
+
+
+def is_past_last_page(url: str, status: int) -> bool:
+    """Check the status of a listing page
+
+    Parameters
+    ----------
+    url : str
+        url of the listing page
+    status : int
+        status code it was answered with
+
+    Raises
+    ------
+    FetchError
+        any status other then 200 or 404
+
+    Returns
+    -------
+    bool
+        True for a 404, which marks the page after the last one
+    """
+    if status == 404:
+        return True
+    if status != 200:
+        raise FetchError(f"{url} ANSWERED {status}")
+    return False
+
+
+def get_books_stock(link: str, fetcher: Fetcher = None) -> int:
     """Use the InnerBookParser class with requsts to get stock amount
     from books link obtained from BookParser
 
@@ -56,45 +396,117 @@ def get_books_stock(link: str) -> int:
     ----------
     link : str
         string format of the url link
+    fetcher : Fetcher, optional
+        fetcher used for the request (the default is None, which
+        uses the shared default fetcher)
     Returns
     -------
     int
-        amount of stock 
+        amount of stock, -1 if the page was not found or kept failing
     """
-    page = requests.get(link)
+    fetcher = fetcher or get_default_fetcher()
 
-    if page.status_code == 404:
+    try:
+        page = fetcher.get(link)
+    except FetchError:
         return -1
 
-    soup = BeautifulSoup(page.content, "html.parser")
-    return InnerBookParser(soup).stock
+    if page.status_code != 200:
+        LOGGER.debug("NO STOCK FOR %s, ANSWERED %d", link, page.status_code)
+        return -1
+
+    return parse_stock(page.content)
 
 
 # PUBLIC
-def get_all_pages_books(idx: int = 1) -> list:
-    """With recursion go over each page on book.toscrape and retrive books using get_pages_books 
-    until a 404 status code is made stopping the loop
-    
+def get_all_pages_books(idx: int = 1, fetcher: Fetcher = None,
+                        snapshot: Snapshot = None, pages: range = None,
+                        shard: tuple = None, lazy_stock: bool = False):
+    """Go over each page on book.toscrape and yield books using get_pages_books.
+    The first page's pager gives the page count so the next listing pages
+    are fetched on the fetcher's threads a few pages ahead, without a pager
+    pages are walked one after another until a 404 status code is made
+    stopping the loop. Only the page being handed over and the few fetched
+    ahead of it are held in memory
+
     Parameters
     ----------
     idx : int, optional
-        number of the page (the default is 1, which the first page)
-    
-    Returns
-    -------
-    list
-        list of BookParse objs
+        number of the first page (the default is 1, which the first page)
+    fetcher : Fetcher, optional
+        fetcher used for every request (the default is None, which
+        uses the shared default fetcher)
+    snapshot : Snapshot, optional
+        previous scrape, only new, changed or old stock is fetched
+        (the default is None, which fetches every stock)
+    pages : range, optional
+        only crawl these pages, idx is ignored (the default is None, every
+        page from idx)
+    shard : tuple, optional
+        (index, count), only crawl that shard of the site's pages, see
+        get_shard_pages (the default is None, every page)
+    lazy_stock : bool, optional
+        skip every detail page, stock is left None for a StockResolver
+        to fetch when it is needed (the default is False)
+
+    Yields
+    ------
+    BookParser
+        books in page order
     """
     # get web page
     LOGGER.info("SCRAPING BOOKS FROM 'BOOKS.TOSCRAPE.COM'")
 
-    page = requests.get(f"http://books.toscrape.com/catalogue/page-{idx}.html")
+    fetcher = fetcher or get_default_fetcher()
 
-    # stop once a 404 error has been made
-    # return an empty array that all books will be appended to
-    if page.status_code == 404:
-        return []
+    if shard is not None:
+        pages = find_shard_pages(*shard, fetcher)
+        LOGGER.debug("SHARD %d OF %d HAS PAGES %s", *shard, pages)
+
+    if pages is not None:
+        # a slice of the site, fetched a few pages ahead
+        urls = [page_url(i) for i in pages]
+        listings = fetcher.imap(partial(fetcher.get, kind="listing"), urls,
+                                PAGES_AHEAD)
+        for url, page in zip(urls, listings):
+            if is_past_last_page(url, page.status_code):
+                return
+
+            yield from get_pages_books(page, fetcher, snapshot, lazy_stock)
+        return
+
+    url = page_url(idx)
+    page = fetcher.get(url, "listing")
+    if is_past_last_page(url, page.status_code):
+        return
+
+    total = get_page_count(page.content)
+
+    yield from get_pages_books(page, fetcher, snapshot, lazy_stock)
+    idx += 1
+
+    if total is not None:
+        LOGGER.debug("PAGER FOUND %d PAGES", total)
+
+        # listing pages are only fetched on the pool, their detail
+        # pages are fetched from here once each one is reached
+        urls = [page_url(i) for i in range(idx, total + 1)]
+        listings = fetcher.imap(partial(fetcher.get, kind="listing"), urls,
+                                PAGES_AHEAD)
+        for url, page in zip(urls, listings):
+            if is_past_last_page(url, page.status_code):
+                return
+
+            yield from get_pages_books(page, fetcher, snapshot, lazy_stock)
+        return
+
+    # no pager, probe until a 404 error has been made
+    while True:
+        url = page_url(idx)
+        page = fetcher.get(url, "listing")
+
+        if is_past_last_page(url, page.status_code):
+            return
 
-    # go to next page plus append current pages books to list
-    # concat arrays array + another array
-    return get_all_pages_books(idx + 1) + get_pages_books(page)
+        yield from get_pages_books(page, fetcher, snapshot, lazy_stock)
+        idx += 1
@@ -0,0 +1,264 @@
+"""
+Pooled requests.Session shared by every request of a crawl, with an
+optional thread-pool used to fetch many pages at once
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import time
+import logging
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from .httpCache import ResponseCache
+from .rateLimiter import RateLimiter
+from metrics import get_metrics
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.fetcher")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# keep-alive connections kept open per host
+POOL_SIZE = 20
+
+# (connect, read) timeout in seconds
+TIMEOUT = (5, 30)
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class Fetcher:
+    """Owns a pooled requests.Session so connections are reused
+    between requests instead of opening a new one each time
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        connections kept open per host (the default is POOL_SIZE)
+    timeout : tuple, optional
+        (connect, read) timeout in seconds (the default is TIMEOUT)
+    workers : int, optional
+        threads used by map(), 1 or less fetches one page after
+        another (the default is 1)
+    cache : ResponseCache, optional
+        on disk cache used by get() (the default is None, no caching)
+    limiter : RateLimiter, optional
+        per host rate and concurrency limits, failed requests are retried
+        (the default is None, no limits or retries)
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, timeout=TIMEOUT,
+                 workers: int = 1, cache: ResponseCache = None,
+                 limiter: RateLimiter = None):
+        self.timeout = timeout
+        self.workers = workers
+        self.cache = cache
+        self.limiter = limiter
+
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+        self.__executor = None
+        if workers > 1:
+            self.__executor = ThreadPoolExecutor(max_workers=workers)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), WORKERS: {self.workers}, TIMEOUT: {self.timeout}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, url: str, kind: str = "detail") -> requests.Response:
+        """Get a web page using the pooled session. With a cache, fresh
+        entries are returned without a request and stale ones are
+        revalidated with a conditional get
+
+        Parameters
+        ----------
+        url : str
+            string format of the url link
+        kind : str, optional
+            "listing" or "detail", labels the request's metrics (the
+            default is "detail")
+
+        Raises
+        ------
+        FetchError
+            with a limiter, the page still failed after every retry
+
+        Returns
+        -------
+        requests.Response
+            the response of the get request
+        """
+        if self.cache is None:
+            return self.__send(url, kind)
+
+        entry = self.cache.lookup(url)
+        if self.cache.is_fresh(entry):
+            return self.__from_cache(entry)
+
+        page = self.__send(url, kind, self.cache.conditional_headers(entry))
+
+        if page.status_code == 304 and entry is not None:
+            self.cache.touch(url)
+            return self.__from_cache(entry)
+
+        if page.status_code == 200:
+            self.cache.put(url, page.content, page.headers)
+        return page
+
+    def __request(self, url: str, kind: str,
+                  headers: dict = None) -> requests.Response:
+        """One request, its latency, status and size go to the metrics"""
+        metrics = get_metrics()
+        start = time.perf_counter()
+
+        try:
+            page = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            metrics.inc("scraper_responses_total", kind=kind, status="error")
+            raise
+        finally:
+            metrics.observe("scraper_request_seconds",
+                            time.perf_counter() - start, kind=kind)
+
+        metrics.inc("scraper_responses_total", kind=kind,
+                    status=page.status_code)
+        metrics.inc("scraper_response_bytes_total", len(page.content),
+                    kind=kind)
+        return page
+
+    def __send(self, url: str, kind: str,
+               headers: dict = None) -> requests.Response:
+        """Request a page, through the limiter with retries if there is one"""
+        if self.limiter is None:
+            return self.__request(url, kind, headers)
+
+        retry = self.limiter.retry
+        for attempt in range(1, retry.retries + 2):
+            limit = self.limiter.acquire(url)
+            start = time.monotonic()
+
+            try:
+                page = self.__request(url, kind, headers)
+            except (requests.Timeout, requests.ConnectionError) as err:
+                self.limiter.release(limit, time.monotonic() - start, True)
+                reason, retry_after = err, None
+            else:
+                if page.status_code not in retry.statuses:
+                    self.limiter.release(limit, time.monotonic() - start, False)
+                    return page
+
+                reason = page.status_code
+                retry_after = page.headers.get("Retry-After")
+                self.limiter.release(limit, time.monotonic() - start, True,
+                                     retry_after)
+
+            if attempt <= retry.retries:
+                time.sleep(retry.delay(attempt, retry_after))
+
+        raise self.limiter.give_up(url, attempt, reason)
+
+    @staticmethod
+    def __from_cache(entry) -> requests.Response:
+        """Build a 200 response from a cache entry"""
+        page = requests.Response()
+        page.status_code = 200
+        page.url = entry.url
+        page._content = entry.content
+        page.headers = CaseInsensitiveDict(
+            {"ETag": entry.etag, "Last-Modified": entry.last_modified})
+        return page
+
+    def map(self, func, items) -> list:
+        """Call func on every item, on the thread-pool when there is one.
+        Results keep the order of items whatever order they finish in
+
+        Parameters
+        ----------
+        func : function
+            called with each item, normally one that uses get()
+        items : iterable
+            items to pass to func
+
+        Returns
+        -------
+        list
+            results of func in the same order as items
+        """
+        if self.__executor is None:
+            return [func(item) for item in items]
+
+        return list(self.__executor.map(func, items))
+
+    def imap(self, func, items, ahead: int = None):
+        """Like map() but results are yielded lazily, in item order, as they
+        are needed. At most ahead items are submitted to the thread-pool
+        before their result is taken, so a slow consumer does not leave
+        every result waiting in memory
+
+        Parameters
+        ----------
+        func : function
+            called with each item, must not itself wait on the thread-pool
+        items : iterable
+            items to pass to func
+        ahead : int, optional
+            items submitted ahead of the one being yielded (the default
+            is None, twice the amount of workers)
+
+        Returns
+        -------
+        iterator
+            results of func in the same order as items
+        """
+        if self.__executor is None:
+            return map(func, items)
+
+        return self.__imap(func, iter(items), ahead or 2 * self.workers)
+
+    def __imap(self, func, items, ahead: int):
+        window = deque(self.__executor.submit(func, item)
+                       for item in islice(items, ahead))
+        try:
+            while window:
+                future = window.popleft()
+                for item in islice(items, 1):
+                    window.append(self.__executor.submit(func, item))
+
+                yield future.result()
+        finally:
+            for future in window:
+                future.cancel()
+
+    def close(self):
+        """Shutdown the thread-pool and close pooled connections"""
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+
+        if self.cache is not None:
+            self.cache.prune()
+
+        self.session.close()
+
+
+#--------------------------------------------------------------#
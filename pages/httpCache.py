@@ -0,0 +1,234 @@
+"""
+On disk cache of web pages keyed by url, bodies are stored gzip compressed
+along with the ETag / Last-Modified headers used to revalidate them
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.http_cache")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+CACHE_DIR = "data/http_cache"
+
+# seconds an entry is used without asking the server
+FRESH_FOR = 60 * 60
+
+# seconds an entry is kept at all, stale entries are still
+# useful as they can be revalidated with a conditional get
+MAX_AGE = 60 * 60 * 24 * 7
+
+# bytes on disk before the oldest entries are removed
+MAX_SIZE = 200 * 1024 * 1024
+
+#--------------------------------------------------------------#
+# -- TUPLE DATA --
+
+CachedPage = namedtuple("CachedPage",
+                        ["url", "content", "etag", "last_modified", "age"])
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class ResponseCache:
+    """Persistent cache of page bodies with conditional get support
+
+    Parameters
+    ----------
+    path : str, optional
+        directory entries are stored in (the default is CACHE_DIR)
+    fresh_for : int, optional
+        seconds an entry is served without revalidation (the default is FRESH_FOR)
+    max_age : int, optional
+        seconds before an entry is removed by prune() (the default is MAX_AGE)
+    max_size : int, optional
+        bytes kept by prune(), oldest entries go first (the default is MAX_SIZE)
+    """
+
+    def __init__(self, path: str = CACHE_DIR, fresh_for: int = FRESH_FOR,
+                 max_age: int = MAX_AGE, max_size: int = MAX_SIZE):
+        self.path = path
+        self.fresh_for = fresh_for
+        self.max_age = max_age
+        self.max_size = max_size
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+        self.__lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), PATH: {self.path}, HITS: {self.hits}, REVALIDATED: {self.revalidated}, MISSES: {self.misses}>"
+
+    def __file(self, url: str) -> str:
+        """Path of the entry for url"""
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, f"{key}.gz")
+
+    def get(self, url: str):
+        """Get the cached entry for url
+
+        Parameters
+        ----------
+        url : str
+            string format of the url link
+
+        Returns
+        -------
+        CachedPage
+            the entry, None if url is not cached
+        """
+        file_name = self.__file(url)
+
+        try:
+            with gzip.open(file_name, "rb") as c_file:
+                header = json.loads(c_file.readline())
+                content = c_file.read()
+            age = time.time() - os.path.getmtime(file_name)
+        except (OSError, EOFError, ValueError):
+            return None
+
+        return CachedPage(url, content, header.get("etag"),
+                          header.get("last_modified"), age)
+
+    def is_fresh(self, entry: CachedPage) -> bool:
+        """True if entry can be used without asking the server"""
+        return entry is not None and entry.age < self.fresh_for
+
+    def lookup(self, url: str):
+        """Same as get() but counts a hit when the entry is fresh and a
+        miss otherwise, so a fetch that then fails is still counted
+
+        Parameters
+        ----------
+        url : str
+            string format of the url link
+
+        Returns
+        -------
+        CachedPage
+            the entry, None if url is not cached
+        """
+        entry = self.get(url)
+        self.__count("hits" if self.is_fresh(entry) else "misses")
+        return entry
+
+    def __count(self, name: str, moved_from: str = None):
+        """Thread safe increment of a counter, moved_from is decremented"""
+        with self.__lock:
+            setattr(self, name, getattr(self, name) + 1)
+            if moved_from is not None:
+                setattr(self, moved_from, getattr(self, moved_from) - 1)
+
+    def conditional_headers(self, entry: CachedPage) -> dict:
+        """Headers for a conditional get of a cached entry
+
+        Parameters
+        ----------
+        entry : CachedPage
+            entry to revalidate, can be None
+
+        Returns
+        -------
+        dict
+            If-None-Match / If-Modified-Since headers
+        """
+        headers = {}
+        if entry is None:
+            return headers
+
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def put(self, url: str, content: bytes, headers):
+        """Store a 200 response body
+
+        Parameters
+        ----------
+        url : str
+            string format of the url link
+        content : bytes
+            body of the page
+        headers : Mapping
+            response headers, only ETag and Last-Modified are kept
+        """
+        header = dict(url=url,
+                      etag=headers.get("ETag"),
+                      last_modified=headers.get("Last-Modified"))
+
+        file_name = self.__file(url)
+        tmp_name = f"{file_name}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_name, "wb") as c_file:
+            c_file.write(json.dumps(header).encode("utf-8") + b"\n")
+            c_file.write(content)
+
+        os.replace(tmp_name, file_name)
+
+    def touch(self, url: str):
+        """Mark an entry as fresh again after a 304 Not Modified, the miss
+        lookup() counted for it is counted as revalidated instead"""
+        try:
+            os.utime(self.__file(url))
+        except OSError:
+            pass
+        self.__count("revalidated", moved_from="misses")
+
+    def prune(self):
+        """Remove entries older than max_age then the oldest entries
+        until the cache is no bigger than max_size"""
+        with self.__lock:
+            now = time.time()
+
+            entries = []
+            for name in os.listdir(self.path):
+                if not name.endswith(".gz"):
+                    continue
+
+                file_name = os.path.join(self.path, name)
+                try:
+                    stat = os.stat(file_name)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+
+            # newest first, kept until max_age or max_size is reached
+            entries.sort(reverse=True)
+
+            size = 0
+            removed = 0
+            for mtime, file_size, file_name in entries:
+                if now - mtime <= self.max_age and size + file_size <= self.max_size:
+                    size += file_size
+                    continue
+
+                try:
+                    os.remove(file_name)
+                    removed += 1
+                except OSError:
+                    pass
+
+            LOGGER.debug("PRUNED %d CACHED PAGES", removed)
+
+
+#--------------------------------------------------------------#
@@ -0,0 +1,174 @@
+"""
+Pool of parse worker processes fed raw page bytes through a bounded queue,
+so CPU bound parsing runs on every core and never stalls the fetchers
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from parsers import get_backend
+from parsers import get_base_url
+from parsers import set_base_url
+from parsers import backends
+from metrics import get_metrics
+from .bookPages import record_parse
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.parse_pool")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# pages fetched but not yet parsed before fetchers have to wait
+QUEUE_SIZE = 64
+
+#--------------------------------------------------------------#
+# -- WORKER FUNCTIONS --
+
+
+def _parse_books(backend: str, base_url: str, content: bytes) -> tuple:
+    """Run in a worker process, list of BookRecord's on a listing page and
+    the seconds it took"""
+    # spawned workers start with the default base url
+    set_base_url(base_url)
+
+    start = time.perf_counter()
+    records = get_backend(backend).books(content)
+    return records, time.perf_counter() - start
+
+
+def _parse_stock(backend: str, base_url: str, content: bytes) -> tuple:
+    """Run in a worker process, stock amount of a book page and the
+    seconds it took"""
+    # same as _parse_books, so a worker is set up whichever it runs first
+    set_base_url(base_url)
+
+    start = time.perf_counter()
+    stock = get_backend(backend).stock(content)
+    return stock, time.perf_counter() - start
+
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class ParsePool:
+    """ProcessPoolExecutor of parse workers. submit() blocks once
+    queue_size pages are waiting to be parsed, pushing back on whatever
+    thread fetched them
+
+    Parameters
+    ----------
+    workers : int, optional
+        parse processes (the default is None, one per cpu)
+    queue_size : int, optional
+        max pages waiting or being parsed (the default is QUEUE_SIZE)
+    backend : str, optional
+        parser backend used by the workers (the default is None, which
+        uses the current default backend)
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = QUEUE_SIZE,
+                 backend: str = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.backend = backend or backends.DEFAULT_BACKEND
+        self.base_url = get_base_url()
+
+        self.__slots = threading.BoundedSemaphore(queue_size)
+        self.__executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        self.__depth = 0
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), WORKERS: {self.workers}, QUEUE: {self.depth}/{self.queue_size}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def depth(self) -> int:
+        """Pages waiting or being parsed"""
+        return self.__depth
+
+    def __release(self, kind: str, result: Future, future: Future):
+        """Free a queue slot once a page is parsed and hand its result on,
+        the parse time goes to the metrics"""
+        with self.__lock:
+            self.__depth -= 1
+            get_metrics().set("scraper_queue_depth", self.__depth, queue="parse")
+        self.__slots.release()
+
+        try:
+            value, seconds = future.result()
+        except BaseException as err:
+            result.set_exception(err)
+            return
+
+        record_parse(kind, seconds, len(value) if kind == "listing" else None)
+        result.set_result(value)
+
+    def __submit(self, func, kind: str, content: bytes) -> Future:
+        """Wait for a free slot then hand content to a worker"""
+        self.__slots.acquire()
+        with self.__lock:
+            self.__depth += 1
+            get_metrics().set("scraper_queue_depth", self.__depth, queue="parse")
+            get_metrics().set_max("scraper_queue_depth_max", self.__depth,
+                                  queue="parse")
+
+        result = Future()
+        future = self.__executor.submit(func, self.backend, self.base_url,
+                                        content)
+        future.add_done_callback(
+            lambda future: self.__release(kind, result, future))
+        return result
+
+    def submit_books(self, content: bytes):
+        """Parse a listing page on a worker
+
+        Parameters
+        ----------
+        content : bytes
+            body of a listing page
+
+        Returns
+        -------
+        concurrent.futures.Future
+            future of a list of BookRecord's
+        """
+        return self.__submit(_parse_books, "listing", content)
+
+    def submit_stock(self, content: bytes):
+        """Parse a book page on a worker
+
+        Parameters
+        ----------
+        content : bytes
+            body of a book page
+
+        Returns
+        -------
+        concurrent.futures.Future
+            future of the stock amount
+        """
+        return self.__submit(_parse_stock, "detail", content)
+
+    def close(self):
+        """Shutdown the worker processes"""
+        self.__executor.shutdown(wait=True)
+
+
+#--------------------------------------------------------------#
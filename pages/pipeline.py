@@ -0,0 +1,183 @@
+"""
+Staged crawl, fetch threads push raw page bytes into a ParsePool of worker
+processes that turn them into book records
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import time
+import logging
+from itertools import chain
+from itertools import count
+from concurrent.futures import Future
+from parsers import BookParser
+from parsers import get_backend
+from parsers import page_url
+from .fetcher import Fetcher
+from .httpCache import ResponseCache
+from .parsePool import ParsePool
+from .parsePool import QUEUE_SIZE
+from .snapshot import Snapshot
+from .bookPages import get_stale_books
+from .bookPages import is_past_last_page
+from .bookPages import finish_page
+from .bookPages import reuse_listing
+from .bookPages import PAGES_AHEAD
+from .rateLimiter import RateLimiter
+from .rateLimiter import FetchError
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.pipeline")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+FETCH_WORKERS = 16
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def _done(value) -> Future:
+    """Future that already holds value"""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+# PUBLIC
+def get_all_pages_books_pipelined(fetch_workers: int = FETCH_WORKERS,
+                                  parse_workers: int = None,
+                                  queue_size: int = QUEUE_SIZE,
+                                  fetcher: Fetcher = None,
+                                  snapshot: Snapshot = None,
+                                  cache: ResponseCache = None,
+                                  limiter: RateLimiter = None,
+                                  pages: range = None,
+                                  lazy_stock: bool = False):
+    """Go over each page on book.toscrape with fetching and parsing split
+    into stages. Fetch threads hand bytes to the parse processes and wait
+    when queue_size pages are already waiting to be parsed, so memory stays
+    bounded however far ahead the fetchers are
+
+    Parameters
+    ----------
+    fetch_workers : int, optional
+        fetch threads, ignored when fetcher is given (the default is FETCH_WORKERS)
+    parse_workers : int, optional
+        parse processes (the default is None, one per cpu)
+    queue_size : int, optional
+        max pages fetched but not parsed (the default is QUEUE_SIZE)
+    fetcher : Fetcher, optional
+        fetcher for every request, should have workers for the stages to
+        overlap (the default is None, which makes one with fetch_workers)
+    snapshot : Snapshot, optional
+        previous scrape, only new, changed or old stock is fetched
+        (the default is None, which fetches every stock)
+    cache : ResponseCache, optional
+        on disk cache, ignored when fetcher is given (the default is None,
+        no caching)
+    limiter : RateLimiter, optional
+        per host limits and retries, ignored when fetcher is given (the
+        default is None, no limits or retries)
+    pages : range, optional
+        only crawl these pages, see get_shard_pages (the default is None,
+        every page)
+    lazy_stock : bool, optional
+        skip every detail page, stock is left None for a StockResolver
+        to fetch when it is needed (the default is False)
+
+    Yields
+    ------
+    BookParser
+        books in page order
+    """
+    LOGGER.info("SCRAPING BOOKS FROM 'BOOKS.TOSCRAPE.COM'")
+
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = Fetcher(pool_size=fetch_workers, workers=fetch_workers,
+                          cache=cache, limiter=limiter)
+
+    pool = ParsePool(parse_workers, queue_size)
+
+    def submit_listing(url, content):
+        # an unchanged page is not sent to the pool at all
+        fingerprint, records = reuse_listing(url, content, snapshot)
+        if records is None:
+            return fingerprint, pool.submit_books(content)
+        return fingerprint, _done(records)
+
+    def fetch_listing(url):
+        page = fetcher.get(url, "listing")
+
+        # a 404 marks the page after the last one
+        if is_past_last_page(url, page.status_code):
+            return None, _done(None)
+        return submit_listing(url, page.content)
+
+    def fetch_stock(link):
+        try:
+            page = fetcher.get(link)
+        except FetchError:
+            return _done(-1)
+
+        if page.status_code != 200:
+            LOGGER.debug("NO STOCK FOR %s, ANSWERED %d", link, page.status_code)
+            return _done(-1)
+        return pool.submit_stock(page.content)
+
+    try:
+        if pages is not None:
+            # a slice of the site, fetched a few pages ahead
+            numbers = pages
+            listings = fetcher.imap(fetch_listing,
+                                    [page_url(idx) for idx in pages],
+                                    PAGES_AHEAD)
+        else:
+            numbers = count(1)
+
+            first = fetcher.get(page_url(1), "listing")
+            if is_past_last_page(first.url, first.status_code):
+                return
+
+            total = get_backend().page_count(first.content)
+            first = submit_listing(page_url(1), first.content)
+
+            if total is not None:
+                # listing pages are fetched a few pages ahead
+                urls = [page_url(idx) for idx in range(2, total + 1)]
+                listings = chain([first], fetcher.imap(fetch_listing, urls,
+                                                      PAGES_AHEAD))
+            else:
+                # without a pager pages are read until a 404
+                urls = (page_url(idx) for idx in count(2))
+                listings = chain([first], map(fetch_listing, urls))
+
+        for idx, (fingerprint, listing) in zip(numbers, listings):
+            records = listing.result()
+            if records is None:
+                return
+
+            books = [BookParser.from_record(record) for record in records]
+
+            todo = get_stale_books(books, snapshot, lazy_stock)
+            checked = time.time()
+
+            futures = fetcher.map(lambda book: fetch_stock(book.link), todo)
+            for book, future in zip(todo, futures):
+                book.stock = future.result()
+                book.stock_checked = checked
+
+            finish_page(page_url(idx), books, todo, snapshot, fingerprint)
+            yield from books
+    finally:
+        pool.close()
+        if own_fetcher:
+            fetcher.close()
+
+
+#--------------------------------------------------------------#
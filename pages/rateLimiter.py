@@ -0,0 +1,422 @@
+"""
+Per host rate limiting for the fetchers. A token bucket caps requests per
+second, an AIMD limit on requests in flight backs off on 429/503 and
+timeouts and grows back while latency is healthy, and failed requests are
+retried after a jittered exponential delay
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from urllib.parse import urlsplit
+from metrics import get_metrics
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.rate_limiter")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# requests per second per host, and how many can be sent at once after
+# idling. None leaves the pace to the AIMD limit on requests in flight
+RATE = 10.0
+BURST = 20
+
+# requests per second of hosts paced other then RATE, by host[:port]
+HOST_RATES = {}
+
+# requests in flight per host, the limit moves between MIN and MAX
+CONCURRENCY = 8
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 64
+
+# responses slower then this stop the limit growing, seconds
+LATENCY_TARGET = 1.0
+
+# the limit is multiplied by this on overload
+BACKOFF = 0.5
+
+# retries after the first attempt, first delay and max delay in seconds
+RETRIES = 4
+RETRY_BASE = 0.5
+RETRY_CAP = 30.0
+
+# status codes that mean the server is overloaded or briefly broken
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+#--------------------------------------------------------------#
+# -- CUSTOM ERRORS --
+
+
+class FetchError(Exception):
+    """Custom exception, a page still failed after every retry
+    """
+
+    def __init__(self, msg):
+        super(FetchError, self).__init__(msg)
+
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class TokenBucket:
+    """Tokens refill at rate per second up to burst, every request takes
+    one. Tokens can be reserved ahead, the caller waits out the debt
+
+    Parameters
+    ----------
+    rate : float
+        tokens per second, None for no limit
+    burst : int, optional
+        max tokens saved up (the default is None, one second of tokens)
+    """
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.burst = burst or max(1, rate or 1)
+        self.tokens = self.burst
+        self.__stamp = time.monotonic()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), RATE: {self.rate}, TOKENS: {self.tokens:.1f}>"
+
+    def __refill(self, now: float):
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.__stamp) * self.rate)
+        self.__stamp = now
+
+    def reserve(self, now: float = None) -> float:
+        """Take a token
+
+        Parameters
+        ----------
+        now : float, optional
+            time.monotonic() (the default is None, the current time)
+
+        Returns
+        -------
+        float
+            seconds to wait before the token can be used
+        """
+        if self.rate is None:
+            return 0.0
+
+        self.__refill(time.monotonic() if now is None else now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, seconds: float, now: float = None):
+        """Hold off every request for seconds, used for Retry-After
+
+        Parameters
+        ----------
+        seconds : float
+            seconds before the next token
+        now : float, optional
+            time.monotonic() (the default is None, the current time)
+        """
+        if self.rate is None:
+            return
+
+        self.__refill(time.monotonic() if now is None else now)
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class AimdLimit:
+    """Requests in flight for one host. The limit grows by one for every
+    limit requests answered within latency_target and is cut by backoff on
+    overload, at most once per latency_target so one burst of errors only
+    counts once
+
+    Parameters
+    ----------
+    initial : int, optional
+        starting limit (the default is CONCURRENCY)
+    minimum : int, optional
+        lowest limit (the default is MIN_CONCURRENCY)
+    maximum : int, optional
+        highest limit (the default is MAX_CONCURRENCY)
+    latency_target : float, optional
+        seconds, slower responses hold the limit (the default is LATENCY_TARGET)
+    backoff : float, optional
+        limit is multiplied by this on overload (the default is BACKOFF)
+    """
+
+    def __init__(self, initial: int = CONCURRENCY,
+                 minimum: int = MIN_CONCURRENCY,
+                 maximum: int = MAX_CONCURRENCY,
+                 latency_target: float = LATENCY_TARGET,
+                 backoff: float = BACKOFF):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.backoff = backoff
+
+        self.in_flight = 0
+        self.__decreased = float("-inf")
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), LIMIT: {self.limit:.1f}, IN FLIGHT: {self.in_flight}>"
+
+    def try_start(self) -> bool:
+        """Count a request as in flight if there is room for it"""
+        if self.in_flight >= int(self.limit):
+            return False
+
+        self.in_flight += 1
+        return True
+
+    def finish(self, latency: float, overloaded: bool, now: float = None):
+        """Count a request as done and move the limit
+
+        Parameters
+        ----------
+        latency : float
+            seconds the request took
+        overloaded : bool
+            the server answered 429/5xx or timed out
+        now : float, optional
+            time.monotonic() (the default is None, the current time)
+        """
+        self.in_flight -= 1
+        now = time.monotonic() if now is None else now
+
+        if overloaded:
+            if now - self.__decreased >= self.latency_target:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self.__decreased = now
+                LOGGER.debug("OVERLOADED, LIMIT DOWN TO %d", self.limit)
+        elif latency <= self.latency_target:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+
+class RetryPolicy:
+    """Which failures are retried and how long to wait before each retry,
+    full jitter over an exponential delay so clients do not retry in step
+
+    Parameters
+    ----------
+    retries : int, optional
+        retries after the first attempt (the default is RETRIES)
+    base : float, optional
+        delay before the first retry in seconds (the default is RETRY_BASE)
+    cap : float, optional
+        longest delay in seconds (the default is RETRY_CAP)
+    statuses : frozenset, optional
+        status codes that are retried (the default is RETRY_STATUSES)
+    """
+
+    def __init__(self, retries: int = RETRIES, base: float = RETRY_BASE,
+                 cap: float = RETRY_CAP, statuses: frozenset = RETRY_STATUSES):
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+        self.statuses = statuses
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), RETRIES: {self.retries}, BASE: {self.base}, CAP: {self.cap}>"
+
+    def delay(self, attempt: int, retry_after: str = None) -> float:
+        """Seconds to wait before retrying
+
+        Parameters
+        ----------
+        attempt : int
+            attempts already made, starting at 1
+        retry_after : str, optional
+            Retry-After header in seconds, used as the least delay
+            (the default is None)
+
+        Returns
+        -------
+        float
+            seconds to wait
+        """
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** (attempt - 1)))
+
+        try:
+            return max(delay, min(self.cap, float(retry_after)))
+        except (TypeError, ValueError):
+            return delay
+
+
+class HostLimit:
+    """Token bucket and AIMD limit of one host"""
+
+    def __init__(self, host: str, rate: float = RATE, burst: int = BURST,
+                 **aimd):
+        self.host = host
+        self.bucket = TokenBucket(rate, burst)
+        self.aimd = AimdLimit(**aimd)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), HOST: {self.host}, LIMIT: {self.aimd.limit:.1f}, IN FLIGHT: {self.aimd.in_flight}>"
+
+
+class RateLimiter:
+    """Limits of every host fetched from, made the first time a host is
+    seen. Used from many threads by Fetcher, AsyncRateLimiter is the same
+    for one event loop
+
+    Parameters
+    ----------
+    retry : RetryPolicy, optional
+        retries of failed requests (the default is None, RetryPolicy())
+    hosts : dict, optional
+        host to dict of HostLimit arguments, overrides the defaults for
+        that host (the default is None)
+    **defaults
+        HostLimit arguments for every host, rate, burst, initial,
+        minimum, maximum, latency_target and backoff. The rate of a host
+        is otherwise its HOST_RATES entry or RATE
+
+    Example
+    -------
+        >> limiter = RateLimiter(rate=10, hosts={"books.toscrape.com": dict(rate=5)})
+        >> fetcher = Fetcher(workers=16, limiter=limiter)
+    """
+
+    def __init__(self, retry: RetryPolicy = None, hosts: dict = None,
+                 **defaults):
+        self.retry = retry or RetryPolicy()
+        self.defaults = defaults
+        self.overrides = hosts or {}
+
+        self.hosts = {}
+        self.overloaded = 0
+        self.failed = 0
+
+        self.__lock = threading.Condition()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), HOSTS: {list(self.hosts.values())}, OVERLOADED: {self.overloaded}, FAILED: {self.failed}>"
+
+    def host(self, url: str) -> HostLimit:
+        """Limits of the host of url"""
+        host = urlsplit(url).netloc
+        limit = self.hosts.get(host)
+        if limit is None:
+            limit = self.hosts[host] = HostLimit(
+                host, **{"rate": HOST_RATES.get(host, RATE), **self.defaults,
+                         **self.overrides.get(host, {})})
+        return limit
+
+    def acquire(self, url: str) -> HostLimit:
+        """Wait for room in the host's limit and for a token
+
+        Parameters
+        ----------
+        url : str
+            url about to be requested
+
+        Returns
+        -------
+        HostLimit
+            to hand back to release()
+        """
+        with self.__lock:
+            limit = self.host(url)
+            while not limit.aimd.try_start():
+                self.__lock.wait()
+            wait = limit.bucket.reserve()
+
+        if wait > 0:
+            time.sleep(wait)
+        return limit
+
+    def release(self, limit: HostLimit, latency: float, overloaded: bool,
+                retry_after: str = None):
+        """Count a request of acquire() as done
+
+        Parameters
+        ----------
+        limit : HostLimit
+            what acquire() returned
+        latency : float
+            seconds the request took
+        overloaded : bool
+            the server answered a retried status or timed out
+        retry_after : str, optional
+            Retry-After header, pauses the host (the default is None)
+        """
+        with self.__lock:
+            limit.aimd.finish(latency, overloaded)
+            get_metrics().set("scraper_concurrency_limit",
+                              int(limit.aimd.limit), host=limit.host)
+            if overloaded:
+                self.overloaded += 1
+                get_metrics().inc("scraper_retries_total", host=limit.host)
+            if retry_after is not None:
+                self.__pause(limit, retry_after)
+            self.__lock.notify_all()
+
+    def give_up(self, url: str, attempts: int, reason) -> FetchError:
+        """Count a request that failed every attempt
+
+        Parameters
+        ----------
+        url : str
+            url that failed
+        attempts : int
+            attempts made
+        reason
+            last status code or exception
+
+        Returns
+        -------
+        FetchError
+            error for the caller to raise
+        """
+        with self.__lock:
+            self.failed += 1
+
+        LOGGER.warning("GAVE UP ON %s AFTER %d ATTEMPTS, %s", url, attempts, reason)
+        return FetchError(f"{url} FAILED AFTER {attempts} ATTEMPTS, {reason}")
+
+    def __pause(self, limit: HostLimit, retry_after: str):
+        try:
+            limit.bucket.pause(min(self.retry.cap, float(retry_after)))
+        except ValueError:
+            pass
+
+
+class AsyncRateLimiter(RateLimiter):
+    """RateLimiter for AsyncFetcher, waits without blocking the event loop.
+    Must be used from one event loop"""
+
+    def __init__(self, retry: RetryPolicy = None, hosts: dict = None,
+                 **defaults):
+        super().__init__(retry, hosts, **defaults)
+        self.__freed = None
+
+    async def acquire(self, url: str) -> HostLimit:
+        if self.__freed is None:
+            self.__freed = asyncio.Condition()
+
+        async with self.__freed:
+            limit = self.host(url)
+            while not limit.aimd.try_start():
+                await self.__freed.wait()
+            wait = limit.bucket.reserve()
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return limit
+
+    async def release(self, limit: HostLimit, latency: float,
+                      overloaded: bool, retry_after: str = None):
+        async with self.__freed:
+            RateLimiter.release(self, limit, latency, overloaded, retry_after)
+            self.__freed.notify_all()
+
+
+#--------------------------------------------------------------#
@@ -0,0 +1,180 @@
+"""
+Books of a previous scrape keyed by link, used by an incremental scrape
+to only fetch the detail pages of new or changed books and to skip parsing
+listing pages that have not changed
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import time
+import logging
+import threading
+from parsers import BookRecord
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.snapshot")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# seconds a stock amount is trusted before its detail page is fetched again
+STOCK_TTL = 60 * 60 * 24
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class Snapshot:
+    """Previous scrapes books, a book can reuse its old stock when its
+    title, price and rating are the same and the stock is not too old.
+    A listing page whose fingerprint is the same as in the previous scrape
+    reuses its books without being parsed
+
+    Parameters
+    ----------
+    books : list
+        list of book dict's from an earlier scrape, books without
+        a link are ignored
+    ttl : int, optional
+        seconds a stock amount is trusted (the default is STOCK_TTL)
+    pages : dict, optional
+        fingerprint and book links of each listing page of the earlier
+        scrape by url, as in self.fingerprints (the default is None)
+    """
+
+    def __init__(self, books: list, ttl: int = STOCK_TTL,
+                 pages: dict = None):
+        self.ttl = ttl
+        self.books = {
+            book["link"]: book
+            for book in books if book.get("link")
+        }
+        self.pages = pages or {}
+
+        # fingerprints of the pages of this scrape, the pages of the next
+        self.fingerprints = {}
+
+        self.reused = 0
+        self.refetched = 0
+        self.page_hits = 0
+        self.page_misses = 0
+
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), BOOKS: {len(self.books)}, REUSED: {self.reused}, REFETCHED: {self.refetched}>"
+
+    def __len__(self):
+        return len(self.books)
+
+    def reuse_stock(self, book, now: float = None) -> bool:
+        """Copy the stock of the same book from the snapshot onto book
+
+        Parameters
+        ----------
+        book : BookParser
+            freshly parsed book from a listing page
+        now : float, optional
+            current time (the default is None, which uses time.time())
+
+        Returns
+        -------
+        bool
+            True if the stock was reused, False if the detail
+            page needs to be fetched
+        """
+        now = time.time() if now is None else now
+
+        old = self.books.get(book.link)
+        reuse = (old is not None
+                 and old.get("title") == book.title
+                 and old.get("price") == book.price
+                 and old.get("rating") == book.rating
+                 and now - old.get("stock_checked", 0) <= self.ttl)
+
+        if reuse:
+            with self.__lock:
+                self.reused += 1
+            book.stock = old.get("stock")
+            book.stock_checked = old.get("stock_checked")
+        return reuse
+
+    def fetching(self, books: list):
+        """Called by the crawl with the books of a listing page whose detail
+        pages are about to be fetched, not with the books of a lazy crawl
+
+        Parameters
+        ----------
+        books : list
+            BookParser's reuse_stock could not fill in
+        """
+        with self.__lock:
+            self.refetched += len(books)
+
+    def reuse_page(self, url: str, fingerprint: str):
+        """Books of a listing page that has not changed since the snapshot
+
+        Parameters
+        ----------
+        url : str
+            url of the listing page
+        fingerprint : str
+            fingerprint of the page now, see listing_fingerprint
+
+        Returns
+        -------
+        list
+            list of BookRecord's in page order, None if the page changed
+            or some of its books are not in the snapshot
+        """
+        if not self.pages:
+            return None
+
+        page = self.pages.get(url)
+        reuse = (page is not None
+                 and page.get("fingerprint") == fingerprint
+                 and all(link in self.books for link in page["links"]))
+
+        with self.__lock:
+            if reuse:
+                self.page_hits += 1
+            else:
+                self.page_misses += 1
+
+        if not reuse:
+            return None
+
+        return [BookRecord(*(self.books[link].get(field)
+                             for field in BookRecord._fields))
+                for link in page["links"]]
+
+    def page_done(self, page: int, url: str, books: list,
+                  fingerprint: str = None):
+        """Called by the crawl once every book of a listing page has its
+        stock, its fingerprint is kept for the next scrape. A Frontier
+        also checkpoints the page
+
+        Parameters
+        ----------
+        page : int
+            index of the listing page, None if url is not a listing page
+        url : str
+            url of the listing page
+        books : list
+            BookParser's of the page
+        fingerprint : str, optional
+            fingerprint of the page, see listing_fingerprint (the default
+            is None, nothing is kept)
+        """
+        if fingerprint is None:
+            return
+
+        with self.__lock:
+            self.fingerprints[url] = dict(fingerprint=fingerprint,
+                                          links=[book.link for book in books])
+
+
+#--------------------------------------------------------------#
@@ -0,0 +1,226 @@
+"""
+Stock of books fetched when it is first needed instead of during the
+crawl. Books a query returns are resolved together on a thread pool and
+every answer is remembered until it is too old
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from .fetcher import Fetcher
+from .bookPages import get_books_stock
+from .rateLimiter import RateLimiter
+from .snapshot import STOCK_TTL
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.stock_resolver")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# detail pages fetched at once
+WORKERS = 16
+
+# stock amounts remembered, the least recently used go first
+MAX_SIZE = 10000
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def _field(book, name: str):
+    """Field of a book dict or BookParser, None when a legacy book has none"""
+    return book.get(name) if isinstance(book, dict) else getattr(book, name, None)
+
+
+def _set_stock(book, stock: int, checked: float):
+    if isinstance(book, dict):
+        book["stock"] = stock
+        book["stock_checked"] = checked
+    else:
+        book.stock = stock
+        book.stock_checked = checked
+
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class StockResolver:
+    """Fetches the stock of books crawled with lazy_stock, or whose stock
+    is older then ttl. Answers are kept for ttl seconds so asking again
+    costs no requests
+
+    Parameters
+    ----------
+    fetcher : Fetcher, optional
+        fetcher for the detail pages (the default is None, which makes one
+        with WORKERS threads and a RateLimiter)
+    ttl : int, optional
+        seconds a stock amount is trusted (the default is STOCK_TTL)
+    max_size : int, optional
+        stock amounts remembered (the default is MAX_SIZE)
+
+    Example
+    -------
+        >> books = list(crawl_all_pages_books(lazy_stock=True))
+        >> with StockResolver() as resolver:
+        ..     cheapest = resolver.resolve(get_cheepest_books(books, 10))
+    """
+
+    def __init__(self, fetcher: Fetcher = None, ttl: int = STOCK_TTL,
+                 max_size: int = MAX_SIZE):
+        self.own_fetcher = fetcher is None
+        self.fetcher = fetcher or Fetcher(pool_size=WORKERS, workers=WORKERS,
+                                          limiter=RateLimiter())
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.hits = 0
+        self.fetched = 0
+
+        self.__stocks = OrderedDict()
+        self.__every = None
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), CACHED: {len(self.__stocks)}, HITS: {self.hits}, FETCHED: {self.fetched}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the fetcher if it was made here"""
+        if self.own_fetcher:
+            self.fetcher.close()
+
+    def is_fresh(self, checked: float, now: float = None) -> bool:
+        """A stock read at checked can still be trusted, 0 is never"""
+        now = time.time() if now is None else now
+        return bool(checked) and now - checked <= self.ttl
+
+    def __cached(self, link: str, now: float):
+        with self.__lock:
+            cached = self.__stocks.get(link)
+            if cached is None or not self.is_fresh(cached[1], now):
+                return None
+
+            self.__stocks.move_to_end(link)
+            self.hits += 1
+            return cached
+
+    def __remember(self, link: str, stock: int, checked: float):
+        with self.__lock:
+            self.__stocks[link] = (stock, checked)
+            self.__stocks.move_to_end(link)
+            while len(self.__stocks) > self.max_size:
+                self.__stocks.popitem(last=False)
+
+    def resolve(self, books: list, now: float = None) -> list:
+        """Fill in the stock of books that do not have a fresh one, each
+        link is fetched once however often it appears. Books without a
+        link, as in legacy json, are left as they are
+
+        Parameters
+        ----------
+        books : list
+            book dict's or BookParser's, changed in place
+        now : float, optional
+            current time (the default is None, which uses time.time())
+
+        Returns
+        -------
+        list
+            books
+        """
+        now = time.time() if now is None else now
+
+        todo = {}
+        for book in books:
+            if self.is_fresh(_field(book, "stock_checked"), now):
+                continue
+
+            link = _field(book, "link")
+            if not link:
+                continue
+
+            cached = self.__cached(link, now)
+            if cached is None:
+                todo.setdefault(link, []).append(book)
+            else:
+                _set_stock(book, *cached)
+
+        if todo:
+            LOGGER.debug("FETCHING STOCK OF %d BOOKS", len(todo))
+
+            links = list(todo)
+            stocks = self.fetcher.map(
+                lambda link: get_books_stock(link, self.fetcher), links)
+            checked = time.time()
+
+            for link, stock in zip(links, stocks):
+                self.fetched += 1
+
+                # failures are asked for again next time
+                if stock == -1:
+                    checked_at = 0
+                else:
+                    checked_at = checked
+                    self.__remember(link, stock, checked)
+
+                for book in todo[link]:
+                    _set_stock(book, stock, checked_at)
+
+        return books
+
+    def resolve_every(self, books, build=list, now: float = None):
+        """Resolve a copy of every book, for a query that orders by stock.
+        What build makes of them is remembered and given back for the same
+        books until the oldest stock in it is older then ttl, so asking
+        again neither resolves nor builds anything
+
+        Parameters
+        ----------
+        books : iterable
+            book dict's, left as they are
+        build : function, optional
+            called once with the resolved list, e.g. BookIndex (the default
+            is list)
+        now : float, optional
+            current time (the default is None, which uses time.time())
+
+        Returns
+        -------
+        object
+            what build returned
+        """
+        now = time.time() if now is None else now
+
+        with self.__lock:
+            every = self.__every
+        if every is not None and every[0] is books and self.is_fresh(every[1], now):
+            return every[2]
+
+        resolved = self.resolve([dict(book) for book in books], now)
+
+        # a failed stock is 0 and is asked for again next time
+        checked = min((_field(book, "stock_checked") or 0
+                       for book in resolved if _field(book, "link")),
+                      default=now)
+        built = build(resolved)
+
+        with self.__lock:
+            self.__every = (books, checked, built)
+        return built
+
+
+#--------------------------------------------------------------#
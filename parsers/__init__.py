@@ -1,2 +1,12 @@
 from .bookParser import BookParser
+from .bookParser import BookRecord
+from .bookParser import parse_book
 from .innerBookParser import InnerBookParser
+from .pagerParser import PagerParser
+from .backends import BACKENDS
+from .backends import get_backend
+from .backends import set_default_backend
+from .siteUrls import set_base_url
+from .siteUrls import get_base_url
+from .siteUrls import page_url
+from .siteUrls import page_number
@@ -0,0 +1,322 @@
+"""
+HTML parser backends, each one turns the raw bytes of a listing or book page
+into BookRecords / stock / page count using the css selectors in locators
+"""
+
+#--------------------------------------------------------------#
+# IMPORTS
+
+import logging
+import soupsieve
+from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
+from locators import BooksLocator
+from locators import BookInfoLocators
+from locators import PagerLocator
+from locators import bookPagesInfoLocators
+from .bookParser import build_record
+from .bookParser import parse_book
+from .innerBookParser import parse_stock_text
+from .pagerParser import parse_pager_text
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+#--------------------------------------------------------------#
+# LOG
+
+LOGGER = logging.getLogger("scrape.backends")
+
+#--------------------------------------------------------------#
+# FUNCTIONS
+
+
+def last_compound(selector: str) -> str:
+    """Last compound of a css selector, "section ol.row li.col-xs-6"
+    gives "li.col-xs-6"
+
+    Parameters
+    ----------
+    selector : str
+        descendant css selector
+
+    Returns
+    -------
+    str
+        the part matching the wanted tag itself
+    """
+    return selector.split()[-1]
+
+
+def make_strainer(selector: str) -> SoupStrainer:
+    """SoupStrainer keeping only the tags matched by the last compound of
+    a "tag.class" style selector, along with everything inside them
+
+    Parameters
+    ----------
+    selector : str
+        css selector from locators
+
+    Returns
+    -------
+    SoupStrainer
+        strainer to pass as parse_only
+    """
+    name, *classes = last_compound(selector).split(".")
+
+    def has_classes(value):
+        # while parsing the class attribute can still be one string
+        if value is None:
+            return False
+        if isinstance(value, str):
+            value = value.split()
+        return all(cls in value for cls in classes)
+
+    return SoupStrainer(name or True, class_=has_classes if classes else None)
+
+
+#--------------------------------------------------------------#
+# CLASS
+
+
+class Bs4Backend:
+    """BeautifulSoup backend, with partial set only the tags the selectors
+    need are built instead of the whole document. Selectors are compiled
+    once, the fields of each book use the ones of bookParser
+
+    Parameters
+    ----------
+    features : str, optional
+        parser used by BeautifulSoup (the default is "html.parser")
+    partial : bool, optional
+        parse with a SoupStrainer (the default is False)
+    """
+
+    def __init__(self, features: str = "html.parser", partial: bool = False):
+        self.features = features
+        self.partial = partial
+
+        # a strained tree has lost the ancestors of the kept tags so only
+        # the last compound of each selector can be used on it
+        locate = last_compound if partial else (lambda selector: selector)
+
+        self.__books = soupsieve.compile(locate(BooksLocator.BOOKS))
+        self.__stock = soupsieve.compile(locate(bookPagesInfoLocators.STOCK))
+        self.__pager = soupsieve.compile(locate(PagerLocator.CURRENT))
+
+        self.__strainers = dict(
+            books=make_strainer(BooksLocator.BOOKS),
+            stock=make_strainer(bookPagesInfoLocators.STOCK),
+            pager=make_strainer(PagerLocator.CURRENT))
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), FEATURES: {self.features}, PARTIAL: {self.partial}>"
+
+    def __soup(self, content: bytes, kind: str) -> BeautifulSoup:
+        """Parse content, only keeping the kind's tags when partial"""
+        strainer = self.__strainers[kind] if self.partial else None
+        return BeautifulSoup(content, self.features, parse_only=strainer)
+
+    def books(self, content: bytes) -> list:
+        """Get every book on a listing page
+
+        Parameters
+        ----------
+        content : bytes
+            body of a listing page
+
+        Returns
+        -------
+        list
+            list of BookRecord's
+        """
+        soup = self.__soup(content, "books")
+
+        try:
+            return [parse_book(book) for book in self.__books.select(soup)]
+        finally:
+            # the tree is full of parent / child cycles, taking it apart
+            # frees it now instead of at the next garbage collection
+            soup.decompose()
+
+    def stock(self, content: bytes) -> int:
+        """Get the stock amount of a book page
+
+        Parameters
+        ----------
+        content : bytes
+            body of a book page
+
+        Returns
+        -------
+        int
+            amount of stock
+        """
+        soup = self.__soup(content, "stock")
+        try:
+            return parse_stock_text(self.__stock.select_one(soup).text)
+        finally:
+            soup.decompose()
+
+    def page_count(self, content: bytes):
+        """Get the page count from a listing pages pager
+
+        Parameters
+        ----------
+        content : bytes
+            body of a listing page
+
+        Returns
+        -------
+        int
+            amount of pages, None if there is no pager
+        """
+        soup = self.__soup(content, "pager")
+        try:
+            find = self.__pager.select_one(soup)
+            return parse_pager_text(find.text if find else None)[1]
+        finally:
+            soup.decompose()
+
+
+class SelectolaxBackend:
+    """selectolax (lexbor) backend, a C parser many times quicker
+    than BeautifulSoup using the same css selectors"""
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}()>"
+
+    def books(self, content: bytes) -> list:
+        """Get every book on a listing page
+
+        Parameters
+        ----------
+        content : bytes
+            body of a listing page
+
+        Returns
+        -------
+        list
+            list of BookRecord's
+        """
+        tree = LexborHTMLParser(content)
+
+        res = []
+        for book in tree.css(BooksLocator.BOOKS):
+            attrs = book.css_first(BookInfoLocators.ATTR).attributes
+            rating = book.css_first(BookInfoLocators.RATING).attributes
+            res.append(
+                build_record(attrs.get("title") or "",
+                             attrs.get("href") or "",
+                             book.css_first(BookInfoLocators.PRICE).text(),
+                             (rating.get("class") or "").split()))
+        return res
+
+    def stock(self, content: bytes) -> int:
+        """Get the stock amount of a book page
+
+        Parameters
+        ----------
+        content : bytes
+            body of a book page
+
+        Returns
+        -------
+        int
+            amount of stock
+        """
+        tree = LexborHTMLParser(content)
+        return parse_stock_text(
+            tree.css_first(bookPagesInfoLocators.STOCK).text())
+
+    def page_count(self, content: bytes):
+        """Get the page count from a listing pages pager
+
+        Parameters
+        ----------
+        content : bytes
+            body of a listing page
+
+        Returns
+        -------
+        int
+            amount of pages, None if there is no pager
+        """
+        find = LexborHTMLParser(content).css_first(PagerLocator.CURRENT)
+        return parse_pager_text(find.text() if find else None)[1]
+
+
+#--------------------------------------------------------------#
+# GLOBALS
+
+# every backend that can be built here by name
+BACKENDS = {
+    "bs4": lambda: Bs4Backend("html.parser"),
+    "bs4-partial": lambda: Bs4Backend("html.parser", partial=True),
+}
+
+if lxml is not None:
+    BACKENDS["bs4-lxml"] = lambda: Bs4Backend("lxml", partial=True)
+
+if LexborHTMLParser is not None:
+    BACKENDS["selectolax"] = SelectolaxBackend
+
+# quickest backend available
+DEFAULT_BACKEND = "selectolax" if "selectolax" in BACKENDS else "bs4"
+
+_BACKEND_CACHE = {}
+
+#--------------------------------------------------------------#
+# FUNCTIONS
+
+
+def get_backend(name: str = None):
+    """Get a parser backend by name
+
+    Parameters
+    ----------
+    name : str, optional
+        key of BACKENDS (the default is None, which uses DEFAULT_BACKEND)
+
+    Raises
+    ------
+    KeyError
+        backend is unknown or its library is not installed
+
+    Returns
+    -------
+    Bs4Backend or SelectolaxBackend
+        the backend, built once per name
+    """
+    name = name or DEFAULT_BACKEND
+
+    if name not in BACKENDS:
+        raise KeyError(f"PARSER BACKEND {name} IS NOT AVAILABLE")
+
+    if name not in _BACKEND_CACHE:
+        _BACKEND_CACHE[name] = BACKENDS[name]()
+    return _BACKEND_CACHE[name]
+
+
+def set_default_backend(name: str):
+    """Set the backend used when no name is given
+
+    Parameters
+    ----------
+    name : str
+        key of BACKENDS
+    """
+    global DEFAULT_BACKEND
+
+    get_backend(name)
+    DEFAULT_BACKEND = name
+
+
+#--------------------------------------------------------------#
@@ -8,26 +8,129 @@ to then be returned
 
 import re
 import logging
+from collections import namedtuple
+import soupsieve
 from bs4.element import Tag as soupTag
 from locators import BookInfoLocators
+from .siteUrls import book_url
 
 #--------------------------------------------------------------#
 # LOG
 
 LOGGER = logging.getLogger("scrape.bookParser")
 
+#--------------------------------------------------------------#
+# TUPLE DATA
+
+# one scraped book, field order is the order written to json
+BookRecord = namedtuple(
+    "BookRecord",
+    ["title", "price", "stock", "rating", "link", "stock_checked"])
+
+#--------------------------------------------------------------#
+# COMPILED SELECTORS / PATTERNS
+
+ATTR = soupsieve.compile(BookInfoLocators.ATTR)
+PRICE = soupsieve.compile(BookInfoLocators.PRICE)
+RATING = soupsieve.compile(BookInfoLocators.RATING)
+
+PRICE_PATTERN = re.compile(r"£([0-9]+\.[0-9]+)")
+
+# convert word score to num score
+RATINGS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
+
+#--------------------------------------------------------------#
+# FUNCTIONS
+
+
+def build_record(title: str, href: str, price_text: str,
+                 rating_classes: list) -> BookRecord:
+    """Turn the raw strings found by a parser backend into a BookRecord
+
+    Parameters
+    ----------
+    title : str
+        title attribute of the books link
+    href : str
+        href attribute of the books link
+    price_text : str
+        text of the price tag
+    rating_classes : list
+        classes of the star-rating tag
+
+    Returns
+    -------
+    BookRecord
+        book with a stock of 0
+    """
+    try:
+        # match returns [£100 , 100]
+        match = PRICE_PATTERN.search(price_text)
+        price = float(match.group(1))
+    except ValueError:
+        raise ValueError("TRYED TO CONVERT PRICE TO FLOAT AND FAILED")
+
+    find = [rating for rating in rating_classes if rating != "star-rating"]
+
+    return BookRecord(title=title,
+                      price=price,
+                      stock=0,
+                      rating=RATINGS.get(find[0].lower(), -1),
+                      link=book_url(href),
+                      stock_checked=0)
+
+
+def parse_book(page: soupTag) -> BookRecord:
+    """Read every field of a books <li> in one pass
+
+    Parameters
+    ----------
+    page : soupTag
+        the books <li> tag
+
+    Returns
+    -------
+    BookRecord
+        book with a stock of 0, no reference to page is kept
+    """
+    attrs = ATTR.select_one(page).attrs
+
+    return build_record(attrs.get("title", ""),
+                        attrs.get("href", ""),
+                        PRICE.select_one(page).text,
+                        RATING.select_one(page).attrs.get("class", ""))
+
+
 #--------------------------------------------------------------#
 # CLASS
 
 
 class BookParser:
-    """Beautiful soup a books information"""
+    """Beautiful soup a books information, the page is parsed once into
+    a BookRecord and the properties read from it"""
+
+    __slots__ = ("record",)
 
     def __init__(self, page: soupTag):
-        LOGGER.debug("PARSING BOOKS <LI> INFO FOR TITLE,LINK,PRICE.")
+        self.record: BookRecord = parse_book(page)
 
-        self.page: soupTag = page
-        self.__stock = 0
+    @classmethod
+    def from_record(cls, record: BookRecord):
+        """Wrap an already parsed BookRecord
+
+        Parameters
+        ----------
+        record : BookRecord
+            book made by a parser backend
+
+        Returns
+        -------
+        BookParser
+            parser holding record
+        """
+        book = cls.__new__(cls)
+        book.record = record
+        return book
 
     def __repr__(self):
         return f"<{self.__class__.__name__}(), TITLE: {self.title}, PRICE: {self.price}, LINK: {self.link} ,RATING: {self.rating}>"
@@ -38,89 +141,78 @@ class BookParser:
     @property
     def title(self) -> str:
         """Get books title
-       
+
         Returns
         -------
         str
             name of the book
         """
-        locator = BookInfoLocators.ATTR
-
-        return self.page.select_one(locator).attrs.get("title", "")
+        return self.record.title
 
     @property
     def link(self):
         """Get link to page that contains book information
-        
+
         Returns
         -------
         str
             link to web page
         """
-        locator = BookInfoLocators.ATTR
-
-        url = self.page.select_one(locator).attrs.get("href", "")
-
-        return f"http://books.toscrape.com/catalogue/{url}"
+        return self.record.link
 
     @property
     def stock(self) -> int:
-        """Get stock that is obtained from innerBookParser
+        """Get stock that is obtained from innerBookParser, it is 0 and
+        stock_checked is 0 until the books page has been read, None when
+        a lazy crawl left it unknown and -1 when fetching it failed
         """
-        return self.__stock
+        return self.record.stock
 
     @stock.setter
     def stock(self, value):
-        self.__stock = value
+        self.record = self.record._replace(stock=value)
+
+    @property
+    def stock_checked(self) -> float:
+        """Get time the stock was read from the books page
+        """
+        return self.record.stock_checked
+
+    @stock_checked.setter
+    def stock_checked(self, value):
+        self.record = self.record._replace(stock_checked=value)
 
     @property
     def price(self) -> float:
         """Get books price
-       
+
         Returns
         -------
         float
             price of the book
         """
-
-        try:
-            locator = BookInfoLocators.PRICE
-            find = self.page.select_one(locator).text
-
-            # get the money
-            match = re.search(r"£([0-9]+\.[0-9]+)", find)
-
-            # match returns [£100 , 100]
-            return float(match.group(1))
-        except ValueError:
-            raise ValueError("TRYED TO CONVERT PRICE TO FLOAT AND FAILED")
+        return self.record.price
 
     @property
     def rating(self) -> int:
         """Get books rating
-        
+
         Returns
         -------
         int
             score its recived
         """
+        return self.record.rating
 
-        locator = BookInfoLocators.RATING
-
-        find = [
-            rating
-            for rating in self.page.select_one(locator).attrs.get("class", "")
-            if rating != "star-rating"
-        ]
-
-        # convert word score to num score
-        return {
-            "one": 1,
-            "two": 2,
-            "three": 3,
-            "four": 4,
-            "five": 5
-        }.get(find[0].lower(), -1)
+    def to_dict(self) -> dict:
+        """Get book as a dict in the json layout
+
+        Returns
+        -------
+        dict
+            dict of every field
+        """
+        return dict(self.record._asdict())
 
 
 #--------------------------------------------------------------#
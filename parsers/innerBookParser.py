@@ -7,6 +7,7 @@ to select wanted information
 
 import re
 import logging
+import soupsieve
 from bs4.element import Tag as soupTag
 from locators import bookPagesInfoLocators
 
@@ -15,6 +16,36 @@ from locators import bookPagesInfoLocators
 
 LOGGER = logging.getLogger("scrape.innerBookParser")
 
+#--------------------------------------------------------------#
+# COMPILED SELECTORS / PATTERNS
+
+STOCK = soupsieve.compile(bookPagesInfoLocators.STOCK)
+
+STOCK_PATTERN = re.compile(r"\d+")
+
+#--------------------------------------------------------------#
+# FUNCTIONS
+
+
+def parse_stock_text(text: str) -> int:
+    """Get the stock amount from the text of the stock tag
+
+    Parameters
+    ----------
+    text : str
+        text such as "In stock (22 available)"
+
+    Returns
+    -------
+    int
+        amount of stock
+    """
+    try:
+        return int(STOCK_PATTERN.search(text).group())
+    except ValueError:
+        raise ValueError("TRYED TO CONVERT STOCK TO INT AND FAILED")
+
+
 #--------------------------------------------------------------#
 # CLASS
 
@@ -23,7 +54,6 @@ class InnerBookParser:
     """Users a BeautifulSoup Tag from the requests.get of BookParser link()"""
 
     def __init__(self, page: soupTag):
-        LOGGER.debug("PARSING INFO ON MAIN BOOKS PAGE FOR STOCK AMOUNT")
         self.page = page
 
     def __repr__(self):
@@ -32,16 +62,6 @@ class InnerBookParser:
     @property
     def stock(self):
         """Using css to locate the stock amount"""
-        try:
-            locator = bookPagesInfoLocators.STOCK
-
-            find = self.page.select_one(locator).text
-
-            stock = re.findall(r"\d+", find)
-
-            return int(stock[0])
-
-        except ValueError:
-            raise ValueError("TRYED TO CONVERT STOCK TO INT AND FAILED")
+        return parse_stock_text(STOCK.select_one(self.page).text)
             
 #--------------------------------------------------------------#
@@ -0,0 +1,78 @@
+"""
+Parse a listing pages pager using BeautifulSoup Tags
+to find how many pages there are
+"""
+#--------------------------------------------------------------#
+# IMPORTS
+
+import re
+import logging
+from bs4.element import Tag as soupTag
+from locators import PagerLocator
+
+#--------------------------------------------------------------#
+# LOG
+
+LOGGER = logging.getLogger("scrape.pagerParser")
+
+#--------------------------------------------------------------#
+# COMPILED PATTERNS
+
+PAGER_PATTERN = re.compile(r"Page\s+(\d+)\s+of\s+(\d+)")
+
+#--------------------------------------------------------------#
+# FUNCTIONS
+
+
+def parse_pager_text(text: str) -> tuple:
+    """Get (current, total) from the text of the pager
+
+    Parameters
+    ----------
+    text : str
+        text such as "Page 1 of 50", can be None
+
+    Returns
+    -------
+    tuple
+        (current, total), (None, None) if text is not a pager
+    """
+    match = PAGER_PATTERN.search(text) if text else None
+    if match is None:
+        return None, None
+
+    return int(match.group(1)), int(match.group(2))
+
+
+#--------------------------------------------------------------#
+# CLASS
+
+
+class PagerParser:
+    """Uses a BeautifulSoup Tag of a listing page to read its "Page 1 of N" pager"""
+
+    def __init__(self, page: soupTag):
+        LOGGER.debug("PARSING PAGER FOR PAGE COUNT")
+        self.page = page
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), PAGE: {self.current} OF {self.total}>"
+
+    def __read(self) -> tuple:
+        """(current, total) from the pager text"""
+        locator = PagerLocator.CURRENT
+
+        find = self.page.select_one(locator)
+        return parse_pager_text(find.text if find else None)
+
+    @property
+    def current(self):
+        """Number of the page, None if there is no pager"""
+        return self.__read()[0]
+
+    @property
+    def total(self):
+        """Amount of pages, None if there is no pager"""
+        return self.__read()[1]
+
+#--------------------------------------------------------------#
@@ -0,0 +1,58 @@
+"""
+Urls of the site being scraped. Listing and book pages are both relative to
+the catalogue, so pointing BASE_URL at a mirror or a local fixture server
+moves the whole crawl there
+"""
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# root of the catalogue, always ends with a /
+BASE_URL = "http://books.toscrape.com/catalogue/"
+
+# listing pages relative to BASE_URL
+PAGE_PATH = "page-{}.html"
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def set_base_url(url: str):
+    """Set the root of the catalogue for every later request and record
+
+    Parameters
+    ----------
+    url : str
+        "http://books.toscrape.com/catalogue/", a trailing / is added
+        if missing
+    """
+    global BASE_URL
+    BASE_URL = url if url.endswith("/") else f"{url}/"
+
+
+def get_base_url() -> str:
+    """Root of the catalogue"""
+    return BASE_URL
+
+
+def page_url(idx: int) -> str:
+    """Url of listing page idx, counting from 1"""
+    return BASE_URL + PAGE_PATH.format(idx)
+
+
+def page_number(url: str):
+    """Index of the listing page at url, the inverse of page_url. None if
+    url is not a listing page"""
+    prefix, suffix = (BASE_URL + PAGE_PATH).split("{}")
+    idx = url[len(prefix):len(url) - len(suffix)]
+    if url.startswith(prefix) and url.endswith(suffix) and idx.isdigit():
+        return int(idx)
+    return None
+
+
+def book_url(href: str) -> str:
+    """Url of a book page from the href on its listing page"""
+    return BASE_URL + href
+
+
+#--------------------------------------------------------------#
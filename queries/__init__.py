@@ -0,0 +1,9 @@
+from .bookIndex import BookIndex
+
+
+def __getattr__(name):
+    # numpy is only imported once a table is used
+    if name == "BookTable":
+        from .bookTable import BookTable
+        return BookTable
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
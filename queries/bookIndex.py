@@ -0,0 +1,179 @@
+"""
+Index over a list of book dict's, sorted orderings of each field are built
+once so top-k queries only touch the books they return
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import heapq
+import logging
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.book_index")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# fields with a pre-sorted ordering, both directions
+INDEXED_FIELDS = ("price", "rating", "stock")
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def field_key(field: str, reverse: bool = False):
+    """Key ordering book dict's by field, books without it come last
+    whichever way they are ordered"""
+    if reverse:
+        return lambda book: (book.get(field) is not None, book.get(field))
+    return lambda book: (book.get(field) is None, book.get(field))
+
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class BookIndex:
+    """Sorted orderings of books per field. Ties keep the order the books
+    were given in, the same as sorted(), and books without the field are
+    last
+
+    Parameters
+    ----------
+    books : list
+        list of book dict's
+    fields : tuple, optional
+        fields to build orderings for (the default is INDEXED_FIELDS)
+    """
+
+    def __init__(self, books: list, fields: tuple = INDEXED_FIELDS):
+        LOGGER.debug("INDEXING %d BOOKS", len(books))
+
+        self.books = list(books)
+
+        positions = range(len(self.books))
+        self.__orders = {}
+        for field in fields:
+            for reverse in (False, True):
+                key = field_key(field, reverse)
+                self.__orders[field, reverse] = sorted(
+                    positions, key=lambda idx: key(self.books[idx]),
+                    reverse=reverse)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), BOOKS: {len(self.books)}>"
+
+    def __len__(self):
+        return len(self.books)
+
+    def __iter__(self):
+        return iter(self.books)
+
+    @classmethod
+    def of(cls, books):
+        """Return books if it is already an index, else index it
+
+        Parameters
+        ----------
+        books : BookIndex or list
+            index or list of book dict's
+
+        Returns
+        -------
+        BookIndex
+            index of books
+        """
+        return books if isinstance(books, cls) else cls(books)
+
+    def top(self, field: str, amount: int, reverse: bool = False,
+            where=None) -> list:
+        """Get the first books ordered by field
+
+        Parameters
+        ----------
+        field : str
+            field to order by, indexed fields are O(amount) otherwise a heap
+            is used over every book
+        amount : int
+            max books to return, more then there are returns them all
+        reverse : bool, optional
+            biggest first (the default is False, smallest first)
+        where : function, optional
+            only books where(book) is True are returned (the default is None)
+
+        Raises
+        ------
+        IndexError
+            amount is negative
+
+        Returns
+        -------
+        list
+            list of book dict's
+
+        Example
+        -------
+            >> # top 10 cheapest with rating >= 4 and stock > 0
+            >> index.top("price", 10,
+            ..           where=lambda b: b["rating"] >= 4 and b["stock"] > 0)
+        """
+        if amount < 0:
+            raise IndexError("OUT OF RANGE")
+
+        order = self.__orders.get((field, reverse))
+        if order is None:
+            return self.top_by(field_key(field, reverse), amount, reverse,
+                               where)
+
+        if where is None:
+            return [self.books[idx] for idx in order[:amount]]
+
+        res = []
+        for idx in order:
+            if len(res) >= amount:
+                break
+
+            book = self.books[idx]
+            if where(book):
+                res.append(book)
+        return res
+
+    def top_by(self, key, amount: int, reverse: bool = False,
+               where=None) -> list:
+        """Get the first books ordered by any key, using a heap of amount
+        books instead of sorting them all
+
+        Parameters
+        ----------
+        key : function
+            called with each book dict to get the value to order by
+        amount : int
+            max books to return
+        reverse : bool, optional
+            biggest first (the default is False, smallest first)
+        where : function, optional
+            only books where(book) is True are returned (the default is None)
+
+        Raises
+        ------
+        IndexError
+            amount is negative
+
+        Returns
+        -------
+        list
+            list of book dict's
+        """
+        if amount < 0:
+            raise IndexError("OUT OF RANGE")
+
+        books = self.books if where is None else filter(where, self.books)
+
+        pick = heapq.nlargest if reverse else heapq.nsmallest
+        return pick(amount, books, key=key)
+
+
+#--------------------------------------------------------------#
@@ -0,0 +1,452 @@
+"""
+Column store of books, numeric fields are numpy arrays and strings are kept
+once in a table with each book holding an index into it. A field a book does
+not have, such as the stock of a lazy crawl, is stored as MISSING
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import logging
+import numpy as np
+from storage import iter_books
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.book_table")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# numeric columns and their dtype
+NUMERIC = dict(price=np.float64, stock=np.int32, rating=np.int8,
+               stock_checked=np.float64)
+
+# string columns, stored as int32 codes into a list of unique strings
+STRINGS = ("title", "link")
+
+# order of fields in a row dict, same as the json layout
+FIELDS = ("title", "price", "stock", "rating", "link", "stock_checked")
+
+AGGREGATES = ("count", "sum", "mean", "min", "max")
+
+# stored for a None field, nan for floats and the smallest value of an int,
+# which no book has. Read back as None and ordered after every other book
+MISSING = {name: np.nan if np.dtype(dtype).kind == "f"
+           else np.iinfo(dtype).min for name, dtype in NUMERIC.items()}
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def _field(book, name: str):
+    """Read a field of a book dict, BookParser or BookRecord"""
+    if isinstance(book, dict):
+        return book.get(name)
+    return getattr(book, name, None)
+
+
+def _value(book, name: str):
+    """Numeric field of a book, MISSING when it has none"""
+    value = _field(book, name)
+    return MISSING[name] if value is None else value
+
+
+def is_missing(column):
+    """True where a numeric column or value holds MISSING
+
+    Parameters
+    ----------
+    column : numpy.ndarray or numpy scalar
+        numeric column, or one value of it
+
+    Returns
+    -------
+    numpy.ndarray or bool
+        bool per book
+    """
+    if column.dtype.kind == "f":
+        return np.isnan(column)
+    return column == np.iinfo(column.dtype).min
+
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class BookTable:
+    """Columns of books. Slicing with a slice gives a table sharing the same
+    memory, a mask or index array gives a copy. Numeric columns read as
+    attributes are masked where a book has no value, so a filter on them
+    leaves those books out, the same as BookIndex orders them last
+
+    Parameters
+    ----------
+    columns : dict
+        numpy array per field, string fields hold codes into strings
+    strings : dict
+        list of unique strings per string field
+    """
+
+    def __init__(self, columns: dict, strings: dict):
+        self.columns = columns
+        self.strings = strings
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), BOOKS: {len(self)}>"
+
+    def __len__(self):
+        return len(self.columns["price"])
+
+    def __getattr__(self, name: str):
+        # columns read as attributes, table.price >= 4
+        columns = self.__dict__.get("columns", {})
+        if name not in columns:
+            raise AttributeError(name)
+
+        column = columns[name]
+        if name in self.__dict__.get("strings", {}):
+            return column
+        return np.ma.masked_where(is_missing(column), column, copy=False)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self.row(key)
+        return self.take(key)
+
+    def __iter__(self):
+        return (self.row(idx) for idx in range(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the columns, not counting the string tables"""
+        return sum(column.nbytes for column in self.columns.values())
+
+    # -- BUILDING --
+
+    @classmethod
+    def from_books(cls, books):
+        """Build a table from book dict's, BookParser's or BookRecord's
+
+        Parameters
+        ----------
+        books : iterable
+            books from the scraper or a json file
+
+        Returns
+        -------
+        BookTable
+            table of books
+        """
+        books = list(books)
+
+        columns = {
+            name: np.fromiter(
+                (_value(book, name) for book in books),
+                dtype=dtype, count=len(books))
+            for name, dtype in NUMERIC.items()
+        }
+
+        strings = {}
+        for name in STRINGS:
+            lookup = {}
+            codes = np.fromiter(
+                (lookup.setdefault(_field(book, name) or "", len(lookup))
+                 for book in books),
+                dtype=np.int32, count=len(books))
+
+            columns[name] = codes
+            strings[name] = list(lookup)
+
+        return cls(columns, strings)
+
+    @classmethod
+    def from_json(cls, file_name: str):
+        """Build a table from a .jsonl file written by write_to_json or a
+        legacy json file
+
+        Parameters
+        ----------
+        file_name : str
+            path of the json file
+
+        Returns
+        -------
+        BookTable
+            table of books
+        """
+        return cls.from_books(iter_books(file_name))
+
+    @classmethod
+    def concat(cls, tables: list):
+        """Join tables one after another, string tables are merged
+
+        Parameters
+        ----------
+        tables : list
+            list of BookTable's
+
+        Returns
+        -------
+        BookTable
+            every book of every table
+        """
+        columns = {
+            name: np.concatenate([table.columns[name] for table in tables])
+            for name in NUMERIC
+        }
+
+        strings = {}
+        for name in STRINGS:
+            lookup = {}
+            codes = []
+            for table in tables:
+                remap = np.array(
+                    [lookup.setdefault(value, len(lookup))
+                     for value in table.strings[name]],
+                    dtype=np.int32)
+                codes.append(remap[table.columns[name]] if len(remap) else
+                             table.columns[name])
+
+            columns[name] = np.concatenate(codes)
+            strings[name] = list(lookup)
+
+        return cls(columns, strings)
+
+    # -- READING --
+
+    def row(self, idx: int) -> dict:
+        """Get one book as a dict in the json layout
+
+        Parameters
+        ----------
+        idx : int
+            position of the book
+
+        Returns
+        -------
+        dict
+            the book, None for a field it does not have
+        """
+        row = {}
+        for name in FIELDS:
+            value = self.columns[name][idx]
+            if name in self.strings:
+                row[name] = self.strings[name][value]
+            else:
+                row[name] = None if is_missing(value) else value.item()
+        return row
+
+    def to_dicts(self) -> list:
+        """Get every book as a dict
+
+        Returns
+        -------
+        list
+            list of book dict's
+        """
+        return list(self)
+
+    def decode(self, name: str) -> list:
+        """Get a string column as strings
+
+        Parameters
+        ----------
+        name : str
+            "title" or "link"
+
+        Returns
+        -------
+        list
+            one string per book
+        """
+        strings = self.strings[name]
+        return [strings[code] for code in self.columns[name]]
+
+    # -- QUERIES --
+
+    def take(self, key):
+        """Get the books selected by a slice, boolean mask or index array
+
+        Parameters
+        ----------
+        key : slice or numpy.ndarray
+            slices share memory with this table, anything else is a copy
+
+        Returns
+        -------
+        BookTable
+            table of the selected books, sharing the string tables
+        """
+        columns = {name: column[key] for name, column in self.columns.items()}
+        return BookTable(columns, self.strings)
+
+    def filter(self, mask):
+        """Get the books where mask is True
+
+        Parameters
+        ----------
+        mask : numpy.ndarray
+            bool per book, (table.rating >= 4) & (table.stock > 0), masked
+            books are left out
+
+        Returns
+        -------
+        BookTable
+            table of the matching books
+        """
+        return self.take(np.asarray(np.ma.filled(mask, False), dtype=bool))
+
+    def __order(self, field: str, reverse: bool):
+        """Values that sort the books by field smallest first, missing
+        values are inf so they come last either way"""
+        if field in self.strings:
+            raise KeyError(f"CAN NOT ORDER BY STRING FIELD {field}")
+
+        column = self.columns[field]
+        values = column.astype(np.float64)
+        if reverse:
+            values = -values
+        values[is_missing(column)] = np.inf
+        return values
+
+    def argsort(self, field: str, reverse: bool = False):
+        """Positions of the books ordered by field, ties keep their order and
+        books without the field are last
+
+        Parameters
+        ----------
+        field : str
+            numeric field to order by
+        reverse : bool, optional
+            biggest first (the default is False, smallest first)
+
+        Returns
+        -------
+        numpy.ndarray
+            positions of the books
+        """
+        return np.argsort(self.__order(field, reverse), kind="stable")
+
+    def sort(self, field: str, reverse: bool = False):
+        """Get the books ordered by field
+
+        Parameters
+        ----------
+        field : str
+            numeric field to order by
+        reverse : bool, optional
+            biggest first (the default is False, smallest first)
+
+        Returns
+        -------
+        BookTable
+            ordered table
+        """
+        return self.take(self.argsort(field, reverse))
+
+    def top(self, field: str, amount: int, reverse: bool = False):
+        """Get the first books ordered by field without sorting every book,
+        ties keep their order the same as sort()
+
+        Parameters
+        ----------
+        field : str
+            numeric field to order by
+        amount : int
+            max books to return
+        reverse : bool, optional
+            biggest first (the default is False, smallest first)
+
+        Raises
+        ------
+        IndexError
+            amount is negative
+
+        Returns
+        -------
+        BookTable
+            table of at most amount books
+        """
+        if amount < 0:
+            raise IndexError("OUT OF RANGE")
+
+        if amount >= len(self):
+            return self.sort(field, reverse)
+        if amount == 0:
+            return self.take(slice(0, 0))
+
+        values = self.__order(field, reverse)
+
+        # value of the last book to return, everything smaller is in and
+        # only the first books equal to it fill what is left
+        kth = np.partition(values, amount - 1)[amount - 1]
+
+        below = np.flatnonzero(values < kth)
+        equal = np.flatnonzero(values == kth)[:amount - len(below)]
+
+        picked = np.concatenate([below, equal])
+        picked.sort()
+
+        return self.take(picked[np.argsort(values[picked], kind="stable")])
+
+    def aggregate(self, by: str, field: str = None, how: str = "count") -> dict:
+        """Group books by a field and aggregate another, books without
+        the grouped field are under None and books without the aggregated
+        field are left out of it
+
+        Parameters
+        ----------
+        by : str
+            field to group by, string fields group by their string
+        field : str, optional
+            numeric field to aggregate (the default is None, only
+            needed for how other then "count")
+        how : str, optional
+            one of AGGREGATES (the default is "count")
+
+        Raises
+        ------
+        KeyError
+            how is not one of AGGREGATES
+
+        Returns
+        -------
+        dict
+            group value to aggregate
+        """
+        if how not in AGGREGATES:
+            raise KeyError(f"UNKNOWN AGGREGATE {how}")
+
+        keys, groups = np.unique(self.columns[by], return_inverse=True)
+
+        if how == "count":
+            values = np.bincount(groups, minlength=len(keys))
+        else:
+            known = ~is_missing(self.columns[field])
+            column = self.columns[field][known].astype(np.float64)
+            groups = groups[known]
+
+            if how in ("sum", "mean"):
+                values = np.bincount(groups, weights=column,
+                                     minlength=len(keys))
+                if how == "mean":
+                    # a group with nothing to average is nan
+                    with np.errstate(invalid="ignore"):
+                        values = values / np.bincount(groups,
+                                                      minlength=len(keys))
+            else:
+                ufunc = np.minimum if how == "min" else np.maximum
+                values = np.full(len(keys), np.inf if how == "min" else -np.inf)
+                ufunc.at(values, groups, column)
+
+        if by in self.strings:
+            keys = [self.strings[by][key] for key in keys]
+        else:
+            keys = [None if is_missing(key) else key.item() for key in keys]
+
+        return dict(zip(keys, values.tolist()))
+
+
+#--------------------------------------------------------------#
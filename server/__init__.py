@@ -0,0 +1 @@
+from .queryServer import QueryServer
@@ -0,0 +1,379 @@
+"""
+Long running query server. Books are loaded and indexed once and queries
+are answered as json over local http, a new snapshot is loaded next to the
+one in use and swapped in, so requests being answered are never dropped
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import os
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlsplit
+from urllib.parse import parse_qs
+from queries import BookIndex
+from queries.bookIndex import INDEXED_FIELDS
+from metrics import Histogram
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.query_server")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# seconds between looks at the snapshot file for a newer one
+POLL = 1.0
+
+# books returned when a request does not say, and the most it may ask for
+AMOUNT = 10
+MAX_AMOUNT = 1000
+
+# answers from memory take well under the 5ms of the default buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+PERCENTILES = (50, 90, 99)
+
+# top-k queries by path, field to order by and biggest first
+QUERIES = {
+    "/top-rated": ("rating", True),
+    "/cheapest": ("price", False),
+    "/most-stocked": ("stock", True),
+}
+
+# filters of /books by query parameter, field and test
+FILTERS = {
+    "min_price": ("price", float, lambda value, arg: value >= arg),
+    "max_price": ("price", float, lambda value, arg: value <= arg),
+    "min_rating": ("rating", int, lambda value, arg: value >= arg),
+    "max_rating": ("rating", int, lambda value, arg: value <= arg),
+    "min_stock": ("stock", int, lambda value, arg: value >= arg),
+    "max_stock": ("stock", int, lambda value, arg: value <= arg),
+    "title": ("title", str.lower, lambda value, arg: arg in value.lower()),
+}
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def _arg(params: dict, name: str, cast=str, default=None):
+    """Last value of a query parameter, cast, default when it is missing"""
+    values = params.get(name)
+    return default if not values else cast(values[-1])
+
+
+def _amount(params: dict, name: str, default: int) -> int:
+    amount = _arg(params, name, int, default)
+    if not 0 <= amount <= MAX_AMOUNT:
+        raise ValueError(f"{name} MUST BE 0 TO {MAX_AMOUNT}")
+    return amount
+
+
+def _seconds(bound: float):
+    """Bucket bound as json, None past the last bucket"""
+    return None if bound == float("inf") else bound
+
+
+def parse_where(params: dict):
+    """Filter of a /books request, every FILTERS parameter given has to hold
+
+    Parameters
+    ----------
+    params : dict
+        query parameters, as from parse_qs
+
+    Raises
+    ------
+    ValueError
+        a filter value is not a number
+
+    Returns
+    -------
+    function
+        called with a book dict, None when there are no filters
+    """
+    tests = [(field, test, _arg(params, name, cast))
+             for name, (field, cast, test) in FILTERS.items()
+             if name in params]
+    if not tests:
+        return None
+
+    return lambda book: all(book.get(field) is not None
+                            and test(book[field], arg)
+                            for field, test, arg in tests)
+
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Answers a GET with the json of self.server.service, a QueryServer"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        start = time.perf_counter()
+        service = self.server.service
+
+        url = urlsplit(self.path)
+        status, answer = service.answer(url.path, parse_qs(url.query))
+        body = json.dumps(answer).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        service.observe(url.path if status != 404 else "other",
+                        time.perf_counter() - start)
+
+    def log_message(self, format, *args):
+        LOGGER.debug(format, *args)
+
+
+class QueryServer:
+    """Books kept in memory in a BookIndex, queried over local http.
+    Every request reads the index once, a reload builds a new index and
+    swaps it in so requests already running finish on the old one
+
+    Endpoints, each answers json
+
+        /top-rated, /cheapest, /most-stocked ?amount=10
+        /books ?sort=price&reverse=1&offset=0&limit=10 and any FILTERS
+        /stats   books, loads and latency percentiles per endpoint
+
+    Parameters
+    ----------
+    load : function
+        returns the books, a BookIndex, a list of book dict's or a store
+        that is iterated and closed
+    path : str, optional
+        snapshot file load reads, reloaded when it changes (the default
+        is None, never reloaded)
+    host : str, optional
+        address to listen on (the default is HOST)
+    port : int, optional
+        port to listen on (the default is PORT, 0 is any free port)
+    poll : float, optional
+        seconds between looks at path (the default is POLL)
+
+    Example
+    -------
+        >> with QueryServer(load_books, BOOKS_FILE_NAME, port=0) as server:
+        ..     urlopen(f"{server.base_url}/cheapest?amount=5")
+    """
+
+    def __init__(self, load, path: str = None, host: str = HOST,
+                 port: int = PORT, poll: float = POLL):
+        self.load = load
+        self.path = path
+        self.poll = poll
+
+        self.index = None
+        self.loaded = None
+        self.loads = 0
+
+        self.__version = None
+        self.__latency = {}
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__threads = []
+
+        self.reload()
+
+        self.httpd = ThreadingHTTPServer((host, port), QueryHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.service = self
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), URL: {self.base_url}, BOOKS: {len(self.index)}, LOADS: {self.loads}>"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # -- BOOKS --
+
+    def __path_version(self):
+        """mtime and size of path, None if there is no path or file"""
+        try:
+            stat = os.stat(self.path)
+        except (OSError, TypeError):
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self):
+        """Load and index the books, then swap them in for new requests"""
+        version = self.__path_version()
+        books = self.load()
+        try:
+            index = BookIndex.of(books)
+        finally:
+            if hasattr(books, "close"):
+                books.close()
+
+        self.index = index
+        self.__version = version
+        self.loaded = time.time()
+        self.loads += 1
+
+        LOGGER.info("SERVING %d BOOKS", len(index))
+
+    def __watch(self):
+        """Reload whenever path changes, until stop()"""
+        while not self.__stopped.wait(self.poll):
+            version = self.__path_version()
+            if version is None or version == self.__version:
+                continue
+
+            # a snapshot that can not be read leaves the old books in place,
+            # whatever the storage raised
+            try:
+                self.reload()
+            except Exception:
+                LOGGER.exception("COULD NOT RELOAD %s", self.path)
+                self.__version = version
+
+    # -- QUERIES --
+
+    def answer(self, path: str, params: dict) -> tuple:
+        """Answer one request
+
+        Parameters
+        ----------
+        path : str
+            path of the url
+        params : dict
+            query parameters, as from parse_qs
+
+        Returns
+        -------
+        tuple
+            (http status, json-able answer), 400 for a bad parameter and
+            500 when answering failed
+        """
+        # the index of this request, a reload does not change it
+        index = self.index
+
+        try:
+            if path in QUERIES:
+                field, reverse = QUERIES[path]
+                amount = _amount(params, "amount", AMOUNT)
+                return 200, dict(books=index.top(field, amount, reverse))
+
+            if path == "/books":
+                return 200, self.__books(index, params)
+
+            if path == "/stats":
+                return 200, self.stats(index)
+        except ValueError as err:
+            return 400, dict(error=str(err))
+        except Exception as err:
+            # a bad book or query fails this request, not the handler
+            LOGGER.exception("COULD NOT ANSWER %s", path)
+            return 500, dict(error=f"{err.__class__.__name__}: {err}")
+
+        return 404, dict(error=f"NO ENDPOINT {path}")
+
+    @staticmethod
+    def __books(index: BookIndex, params: dict) -> dict:
+        """A page of books matching the filters, ordered by sort"""
+        field = _arg(params, "sort", default="price")
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"sort MUST BE ONE OF {', '.join(INDEXED_FIELDS)}")
+        reverse = _arg(params, "reverse", default="0") not in ("0", "false")
+        offset = _arg(params, "offset", int, 0)
+        limit = _amount(params, "limit", AMOUNT)
+        if offset < 0:
+            raise ValueError("offset MUST BE 0 OR MORE")
+
+        # one more then asked for says if there is a next page
+        books = index.top(field, offset + limit + 1, reverse,
+                          parse_where(params))[offset:]
+
+        return dict(books=books[:limit], offset=offset, limit=limit,
+                    more=len(books) > limit)
+
+    def observe(self, path: str, seconds: float):
+        """Add the latency of one request to path's histogram"""
+        with self.__lock:
+            latency = self.__latency.get(path)
+            if latency is None:
+                latency = self.__latency[path] = Histogram(LATENCY_BUCKETS)
+            latency.observe(seconds)
+
+    def stats(self, index: BookIndex = None) -> dict:
+        """Books served, times they were loaded and the count and latency percentiles of
+        every endpoint, percentiles are bucket bounds in seconds and None
+        past the last bucket"""
+        index = index or self.index
+
+        with self.__lock:
+            latency = {
+                path: dict(count=hist.count, **{
+                    f"p{q}": _seconds(hist.percentile(q)) for q in PERCENTILES})
+                for path, hist in self.__latency.items()}
+
+        return dict(books=len(index), loaded=self.loaded,
+                    loads=self.loads, latency=latency)
+
+    # -- RUNNING --
+
+    def start(self):
+        """Serve and watch path from daemon threads"""
+        self.__stopped.clear()
+        self.__threads = [
+            threading.Thread(target=self.httpd.serve_forever, daemon=True,
+                             kwargs=dict(poll_interval=min(self.poll, 0.5))),
+            threading.Thread(target=self.__watch, daemon=True)]
+
+        for thread in self.__threads:
+            thread.start()
+        LOGGER.info("QUERY SERVER LISTENING ON %s", self.base_url)
+
+    def stop(self):
+        """Stop serving and watching, and close the socket, also when
+        start() was never called"""
+        self.__stopped.set()
+        try:
+            # shutdown waits for serve_forever, which only runs once started
+            if self.__threads:
+                self.httpd.shutdown()
+        finally:
+            self.httpd.server_close()
+
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+
+    def serve_forever(self):
+        """Serve from this thread until interrupted"""
+        self.start()
+        try:
+            self.__stopped.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+#--------------------------------------------------------------#
@@ -0,0 +1,20 @@
+from .jsonLines import JsonLinesWriter
+from .jsonLines import iter_json_lines
+from .jsonLines import iter_books
+from .jsonLines import convert_legacy
+from .sqliteStore import SqliteStore
+from .shards import shard_file_name
+from .shards import find_shard_files
+from .shards import merge_shards
+from .frontier import Frontier
+
+# snapshot files need numpy, which is only imported once one is used
+_SNAPSHOT_FILE = ("SnapshotFile", "SnapshotFileError", "write_snapshot_file",
+                  "import_json", "export_json")
+
+
+def __getattr__(name):
+    if name in _SNAPSHOT_FILE:
+        from . import snapshotFile
+        return getattr(snapshotFile, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
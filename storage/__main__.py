@@ -0,0 +1,128 @@
+"""
+Convert books between storage formats, the format is picked by extension
+
+    python -m storage data/bookInfo.json data/bookInfo.jsonl
+    python -m storage data/bookInfo.jsonl data/bookInfo.bin
+    python -m storage data/bookInfo.bin data/bookInfo.jsonl
+
+Merge the shard files of a sharded crawl into one file of any format
+
+    python -m storage merge data/bookInfo.jsonl data/shards/shard-*.jsonl
+
+Check the crc32 of a binary snapshot, opening one for queries does not
+
+    python -m storage check data/bookInfo.bin
+
+Compare load time and memory of json and a binary snapshot
+
+    python -m storage bench data/bookInfo.jsonl
+"""
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import os
+import sys
+import time
+import tempfile
+from multiprocessing import Pool
+from .jsonLines import JsonLinesWriter
+from .jsonLines import convert_legacy
+from .sqliteStore import SqliteStore
+from .shards import merge_shards
+from .snapshotFile import import_json
+from .snapshotFile import export_json
+from .snapshotFile import write_snapshot_file
+from .snapshotFile import SnapshotFile
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def convert(src: str, dst: str) -> int:
+    """Convert books from src to dst, .bin files are snapshots and anything
+    else is json"""
+    if dst.endswith(".bin"):
+        return import_json(src, dst)
+    if src.endswith(".bin"):
+        return export_json(src, dst)
+    return convert_legacy(src, dst)
+
+
+def check(file_name: str) -> int:
+    """Read the whole of a snapshot file to check its crc32, raises
+    SnapshotFileError when it fails"""
+    with SnapshotFile(file_name, verify=True) as snapshot:
+        return len(snapshot)
+
+
+def merge(dst: str, files: list) -> int:
+    """Merge shard files into dst, .bin files are snapshots, .db files
+    sqlite and anything else json lines"""
+    books = list(merge_shards(files))
+
+    if dst.endswith(".bin"):
+        return write_snapshot_file(dst, books)
+    if dst.endswith(".db"):
+        with SqliteStore(dst) as store:
+            store.save(books)
+        return len(books)
+
+    with JsonLinesWriter(dst, mode="w") as writer:
+        for book in books:
+            writer.write(book)
+    return len(books)
+
+
+def _load(how: str, file_name: str) -> tuple:
+    """Run in a fresh process, seconds and KB of peak rss to load books
+    and answer a top ten query"""
+    import resource
+    from queries import BookIndex
+    from .jsonLines import iter_books
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+
+    if how == "json":
+        books = BookIndex(list(iter_books(file_name)))
+    else:
+        books = SnapshotFile(file_name, verify=how == "binary-verify")
+    books.top("price", 10)
+
+    took = time.perf_counter() - start
+    return took, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+
+
+def bench(json_file: str):
+    """Print load time and rss growth of json against a binary snapshot"""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_file = os.path.join(tmp, "books.bin")
+        amount = import_json(json_file, snapshot_file)
+
+        print(f"{amount} BOOKS")
+        for how, file_name in (("json", json_file),
+                               ("binary", snapshot_file),
+                               ("binary-verify", snapshot_file)):
+            # one process per load so each starts with nothing cached
+            with Pool(1) as pool:
+                took, rss = pool.apply(_load, (how, file_name))
+            print(f"{how:>16}: {took * 1000:8.2f}ms {rss:8d}KB RSS")
+
+
+#--------------------------------------------------------------#
+# -- MAIN --
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "bench":
+        bench(sys.argv[2])
+    elif len(sys.argv) == 3 and sys.argv[1] == "check":
+        print(f"{check(sys.argv[2])} BOOKS, CHECKSUM OK")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "merge":
+        print(f"MERGED {merge(sys.argv[2], sys.argv[3:])} BOOKS")
+    elif len(sys.argv) == 3:
+        print(f"CONVERTED {convert(sys.argv[1], sys.argv[2])} BOOKS")
+    else:
+        print("USAGE: python -m storage SRC DST | python -m storage check BOOKS.bin | python -m storage merge DST SHARD... | python -m storage bench BOOKS.jsonl")
+        sys.exit(1)
+
+#--------------------------------------------------------------#
@@ -0,0 +1,360 @@
+"""
+Checkpoints of a crawl in SQLite. Every listing and detail url is kept with
+its state and the books of each finished listing page are stored, so a crawl
+that stopped part way can be resumed without fetching anything twice
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import time
+import json
+import sqlite3
+import logging
+import threading
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.frontier")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+FRONTIER_FILE_NAME = "data/frontier.db"
+
+# finished listing pages held in memory before they are written in one
+# transaction, a crash loses at most these pages
+BATCH = 10
+
+# states of a url
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    state TEXT NOT NULL,
+    page INTEGER,
+    tries INTEGER NOT NULL DEFAULT 0,
+    updated REAL
+);
+
+CREATE INDEX IF NOT EXISTS urls_state ON urls (kind, state, page);
+
+-- books of finished listing pages, in the order they are on the site
+CREATE TABLE IF NOT EXISTS books (
+    page INTEGER NOT NULL,
+    pos INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (page, pos)
+);
+"""
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class Frontier:
+    """State of a crawl kept in a sqlite file. Listing pages go from
+    pending to done, or failed when some of their stock could not be
+    fetched, detail pages are written as in flight once their listing is
+    parsed and before they are fetched. Given to a crawl as its snapshot it is told of every finished
+    page and fills in the stock of books it already holds, so a resumed
+    crawl only fetches what is missing or failed
+
+    Parameters
+    ----------
+    file_name : str, optional
+        path of the sqlite file, made if missing (the default is
+        FRONTIER_FILE_NAME)
+    snapshot : Snapshot, optional
+        previous scrape, asked for the stock of books the frontier does
+        not hold (the default is None)
+    batch : int, optional
+        finished pages written per transaction (the default is BATCH)
+
+    Example
+    -------
+        >> with Frontier() as frontier:
+        ..     pages = frontier.plan({idx: page_url(idx) for idx in range(1, 51)})
+        ..     for book in crawl_all_pages_books(snapshot=frontier, pages=pages):
+        ..         pass
+        ..     books = list(frontier.iter_books())
+    """
+
+    def __init__(self, file_name: str = FRONTIER_FILE_NAME,
+                 snapshot=None, batch: int = BATCH):
+        self.file_name = file_name
+        self.snapshot = snapshot
+        self.batch = batch
+
+        self.reused = 0
+        self.refetched = 0
+
+        # pages finish on the fetcher's threads or in the event loop
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(file_name, check_same_thread=False)
+        self.__conn.executescript(SCHEMA)
+
+        self.__urls = {}
+        self.__pages = {}
+
+        # a crawl that stopped left its in flight urls unfinished
+        with self.__conn:
+            self.__conn.execute("UPDATE urls SET state = ? WHERE state = ?",
+                                (PENDING, IN_FLIGHT))
+
+        self.__stocks = {}
+        for (record,) in self.__conn.execute("SELECT record FROM books"):
+            self.__keep(json.loads(record))
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), FILE: {self.file_name}, BOOKS: {len(self.__stocks)}, REUSED: {self.reused}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __keep(self, book: dict):
+        """Remember the stock of a book, failed or unknown stock is fetched
+        again"""
+        if book.get("stock") not in (-1, None):
+            self.__stocks[book["link"]] = book
+
+    # -- PLANNING --
+
+    def reset(self):
+        """Forget every url and book, for a crawl that starts over"""
+        with self.__lock, self.__conn:
+            self.__urls.clear()
+            self.__pages.clear()
+            self.__stocks.clear()
+
+            self.__conn.execute("DELETE FROM urls")
+            self.__conn.execute("DELETE FROM books")
+
+    def plan(self, urls: dict) -> list:
+        """Add listing pages as pending, pages already known keep their state
+
+        Parameters
+        ----------
+        urls : dict
+            url of each listing page by its index
+
+        Returns
+        -------
+        list
+            indexes of the listing pages that are not done, see todo()
+        """
+        with self.__lock, self.__conn:
+            self.__conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, kind, state, page, updated) "
+                "VALUES (?, 'listing', ?, ?, ?)",
+                ((url, PENDING, page, time.time()) for page, url in urls.items()))
+        return self.todo()
+
+    def todo(self) -> list:
+        """Indexes of the listing pages that are pending or failed"""
+        self.flush()
+        return [page for (page,) in self.__conn.execute(
+            "SELECT page FROM urls WHERE kind = 'listing' AND state != ? "
+            "ORDER BY page", (DONE,))]
+
+    # -- CHECKPOINTS --
+
+    def reuse_stock(self, book, now: float = None) -> bool:
+        """Copy the stock of book from an earlier run of the crawl, or from
+        the snapshot
+
+        Parameters
+        ----------
+        book : BookParser
+            freshly parsed book from a listing page
+        now : float, optional
+            current time, passed on to the snapshot (the default is None)
+
+        Returns
+        -------
+        bool
+            True if the stock was reused, False if the detail
+            page needs to be fetched
+        """
+        old = self.__stocks.get(book.link)
+        reuse = (old is not None
+                 and old.get("title") == book.title
+                 and old.get("price") == book.price
+                 and old.get("rating") == book.rating)
+
+        if reuse:
+            book.stock = old.get("stock")
+            book.stock_checked = old.get("stock_checked")
+        elif self.snapshot is not None:
+            reuse = self.snapshot.reuse_stock(book, now)
+
+        if reuse:
+            with self.__lock:
+                self.reused += 1
+        return reuse
+
+    def fetching(self, books: list):
+        """Write the detail pages of books as in flight at once, a crawl
+        that stops before they are done finds them pending. The snapshot
+        is told too
+
+        Parameters
+        ----------
+        books : list
+            BookParser's of one listing page whose stock is fetched now
+        """
+        if self.snapshot is not None:
+            self.snapshot.fetching(books)
+        if not books:
+            return
+
+        urls = {book.link: ("detail", IN_FLIGHT, None, 1) for book in books}
+        with self.__lock:
+            self.refetched += len(books)
+            with self.__conn:
+                self.__write_urls(urls, time.time())
+
+    def reuse_page(self, url: str, fingerprint: str):
+        """Books of an unchanged listing page, asked of the snapshot
+
+        Returns
+        -------
+        list
+            list of BookRecord's, None if the page has to be parsed
+        """
+        if self.snapshot is None:
+            return None
+        return self.snapshot.reuse_page(url, fingerprint)
+
+    def page_done(self, page: int, url: str, books: list,
+                  fingerprint: str = None):
+        """Checkpoint a listing page once every book has its stock, it is
+        written with the next batch. The snapshot is told too
+
+        Parameters
+        ----------
+        page : int
+            index of the listing page, None to put it after every page
+            there is
+        url : str
+            url of the listing page
+        books : list
+            BookParser's of the page
+        fingerprint : str, optional
+            fingerprint of the page (the default is None)
+        """
+        if self.snapshot is not None:
+            self.snapshot.page_done(page, url, books, fingerprint)
+
+        records = [book.to_dict() for book in books]
+        failed = any(book["stock"] == -1 for book in records)
+
+        with self.__lock:
+            if page is None:
+                page = self.__last_page() + 1
+
+            self.__urls[url] = ("listing", FAILED if failed else DONE, page, 1)
+            for book in records:
+                state = FAILED if book["stock"] == -1 else DONE
+                self.__urls[book["link"]] = ("detail", state, page, 0)
+                self.__keep(book)
+
+            self.__pages[page] = records
+            full = len(self.__pages) >= self.batch
+
+        if full:
+            self.flush()
+
+    def __last_page(self) -> int:
+        (last,) = self.__conn.execute("SELECT MAX(page) FROM urls").fetchone()
+        return max([last or 0, *self.__pages])
+
+    def __write_urls(self, urls: dict, now: float):
+        """Write {url: (kind, state, page, tries)}, a url already there
+        keeps its page when page is None and adds up its tries"""
+        # no upsert, it needs sqlite 3.24, the row being replaced is read
+        # for the page and tries it keeps
+        self.__conn.executemany(
+            "INSERT OR REPLACE INTO urls "
+            "(url, kind, state, page, tries, updated) VALUES (?, ?, ?, "
+            "COALESCE(?, (SELECT page FROM urls WHERE url = ?)), "
+            "COALESCE((SELECT tries FROM urls WHERE url = ?), 0) + ?, ?)",
+            ((url, kind, state, page, url, url, tries, now)
+             for url, (kind, state, page, tries) in urls.items()))
+
+    def flush(self):
+        """Write every checkpoint held in memory in one transaction"""
+        with self.__lock:
+            if not self.__urls and not self.__pages:
+                return
+
+            urls, self.__urls = self.__urls, {}
+            pages, self.__pages = self.__pages, {}
+            now = time.time()
+
+            with self.__conn:
+                self.__write_urls(urls, now)
+
+                self.__conn.executemany("DELETE FROM books WHERE page = ?",
+                                        ((page,) for page in pages))
+                self.__conn.executemany(
+                    "INSERT INTO books (page, pos, record) VALUES (?, ?, ?)",
+                    ((page, pos, json.dumps(book))
+                     for page, books in pages.items()
+                     for pos, book in enumerate(books)))
+
+        LOGGER.debug("CHECKPOINTED %d PAGES, %d URLS", len(pages), len(urls))
+
+    # -- READING --
+
+    def iter_books(self):
+        """Read the books of every finished page, in page order
+
+        Yields
+        ------
+        dict
+            book dict's
+        """
+        self.flush()
+        cursor = self.__conn.execute(
+            "SELECT record FROM books ORDER BY page, pos")
+
+        yield from (json.loads(record) for (record,) in cursor)
+
+    def counts(self) -> dict:
+        """Amount of urls of each kind in each state
+
+        Returns
+        -------
+        dict
+            {(kind, state): amount}
+        """
+        self.flush()
+        return {(kind, state): amount for kind, state, amount in
+                self.__conn.execute(
+                    "SELECT kind, state, COUNT(*) FROM urls "
+                    "GROUP BY kind, state")}
+
+    def failed(self) -> list:
+        """Urls that failed, retried by the next resumed crawl"""
+        self.flush()
+        return [url for (url,) in self.__conn.execute(
+            "SELECT url FROM urls WHERE state = ? ORDER BY page, url",
+            (FAILED,))]
+
+    def close(self):
+        """Write what is left and close the connection"""
+        self.flush()
+        self.__conn.close()
+
+
+#--------------------------------------------------------------#
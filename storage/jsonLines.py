@@ -0,0 +1,169 @@
+"""
+JSON Lines storage for books, one book per line so books can be appended
+as they are scraped and read back one at a time
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import os
+import json
+import logging
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.json_lines")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+# books written between each fsync
+SYNC_EVERY = 100
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class JsonLinesWriter:
+    """Append-only writer of one json object per line, flushed to disk
+    every sync_every books and when closed
+
+    Parameters
+    ----------
+    file_name : str
+        path of the .jsonl file
+    sync_every : int, optional
+        books between each fsync (the default is SYNC_EVERY)
+    mode : str, optional
+        "a" to append or "w" to start a new file (the default is "a")
+    """
+
+    def __init__(self, file_name: str, sync_every: int = SYNC_EVERY,
+                 mode: str = "a"):
+        self.file_name = file_name
+        self.sync_every = sync_every
+        self.written = 0
+
+        self.__file = open(file_name, mode, encoding="utf-8")
+        self.__unsynced = 0
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), FILE: {self.file_name}, WRITTEN: {self.written}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record: dict):
+        """Append a book
+
+        Parameters
+        ----------
+        record : dict
+            book dict
+        """
+        self.__file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+        self.written += 1
+        self.__unsynced += 1
+        if self.__unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        """Flush written books to disk"""
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__unsynced = 0
+
+    def close(self):
+        """Sync and close the file"""
+        if self.__file.closed:
+            return
+
+        self.sync()
+        self.__file.close()
+
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def iter_json_lines(file_name: str):
+    """Read a .jsonl file one book at a time. A cut off last line, left by a
+    crash while writing, is skipped
+
+    Parameters
+    ----------
+    file_name : str
+        path of the .jsonl file
+
+    Yields
+    ------
+    dict
+        book dict's in file order
+    """
+    with open(file_name, "r", encoding="utf-8") as j_file:
+        for line in j_file:
+            if not line.strip():
+                continue
+
+            try:
+                yield json.loads(line)
+            except ValueError:
+                if line.endswith("\n"):
+                    raise
+                LOGGER.warning("SKIPPING CUT OFF LAST LINE OF %s", file_name)
+
+
+def iter_books(file_name: str):
+    """Read books from a .jsonl file, or from a legacy {"books": [...]}
+    json file which has to be loaded whole
+
+    Parameters
+    ----------
+    file_name : str
+        path of a .jsonl or legacy .json file
+
+    Yields
+    ------
+    dict
+        book dict's in file order
+    """
+    if file_name.endswith(".jsonl"):
+        yield from iter_json_lines(file_name)
+        return
+
+    with open(file_name, "r") as j_file:
+        data = json.load(j_file)
+
+    yield from (data or {}).get("books") or []
+
+
+def convert_legacy(json_file: str, jsonl_file: str) -> int:
+    """Write the books of a legacy json file to a .jsonl file
+
+    Parameters
+    ----------
+    json_file : str
+        path of the legacy {"books": [...]} file
+    jsonl_file : str
+        path of the .jsonl file to create
+
+    Returns
+    -------
+    int
+        amount of books converted
+    """
+    LOGGER.debug("CONVERTING %s TO %s", json_file, jsonl_file)
+
+    with JsonLinesWriter(jsonl_file, mode="w") as writer:
+        for book in iter_books(json_file):
+            writer.write(book)
+
+    return writer.written
+
+
+#--------------------------------------------------------------#
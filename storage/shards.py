@@ -0,0 +1,123 @@
+"""
+Partial scrapes of a sharded crawl, one json lines file per shard holding
+the books of its range of pages, merged back into one list of books
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import os
+import re
+import logging
+from .jsonLines import iter_books
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.shards")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+SHARD_FILE = "shard-{:03d}-of-{:03d}.jsonl"
+
+SHARD_PATTERN = re.compile(r"^shard-(\d+)-of-(\d+)\.jsonl$")
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def shard_file_name(directory: str, shard: int, shards: int) -> str:
+    """Path of the books of shard out of shards
+
+    Parameters
+    ----------
+    directory : str
+        directory of the shard files
+    shard : int
+        index of the shard, 0 to shards - 1
+    shards : int
+        amount of shards
+
+    Returns
+    -------
+    str
+        path of the .jsonl file
+    """
+    return os.path.join(directory, SHARD_FILE.format(shard, shards))
+
+
+def find_shard_files(directory: str, shards: int = None) -> tuple:
+    """Finished shard files of one sharded crawl, unfinished shards only
+    have a .partial file and are left out
+
+    Parameters
+    ----------
+    directory : str
+        directory of the shard files
+    shards : int, optional
+        amount of shards of the crawl (the default is None, taken from the
+        files found)
+
+    Raises
+    ------
+    ValueError
+        shards is None and files of crawls with different amounts of
+        shards were found
+
+    Returns
+    -------
+    tuple
+        (shards, dict of shard index to path)
+    """
+    found = {}
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            match = SHARD_PATTERN.match(name)
+            if match:
+                shard, count = map(int, match.groups())
+                found.setdefault(count, {})[shard] = os.path.join(directory, name)
+
+    if shards is None:
+        if len(found) > 1:
+            raise ValueError(f"SHARD FILES OF {sorted(found)} SHARDS IN {directory}")
+        shards = next(iter(found), 0)
+
+    return shards, found.get(shards, {})
+
+
+def merge_shards(files: list):
+    """Books of every shard file without repeats, shards are read in the
+    order of their file names so the result is the same on every run.
+    A book is kept where its link is first seen, a book that moved to the
+    next page between the crawls of two shards only counts once
+
+    Parameters
+    ----------
+    files : list
+        paths of shard files
+
+    Yields
+    ------
+    dict
+        book dict's in page order
+    """
+    seen = set()
+    repeats = 0
+
+    for file_name in sorted(files):
+        LOGGER.debug("MERGING BOOKS OF %s", file_name)
+
+        for book in iter_books(file_name):
+            if book["link"] in seen:
+                repeats += 1
+                continue
+
+            seen.add(book["link"])
+            yield book
+
+    LOGGER.debug("MERGED %d BOOKS OF %d SHARDS, %d REPEATS DROPPED",
+                 len(seen), len(files), repeats)
+
+
+#--------------------------------------------------------------#
@@ -0,0 +1,345 @@
+"""
+Binary snapshot of books, numeric fields are packed as fixed width columns
+and titles and links sit in one string table indexed by offsets. Files are
+memory mapped on open so nothing is decoded until it is read. A None field,
+such as the stock of a lazy crawl, is stored as BookTable's MISSING and
+read back as None
+
+    header   magic, version, books, string table size, crc32 of the body
+    body     price f8[n], stock_checked f8[n], offsets u4[2n+1],
+             stock i4[n], rating i1[n], string table
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import mmap
+import zlib
+import struct
+import logging
+import numpy as np
+from .jsonLines import JsonLinesWriter
+from .jsonLines import iter_books
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.snapshot_file")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+MAGIC = b"BKSN"
+
+# version 1 stored a None stock as -1, the same as a failed fetch, and a
+# None rating as 0, those files still read with those values
+VERSION = 2
+
+# magic, version, reserved, books, string table size, crc32, padded to 32
+HEADER = struct.Struct("<4sHHQQI4x")
+
+# dtypes in file order, little endian whatever the machine is
+PRICE = np.dtype("<f8")
+STOCK_CHECKED = np.dtype("<f8")
+OFFSET = np.dtype("<u4")
+STOCK = np.dtype("<i4")
+RATING = np.dtype("<i1")
+
+FIELDS = ("title", "price", "stock", "rating", "link", "stock_checked")
+
+#--------------------------------------------------------------#
+# -- CUSTOM ERRORS --
+
+
+class SnapshotFileError(Exception):
+    """Custom exception, file is not a snapshot, is of a newer version or
+    failed its checksum
+    """
+
+    def __init__(self, msg):
+        super(SnapshotFileError, self).__init__(msg)
+
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def _field(book, name: str):
+    """Read a field of a book dict or BookParser"""
+    if isinstance(book, dict):
+        return book.get(name)
+    return getattr(book, name, None)
+
+
+def write_snapshot_file(file_name: str, books) -> int:
+    """Write books to a snapshot file
+
+    Parameters
+    ----------
+    file_name : str
+        path of the file to create
+    books : iterable
+        iterable of book dict's or BookParser's, read whole before writing
+
+    Raises
+    ------
+    SnapshotFileError
+        titles and links are more then 4GB
+
+    Returns
+    -------
+    int
+        amount of books written
+    """
+    LOGGER.debug("WRITING BOOKS DATA TO %s", file_name)
+
+    # queries imports storage, so it is only imported once both are loaded
+    from queries import BookTable
+
+    books = list(books)
+    amount = len(books)
+
+    # the table stores None fields as MISSING, the same columns are written
+    columns = BookTable.from_books(books).columns
+    price = columns["price"].astype(PRICE)
+    checked = columns["stock_checked"].astype(STOCK_CHECKED)
+    stock = columns["stock"].astype(STOCK)
+    rating = columns["rating"].astype(RATING)
+
+    # every title then every link
+    encoded = [(_field(b, "title") or "").encode("utf-8") for b in books]
+    encoded += [(_field(b, "link") or "").encode("utf-8") for b in books]
+
+    ends = np.cumsum([len(value) for value in encoded], dtype=np.uint64)
+    if amount and ends[-1] > np.iinfo(OFFSET).max:
+        raise SnapshotFileError("STRING TABLE TOO BIG")
+
+    offsets = np.zeros(2 * amount + 1, dtype=OFFSET)
+    offsets[1:] = ends
+
+    strings = b"".join(encoded)
+    body = [price.tobytes(), checked.tobytes(), offsets.tobytes(),
+            stock.tobytes(), rating.tobytes(), strings]
+
+    checksum = 0
+    for part in body:
+        checksum = zlib.crc32(part, checksum)
+
+    with open(file_name, "wb") as b_file:
+        b_file.write(HEADER.pack(MAGIC, VERSION, 0, amount, len(strings),
+                                 checksum))
+        for part in body:
+            b_file.write(part)
+
+    return amount
+
+
+def import_json(json_file: str, snapshot_file: str) -> int:
+    """Write the books of a .jsonl or legacy json file to a snapshot file
+
+    Parameters
+    ----------
+    json_file : str
+        path of the json file
+    snapshot_file : str
+        path of the snapshot file to create
+
+    Returns
+    -------
+    int
+        amount of books converted
+    """
+    LOGGER.debug("CONVERTING %s TO %s", json_file, snapshot_file)
+
+    return write_snapshot_file(snapshot_file, iter_books(json_file))
+
+
+def export_json(snapshot_file: str, jsonl_file: str) -> int:
+    """Write the books of a snapshot file to a .jsonl file
+
+    Parameters
+    ----------
+    snapshot_file : str
+        path of the snapshot file
+    jsonl_file : str
+        path of the .jsonl file to create
+
+    Returns
+    -------
+    int
+        amount of books converted
+    """
+    LOGGER.debug("CONVERTING %s TO %s", snapshot_file, jsonl_file)
+
+    with SnapshotFile(snapshot_file, verify=True) as snapshot:
+        with JsonLinesWriter(jsonl_file, mode="w") as writer:
+            for book in snapshot:
+                writer.write(book)
+
+    return writer.written
+
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class StringColumn:
+    """Strings of one field read from the string table on access
+
+    Parameters
+    ----------
+    strings : memoryview
+        the string table
+    offsets : numpy.ndarray
+        start of each string, plus the end of the last
+    """
+
+    def __init__(self, strings, offsets):
+        self.__strings = strings
+        self.__offsets = offsets
+
+    def __len__(self):
+        return len(self.__offsets) - 1
+
+    def __getitem__(self, idx: int) -> str:
+        start, end = self.__offsets[idx], self.__offsets[idx + 1]
+        return str(self.__strings[start:end], "utf-8")
+
+    def __iter__(self):
+        return (self[idx] for idx in range(len(self)))
+
+
+class SnapshotFile:
+    """Memory mapped snapshot file. Columns are numpy views of the file, so
+    opening it reads only the header and the pages a query touches
+
+    Parameters
+    ----------
+    file_name : str
+        path of the snapshot file
+    verify : bool, optional
+        check the crc32 of the body, which reads the whole file once
+        (the default is False, only the header is read, converting and
+        python -m storage check verify)
+
+    Raises
+    ------
+    SnapshotFileError
+        file is not a snapshot, is of a newer version or failed its checksum
+    """
+
+    def __init__(self, file_name: str, verify: bool = False):
+        self.file_name = file_name
+
+        with open(file_name, "rb") as b_file:
+            self.__map = mmap.mmap(b_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.__map) < HEADER.size:
+            raise SnapshotFileError(f"{file_name} IS NOT A SNAPSHOT FILE")
+
+        magic, version, _, amount, size, checksum = HEADER.unpack_from(self.__map)
+        if magic != MAGIC:
+            raise SnapshotFileError(f"{file_name} IS NOT A SNAPSHOT FILE")
+        if version > VERSION:
+            raise SnapshotFileError(f"{file_name} IS VERSION {version}, ONLY {VERSION} IS KNOWN")
+
+        if verify and zlib.crc32(memoryview(self.__map)[HEADER.size:]) != checksum:
+            raise SnapshotFileError(f"{file_name} FAILED ITS CHECKSUM")
+
+        columns = {}
+        position = HEADER.size
+        for name, dtype, count in (("price", PRICE, amount),
+                                   ("stock_checked", STOCK_CHECKED, amount),
+                                   ("offsets", OFFSET, 2 * amount + 1),
+                                   ("stock", STOCK, amount),
+                                   ("rating", RATING, amount)):
+            columns[name] = np.frombuffer(self.__map, dtype=dtype,
+                                          count=count, offset=position)
+            position += dtype.itemsize * count
+
+        offsets = columns.pop("offsets")
+        strings = memoryview(self.__map)[position:position + size]
+
+        # queries imports storage, so it is only imported once both are loaded
+        from queries import BookTable
+
+        # rows are in file order so each code is the row itself
+        codes = np.arange(amount, dtype=np.int32)
+        columns.update(title=codes, link=codes)
+
+        self.table = BookTable(columns, dict(
+            title=StringColumn(strings, offsets[:amount + 1]),
+            link=StringColumn(strings, offsets[amount:])))
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), FILE: {self.file_name}, BOOKS: {len(self)}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, idx: int) -> dict:
+        return self.table.row(idx)
+
+    def __iter__(self):
+        return (self[idx] for idx in range(len(self)))
+
+    def top(self, field: str, amount: int, reverse: bool = False,
+            where=None) -> list:
+        """Get the first books ordered by field, only the books returned
+        are decoded. Same arguments and results as BookIndex.top
+
+        Parameters
+        ----------
+        field : str
+            numeric field to order by
+        amount : int
+            max books to return
+        reverse : bool, optional
+            biggest first (the default is False, smallest first)
+        where : function, optional
+            only books where(book) is True are returned, books are decoded
+            in order until amount match (the default is None)
+
+        Raises
+        ------
+        IndexError
+            amount is negative
+
+        Returns
+        -------
+        list
+            list of book dict's
+        """
+        if amount < 0:
+            raise IndexError("OUT OF RANGE")
+
+        if where is None:
+            return list(self.table.top(field, amount, reverse))
+
+        res = []
+        for idx in self.table.argsort(field, reverse):
+            if len(res) >= amount:
+                break
+
+            book = self[idx]
+            if where(book):
+                res.append(book)
+        return res
+
+    def close(self):
+        """Drop the columns and unmap the file, if numpy views of the
+        columns are still held elsewhere the map is left for them"""
+        self.table = None
+        try:
+            self.__map.close()
+        except BufferError:
+            LOGGER.debug("%s STILL IN USE, LEFT MAPPED", self.file_name)
+
+
+#--------------------------------------------------------------#
@@ -0,0 +1,314 @@
+"""
+SQLite storage for books. Every scrape is kept as its own crawl in one file,
+price, rating and stock are indexed per crawl so top-k queries only read the
+rows they return, and titles are searchable through an FTS5 table
+"""
+
+#--------------------------------------------------------------#
+# -- IMPORTS --
+
+import time
+import sqlite3
+import logging
+
+#--------------------------------------------------------------#
+# -- LOG --
+
+LOGGER = logging.getLogger("scraper.sqlite_store")
+
+#--------------------------------------------------------------#
+# -- GLOBALS --
+
+DB_FILE_NAME = "data/books.db"
+
+# order of fields in a row dict, same as the json layout
+FIELDS = ("title", "price", "stock", "rating", "link", "stock_checked")
+
+# fields top() can push down to sqlite, each has an index in that direction
+INDEXED_FIELDS = ("price", "rating", "stock")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL
+);
+
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    crawl_id INTEGER NOT NULL REFERENCES crawls(id),
+    title TEXT,
+    price REAL,
+    stock INTEGER,
+    rating INTEGER,
+    link TEXT,
+    stock_checked REAL
+);
+
+-- books without the field come last either way, like BookIndex, and ties
+-- are ordered by id, the order the books were scraped in
+DROP INDEX IF EXISTS books_price;
+DROP INDEX IF EXISTS books_price_desc;
+DROP INDEX IF EXISTS books_rating;
+DROP INDEX IF EXISTS books_rating_desc;
+DROP INDEX IF EXISTS books_stock;
+DROP INDEX IF EXISTS books_stock_desc;
+
+CREATE INDEX IF NOT EXISTS books_price_last ON books (crawl_id, price IS NULL, price, id);
+CREATE INDEX IF NOT EXISTS books_price_desc_last ON books (crawl_id, price IS NULL, price DESC, id);
+CREATE INDEX IF NOT EXISTS books_rating_last ON books (crawl_id, rating IS NULL, rating, id);
+CREATE INDEX IF NOT EXISTS books_rating_desc_last ON books (crawl_id, rating IS NULL, rating DESC, id);
+CREATE INDEX IF NOT EXISTS books_stock_last ON books (crawl_id, stock IS NULL, stock, id);
+CREATE INDEX IF NOT EXISTS books_stock_desc_last ON books (crawl_id, stock IS NULL, stock DESC, id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5 (
+    title, content='books', content_rowid='id'
+);
+"""
+
+#--------------------------------------------------------------#
+# -- FUNCTIONS --
+
+
+def _row(book) -> tuple:
+    """Values of a book dict or BookParser in FIELDS order"""
+    if not isinstance(book, dict):
+        book = book.to_dict()
+    return tuple(book.get(field) for field in FIELDS)
+
+
+#--------------------------------------------------------------#
+# -- CLASS --
+
+
+class SqliteStore:
+    """Books of every crawl in one sqlite file. Reads and queries use the
+    latest finished crawl unless a crawl id is given
+
+    Parameters
+    ----------
+    file_name : str, optional
+        path of the sqlite file, made if missing (the default is DB_FILE_NAME)
+    """
+
+    def __init__(self, file_name: str = DB_FILE_NAME):
+        self.file_name = file_name
+
+        self.__conn = sqlite3.connect(file_name)
+        self.__conn.row_factory = sqlite3.Row
+        self.__conn.executescript(SCHEMA)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), FILE: {self.file_name}, BOOKS: {len(self)}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        crawl_id = self.latest_crawl()
+        if crawl_id is None:
+            return 0
+
+        (amount,) = self.__conn.execute(
+            "SELECT COUNT(*) FROM books WHERE crawl_id = ?",
+            (crawl_id,)).fetchone()
+        return amount
+
+    def __iter__(self):
+        return self.iter_books()
+
+    # -- CRAWLS --
+
+    def crawls(self) -> list:
+        """Get every finished crawl
+
+        Returns
+        -------
+        list
+            (crawl id, started, finished, books) per crawl, oldest first
+        """
+        return [tuple(row) for row in self.__conn.execute(
+            "SELECT c.id, c.started, c.finished, COUNT(b.id) "
+            "FROM crawls c LEFT JOIN books b ON b.crawl_id = c.id "
+            "WHERE c.finished IS NOT NULL GROUP BY c.id ORDER BY c.id")]
+
+    def latest_crawl(self):
+        """Id of the latest finished crawl, None if there is none"""
+        row = self.__conn.execute(
+            "SELECT MAX(id) FROM crawls WHERE finished IS NOT NULL").fetchone()
+        return row[0]
+
+    # -- WRITING --
+
+    def save(self, books) -> int:
+        """Store books as a new crawl in a single transaction. Books are
+        inserted as they are produced, a crawl that fails part way is
+        rolled back and never becomes the latest crawl
+
+        Parameters
+        ----------
+        books : iterable
+            iterable of book dict's or BookParser's, can be a generator
+
+        Returns
+        -------
+        int
+            id of the new crawl
+        """
+        LOGGER.debug("WRITING BOOKS DATA TO %s", self.file_name)
+
+        with self.__conn:
+            crawl_id = self.__conn.execute(
+                "INSERT INTO crawls (started) VALUES (?)",
+                (time.time(),)).lastrowid
+
+            self.__conn.executemany(
+                "INSERT INTO books (crawl_id, title, price, stock, rating, "
+                "link, stock_checked) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((crawl_id,) + _row(book) for book in books))
+
+            self.__conn.execute(
+                "INSERT INTO books_fts (rowid, title) "
+                "SELECT id, title FROM books WHERE crawl_id = ?",
+                (crawl_id,))
+
+            self.__conn.execute(
+                "UPDATE crawls SET finished = ? WHERE id = ?",
+                (time.time(), crawl_id))
+
+        return crawl_id
+
+    def drop_crawl(self, crawl_id: int):
+        """Delete a crawl and its books
+
+        Parameters
+        ----------
+        crawl_id : int
+            id of the crawl
+        """
+        with self.__conn:
+            self.__conn.execute(
+                "INSERT INTO books_fts (books_fts, rowid, title) "
+                "SELECT 'delete', id, title FROM books WHERE crawl_id = ?",
+                (crawl_id,))
+            self.__conn.execute("DELETE FROM books WHERE crawl_id = ?",
+                                (crawl_id,))
+            self.__conn.execute("DELETE FROM crawls WHERE id = ?",
+                                (crawl_id,))
+
+    # -- READING --
+
+    def __crawl(self, crawl_id):
+        """crawl_id or the latest crawl"""
+        return self.latest_crawl() if crawl_id is None else crawl_id
+
+    def iter_books(self, crawl_id: int = None):
+        """Read the books of a crawl one at a time
+
+        Parameters
+        ----------
+        crawl_id : int, optional
+            id of the crawl (the default is None, the latest crawl)
+
+        Yields
+        ------
+        dict
+            book dict's in the order they were scraped
+        """
+        cursor = self.__conn.execute(
+            f"SELECT {', '.join(FIELDS)} FROM books "
+            "WHERE crawl_id = ? ORDER BY id", (self.__crawl(crawl_id),))
+
+        yield from (dict(row) for row in cursor)
+
+    def top(self, field: str, amount: int, reverse: bool = False,
+            where=None, crawl_id: int = None) -> list:
+        """Get the first books ordered by field, read through the field's
+        index with ORDER BY ... LIMIT so only the books returned are read.
+        Same arguments and results as BookIndex.top
+
+        Parameters
+        ----------
+        field : str
+            one of INDEXED_FIELDS
+        amount : int
+            max books to return
+        reverse : bool, optional
+            biggest first (the default is False, smallest first)
+        where : function, optional
+            only books where(book) is True are returned, books are read in
+            order until amount match (the default is None)
+        crawl_id : int, optional
+            id of the crawl (the default is None, the latest crawl)
+
+        Raises
+        ------
+        IndexError
+            amount is negative
+        KeyError
+            field is not one of INDEXED_FIELDS
+
+        Returns
+        -------
+        list
+            list of book dict's
+        """
+        if amount < 0:
+            raise IndexError("OUT OF RANGE")
+        if field not in INDEXED_FIELDS:
+            raise KeyError(f"NO INDEX FOR {field}")
+
+        sql = (f"SELECT {', '.join(FIELDS)} FROM books WHERE crawl_id = ? "
+               f"ORDER BY {field} IS NULL, {field} {'DESC' if reverse else 'ASC'}, id")
+        args = (self.__crawl(crawl_id),)
+
+        if where is None:
+            cursor = self.__conn.execute(f"{sql} LIMIT ?", args + (amount,))
+            return [dict(row) for row in cursor]
+
+        res = []
+        for row in self.__conn.execute(sql, args):
+            if len(res) >= amount:
+                break
+
+            book = dict(row)
+            if where(book):
+                res.append(book)
+        return res
+
+    def search(self, text: str, amount: int = 10,
+               crawl_id: int = None) -> list:
+        """Full text search of titles, best matches first
+
+        Parameters
+        ----------
+        text : str
+            FTS5 query, "sharp objects" or "shar*"
+        amount : int, optional
+            max books to return (the default is 10)
+        crawl_id : int, optional
+            id of the crawl (the default is None, the latest crawl)
+
+        Returns
+        -------
+        list
+            list of book dict's
+        """
+        fields = ", ".join(f"b.{field}" for field in FIELDS)
+        cursor = self.__conn.execute(
+            f"SELECT {fields} FROM books_fts f JOIN books b ON b.id = f.rowid "
+            "WHERE books_fts MATCH ? AND b.crawl_id = ? "
+            "ORDER BY f.rank LIMIT ?",
+            (text, self.__crawl(crawl_id), amount))
+
+        return [dict(row) for row in cursor]
+
+    def close(self):
+        """Close the connection"""
+        self.__conn.close()
+
+
+#--------------------------------------------------------------#
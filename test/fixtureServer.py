@@ -0,0 +1,327 @@
+"""
+Local stand in for books.toscrape.com, serves a synthetic catalogue in the
+site's markup so crawls can be tested and benchmarked offline
+
+    python -m test.fixtureServer --pages 50 --per-page 20 --port 8000
+
+then crawl it with parsers.set_base_url("http://127.0.0.1:8000/catalogue/")
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import re
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+#-----------------------------------------------
+# -- GLOBALS --
+
+RATINGS = ("One", "Two", "Three", "Four", "Five")
+
+LISTING_PATH = re.compile(r"^/catalogue/page-(\d+)\.html$")
+BOOK_PATH = re.compile(r"^/catalogue/book-(\d+)_(\d+)/index\.html$")
+
+BOOK_LI = """
+<li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
+    <article class="product_pod">
+        <div class="image_container">
+            <a href="{href}"><img src="../media/cache/{idx}.jpg" alt="{title}" class="thumbnail"></a>
+        </div>
+        <p class="star-rating {rating}">
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+        </p>
+        <h3><a href="{href}" title="{title}">{short}</a></h3>
+        <div class="product_price">
+            <p class="price_color">£{price:.2f}</p>
+            <p class="instock availability">
+                <i class="icon-ok"></i>
+                In stock
+            </p>
+            <form>
+                <button type="submit" class="btn btn-primary btn-block" data-loading-text="Adding...">Add to basket</button>
+            </form>
+        </div>
+    </article>
+</li>
+"""
+
+LISTING_PAGE = """<!DOCTYPE html>
+<html lang="en-us" class="no-js">
+<head><title>All products | Books to Scrape - Sandbox</title></head>
+<body id="default" class="default">
+<div class="container-fluid page">
+<div class="page_inner">
+<div class="row">
+<div class="col-sm-8 col-md-9">
+<div class="page-header action"><h1>All products</h1></div>
+<section>
+    <div class="alert alert-warning" role="alert"><strong>Warning!</strong> This is a demo website for web scraping purposes.</div>
+    <div>
+        <ol class="row">
+{books}
+        </ol>
+        <div>
+            <ul class="pager">
+                <li class="current">
+                    Page {idx} of {total}
+                </li>
+{next}
+            </ul>
+        </div>
+    </div>
+</section>
+</div>
+</div>
+</div>
+</div>
+</body>
+</html>
+"""
+
+BOOK_PAGE = """<!DOCTYPE html>
+<html lang="en-us" class="no-js">
+<head><title>{title} | Books to Scrape - Sandbox</title></head>
+<body id="default" class="default">
+<div class="container-fluid page">
+<div class="page_inner">
+<div class="content">
+<div id="content_inner">
+<article class="product_page">
+<div class="row">
+    <div class="col-sm-6">
+        <div id="product_gallery" class="carousel"></div>
+    </div>
+    <div class="col-sm-6 product_main">
+        <h1>{title}</h1>
+        <p class="price_color">£{price:.2f}</p>
+        <p class="instock availability">
+            <i class="icon-ok"></i>
+            In stock ({stock} available)
+        </p>
+        <p class="star-rating {rating}">
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+        </p>
+        <hr/>
+    </div>
+</div>
+</article>
+</div>
+</div>
+</div>
+</div>
+</body>
+</html>
+"""
+
+#-----------------------------------------------
+# -- CLASS --
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves the catalogue of self.server, a FixtureServer"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        fixture = self.server.fixture
+        status, body = fixture.respond(self.path)
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FixtureServer:
+    """Synthetic catalogue served on 127.0.0.1 from a background thread.
+    Books are made from seed so every run serves the same catalogue
+
+    Parameters
+    ----------
+    pages : int, optional
+        listing pages, one past the last answers 404 (the default is 50)
+    per_page : int, optional
+        books per listing page (the default is 20)
+    latency : float, optional
+        seconds every response is held for (the default is 0)
+    error_rate : float, optional
+        share of requests answered 503 (the default is 0)
+    pager : bool, optional
+        listing pages have a "Page 1 of N" pager (the default is True)
+    seed : int, optional
+        seed of the catalogue and of the errors (the default is 0)
+    port : int, optional
+        port to listen on (the default is 0, any free port)
+
+    Example
+    -------
+        >> with FixtureServer(pages=5) as server:
+        ..     set_base_url(server.base_url)
+        ..     books = list(get_all_pages_books())
+    """
+
+    def __init__(self, pages: int = 50, per_page: int = 20,
+                 latency: float = 0.0, error_rate: float = 0.0,
+                 pager: bool = True, seed: int = 0, port: int = 0):
+        self.pages = pages
+        self.per_page = per_page
+        self.latency = latency
+        self.error_rate = error_rate
+        self.pager = pager
+
+        self.requests = Counter()
+        self.in_flight = Counter()
+        self.most_in_flight = Counter()
+        self.__errors = random.Random(seed)
+        self.__lock = threading.Lock()
+
+        rand = random.Random(seed)
+        self.books = [
+            dict(idx=idx,
+                 title=f"Synthetic Book {idx}: A Tale",
+                 href=f"book-{idx}_{idx}/index.html",
+                 price=round(rand.uniform(10, 60), 2),
+                 rating=rand.randint(1, 5),
+                 stock=rand.randint(0, 22))
+            for idx in range(pages * per_page)
+        ]
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fixture = self
+        self.__thread = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(), URL: {self.base_url}, PAGES: {self.pages}, BOOKS: {len(self.books)}>"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        """Root of the catalogue, for set_base_url"""
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/catalogue/"
+
+    def records(self) -> list:
+        """Books as the scraper should return them, in page order"""
+        return [dict(title=book["title"], price=book["price"],
+                     stock=book["stock"], rating=book["rating"],
+                     link=self.base_url + book["href"])
+                for book in self.books]
+
+    def start(self):
+        """Serve from a daemon thread"""
+        self.__thread = threading.Thread(target=self.httpd.serve_forever,
+                                         daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    # -- PAGES --
+
+    def respond(self, path: str) -> tuple:
+        """Status and body for a path, called on the server's threads.
+        Requests being answered are counted by kind, listing or detail"""
+        kind = "detail" if BOOK_PATH.match(path) else "listing"
+
+        with self.__lock:
+            self.requests[path] += 1
+            self.in_flight[kind] += 1
+            self.most_in_flight[kind] = max(self.most_in_flight[kind],
+                                            self.in_flight[kind])
+            failed = self.error_rate and self.__errors.random() < self.error_rate
+
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            with self.__lock:
+                self.in_flight[kind] -= 1
+
+        if failed:
+            return 503, b"<html><body>Service Unavailable</body></html>"
+
+        listing = LISTING_PATH.match(path)
+        if listing and 1 <= int(listing.group(1)) <= self.pages:
+            return 200, self.listing(int(listing.group(1))).encode("utf-8")
+
+        book = BOOK_PATH.match(path)
+        if book and int(book.group(1)) < len(self.books):
+            return 200, self.book(int(book.group(1))).encode("utf-8")
+
+        return 404, b"<html><body>404 Not Found</body></html>"
+
+    def listing(self, idx: int) -> str:
+        """Markup of listing page idx"""
+        start = (idx - 1) * self.per_page
+        books = "".join(
+            BOOK_LI.format(**dict(book, short=book["title"][:20] + "...",
+                                  rating=RATINGS[book["rating"] - 1]))
+            for book in self.books[start:start + self.per_page])
+
+        page = LISTING_PAGE.format(
+            books=books, idx=idx, total=self.pages,
+            next=f'<li class="next"><a href="page-{idx + 1}.html">next</a></li>'
+            if idx < self.pages else "")
+
+        if not self.pager:
+            page = re.sub(r'<ul class="pager">.*?</ul>', "", page,
+                          flags=re.DOTALL)
+        return page
+
+    def book(self, idx: int) -> str:
+        """Markup of the page of book idx"""
+        book = self.books[idx]
+        return BOOK_PAGE.format(title=book["title"], price=book["price"],
+                                stock=book["stock"],
+                                rating=RATINGS[book["rating"] - 1])
+
+
+#-----------------------------------------------
+# -- MAIN --
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-pager", action="store_true")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = FixtureServer(args.pages, args.per_page, args.latency,
+                           args.error_rate, not args.no_pager, port=args.port)
+    print(f"SERVING {len(server.books)} BOOKS AT {server.base_url}")
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+#-----------------------------------------------
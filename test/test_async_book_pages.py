@@ -0,0 +1,73 @@
+"""Testing the asyncio engine, its limits on pages in flight and its sync
+wrapper against the sequential crawl
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import time
+import asyncio
+import pytest
+from pages import get_all_pages_books
+from pages import crawl_all_pages_books
+from pages import get_all_pages_books_async
+from pages import Fetcher
+from test.test_crawl import serve
+from test.test_crawl import strip
+
+#-----------------------------------------------
+# -- HELPERS --
+
+
+@pytest.fixture
+def site():
+    yield from serve(pages=4, per_page=10)
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.parametrize("listing, detail", [(1, 1), (2, 3), (3, 8)])
+def test_concurrency_limits(listing, detail):
+    """No more listing or detail pages are in flight than allowed, and
+    the limits are used"""
+    for server in serve(pages=4, per_page=10, latency=0.02):
+        books = list(crawl_all_pages_books(listing_concurrency=listing,
+                                           detail_concurrency=detail))
+
+        assert strip(books) == server.records()
+        assert server.most_in_flight["listing"] <= listing
+        assert server.most_in_flight["detail"] == detail
+
+
+def test_sync_wrapper_matches_sequential(site):
+    """The sync wrapper gives the same books, in the same order, as the
+    sequential crawl and as the async crawl it wraps"""
+    with Fetcher(workers=1) as fetcher:
+        sequential = strip(get_all_pages_books(fetcher=fetcher))
+
+    assert strip(crawl_all_pages_books()) == sequential
+    assert strip(asyncio.run(get_all_pages_books_async())) == sequential
+    assert sequential == site.records()
+
+
+def test_sync_wrapper_stops_early(site):
+    """Leaving the wrapper part way cancels the pages still scheduled"""
+    crawl = crawl_all_pages_books(listing_concurrency=1, detail_concurrency=4)
+    first = [next(crawl) for _ in range(10)]
+    crawl.close()
+
+    assert strip(first) == site.records()[:10]
+    asked = sum(site.requests.values())
+    assert asked < 4 + 40
+
+    # nothing is left running once the wrapper is closed
+    time.sleep(0.1)
+    assert sum(site.requests.values()) == asked
+
+
+#-----------------------------------------------
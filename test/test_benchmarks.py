@@ -0,0 +1,170 @@
+"""Benchmarks of crawl throughput, parsing, queries and startup against
+the local fixture server, run with the rest of the tests or alone with
+
+    python -m pytest test/test_benchmarks.py --benchmark-only
+
+Derived numbers (pages/s, books/s, µs per book, peak KB) are in each
+benchmark's extra_info, --benchmark-json keeps them for comparing runs
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import logging
+import tracemalloc
+import pytest
+from parsers import BACKENDS
+from parsers import get_backend
+from queries import BookIndex
+from test.fixtureServer import FixtureServer
+from test.test_book_index import BOOKS
+from test.test_crawl import ENGINES
+from test.test_crawl import crawl
+from test.test_crawl import serve
+from test.test_startup import import_times
+
+pytest.importorskip("pytest_benchmark")
+
+import main
+
+#-----------------------------------------------
+# -- GLOBALS --
+
+PAGES = 10
+PER_PAGE = 20
+
+RECORDS = 1000
+
+#-----------------------------------------------
+# -- FIXTURES --
+
+
+@pytest.fixture(scope="module")
+def site():
+    yield from serve(pages=PAGES, per_page=PER_PAGE)
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.benchmark(group="crawl")
+@pytest.mark.parametrize("engine", ENGINES)
+def test_crawl_throughput(benchmark, site, engine):
+    """Whole crawl, listing and detail pages"""
+    books = benchmark.pedantic(lambda: list(crawl(engine)), rounds=3)
+    assert len(books) == PAGES * PER_PAGE
+
+    # there are no stats with --benchmark-disable
+    if benchmark.stats:
+        tracemalloc.start()
+        list(crawl(engine))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        mean = benchmark.stats.stats.mean
+        benchmark.extra_info.update(pages_per_s=round(PAGES / mean, 1),
+                                    books_per_s=round(len(books) / mean, 1),
+                                    peak_kb=peak // 1024)
+
+
+@pytest.mark.benchmark(group="parse")
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_listing(benchmark, backend):
+    """One listing page of PER_PAGE books"""
+    content = FixtureServer(pages=1, per_page=PER_PAGE).listing(1).encode()
+    parser = get_backend(backend)
+
+    records = benchmark.pedantic(parser.books, (content,), rounds=20,
+                                 warmup_rounds=1)
+    assert len(records) == PER_PAGE
+
+    if benchmark.stats:
+        benchmark.extra_info["us_per_book"] = round(
+            benchmark.stats.stats.mean / PER_PAGE * 1e6, 1)
+
+
+@pytest.mark.benchmark(group="parse")
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_stock(benchmark, backend):
+    """One book page"""
+    server = FixtureServer(pages=1, per_page=1)
+    content = server.book(0).encode()
+
+    stock = benchmark.pedantic(get_backend(backend).stock, (content,),
+                               rounds=50, warmup_rounds=1)
+    assert stock == server.books[0]["stock"]
+
+
+@pytest.mark.benchmark(group="query")
+@pytest.mark.parametrize("query", [main.get_top_rated_books,
+                                   main.get_cheepest_books,
+                                   main.get_most_stocked_books])
+def test_query_latency(benchmark, query):
+    """Top ten over an index of BOOKS, as the main.py menu runs it"""
+    index = BookIndex(BOOKS)
+
+    assert len(benchmark.pedantic(query, (index, 10), rounds=1000)) == 10
+
+
+@pytest.mark.benchmark(group="startup")
+def test_startup(benchmark):
+    """Python starting and importing main, what the menu waits for. The
+    import of main alone is in extra_info"""
+    times = benchmark.pedantic(import_times, rounds=3)
+    assert "main" in times
+
+    if benchmark.stats:
+        benchmark.extra_info["main_import_us"] = times["main"]
+
+
+@pytest.mark.benchmark(group="logging")
+@pytest.mark.parametrize("setup", ["filtered", "queue", "file"])
+def test_logging_overhead(benchmark, tmp_path, setup):
+    """Time a crawl thread spends on RECORDS debug records. Filtered is
+    the default INFO level, queue is main.setup_logging at DEBUG and file
+    writes each record on the calling thread"""
+    logger = logging.getLogger("scraper.benchmark")
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    listener = None
+
+    # pytest's own capture handlers would be timed too
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    if setup == "file":
+        handler = logging.FileHandler(tmp_path / "logs.txt")
+        handler.setFormatter(logging.Formatter(main.LOG_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+    else:
+        listener = main.setup_logging(
+            "DEBUG" if setup == "queue" else "INFO", tmp_path / "logs.txt")
+
+    def log():
+        for idx in range(RECORDS):
+            logger.debug("PAGE %s, %d BOOKS, %d STOCKS FETCHED",
+                         "page-1.html", idx, idx)
+
+    try:
+        benchmark.pedantic(log, rounds=5)
+    finally:
+        if listener is not None:
+            listener.stop()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+
+    if benchmark.stats:
+        benchmark.extra_info["us_per_record"] = round(
+            benchmark.stats.stats.mean / RECORDS * 1e6, 2)
+
+
+#-----------------------------------------------
@@ -0,0 +1,84 @@
+"""Testing BookIndex top-k queries
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import random
+import pytest
+from queries import BookIndex
+
+#-----------------------------------------------
+# -- SAMPLES --
+
+random.seed(7)
+
+BOOKS = [
+    dict(title=f"Book {idx}", price=round(random.uniform(10, 60), 2),
+         stock=random.randint(0, 22), rating=random.randint(1, 5))
+    for idx in range(300)
+]
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.parametrize("field, reverse", [("price", False), ("rating", True),
+                                            ("stock", True), ("title", False)])
+@pytest.mark.parametrize("amount", [0, 10, 300, 1000])
+def test_top_matches_sorted(field, reverse, amount):
+    """Same books and tie order as sorting the whole list
+
+    Parameters
+    ----------
+    field : str
+        field to order by
+    reverse : bool
+        biggest first
+    amount : int
+        books to return
+
+    """
+    index = BookIndex(BOOKS)
+    expected = sorted(BOOKS, key=lambda x: x.get(field), reverse=reverse)
+
+    assert index.top(field, amount, reverse) == expected[:amount]
+
+
+def test_compound_query():
+    """Top 10 cheapest with rating >= 4 and stock > 0"""
+    index = BookIndex(BOOKS)
+    where = lambda book: book["rating"] >= 4 and book["stock"] > 0
+
+    expected = sorted(filter(where, BOOKS), key=lambda x: x["price"])[:10]
+
+    assert index.top("price", 10, where=where) == expected
+    assert index.top_by(lambda x: x["price"], 10, where=where) == expected
+
+
+def test_negative_amount():
+    """A negative amount is still an error"""
+    with pytest.raises(IndexError):
+        BookIndex(BOOKS).top("price", -1)
+
+
+@pytest.mark.parametrize("field", ["price", "stock", "title"])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_missing_field_last(field, reverse):
+    """Books with the field missing or None are last either way"""
+    books = [dict(book) for book in BOOKS[:50]]
+    for book in books[::7]:
+        book[field] = None
+    del books[3][field]
+
+    known = [book for book in books if book.get(field) is not None]
+    unknown = [book for book in books if book.get(field) is None]
+    expected = sorted(known, key=lambda x: x[field], reverse=reverse) + unknown
+
+    assert BookIndex(books).top(field, 50, reverse) == expected
+
+
+#-----------------------------------------------
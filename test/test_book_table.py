@@ -0,0 +1,115 @@
+"""Testing the columnar BookTable against plain lists of dict's
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import pytest
+import numpy as np
+from queries import BookIndex
+from queries import BookTable
+from test.test_book_index import BOOKS
+
+#-----------------------------------------------
+# -- HELPERS --
+
+FIELDS = ("title", "price", "stock", "rating")
+
+
+def strip(rows: list) -> list:
+    """Only the fields the samples have"""
+    return [{name: row[name] for name in FIELDS} for row in rows]
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.parametrize("field, reverse", [("price", False), ("rating", True),
+                                            ("stock", True), ("stock", False)])
+@pytest.mark.parametrize("amount", [0, 1, 10, 299, 300, 1000])
+def test_top_matches_sorted(field, reverse, amount):
+    """Same books and tie order as sorting the whole list
+
+    Parameters
+    ----------
+    field : str
+        field to order by
+    reverse : bool
+        biggest first
+    amount : int
+        books to return
+
+    """
+    table = BookTable.from_books(BOOKS)
+    expected = sorted(BOOKS, key=lambda x: x[field], reverse=reverse)[:amount]
+
+    assert strip(table.top(field, amount, reverse).to_dicts()) == expected
+
+
+def test_filter_and_slice():
+    """Filters match python, slices share memory"""
+    table = BookTable.from_books(BOOKS)
+
+    found = table.filter((table.rating >= 4) & (table.stock > 0))
+    expected = [book for book in BOOKS if book["rating"] >= 4 and book["stock"] > 0]
+    assert strip(found.to_dicts()) == expected
+
+    part = table[10:20]
+    assert np.shares_memory(part.price, table.price)
+    assert strip(part.to_dicts()) == BOOKS[10:20]
+
+
+@pytest.mark.parametrize("field", ["price", "stock", "rating"])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_missing_fields(field, reverse):
+    """A None field reads back as None, is ordered last like BookIndex and
+    left out by filters and aggregates"""
+    books = [dict(book) for book in BOOKS[:60]]
+    for book in books[::4]:
+        book[field] = None
+
+    table = BookTable.from_books(books)
+    index = BookIndex(books)
+
+    assert table.row(0)[field] is None
+    assert strip(table.to_dicts()) == strip(books)
+    for amount in (5, 50, 60):
+        assert strip(table.top(field, amount, reverse).to_dicts()) == \
+            strip(index.top(field, amount, reverse))
+    assert strip(table.sort(field, reverse).to_dicts()) == \
+        strip(index.top(field, 60, reverse))
+
+    found = table.filter(getattr(table, field) <= 1000)
+    assert len(found) == sum(book[field] is not None for book in books)
+
+    if field == "rating":
+        assert table.aggregate("rating")[None] == 15
+    else:
+        means = table.aggregate("rating", field, "mean")
+        assert means[5] == pytest.approx(np.mean([
+            book[field] for book in books
+            if book["rating"] == 5 and book[field] is not None]))
+
+
+def test_aggregate_and_concat():
+    """Group by rating, merged tables share one string table"""
+    table = BookTable.from_books(BOOKS)
+
+    counts = table.aggregate("rating")
+    assert counts == {rating: sum(book["rating"] == rating for book in BOOKS)
+                      for rating in sorted({book["rating"] for book in BOOKS})}
+
+    top = table.aggregate("rating", "price", "max")
+    assert top[5] == max(book["price"] for book in BOOKS if book["rating"] == 5)
+
+    both = BookTable.concat([table, table[:5]])
+    assert len(both) == len(BOOKS) + 5
+    assert len(both.strings["title"]) == len(BOOKS)
+    assert strip(both.to_dicts()) == BOOKS + BOOKS[:5]
+
+
+#-----------------------------------------------
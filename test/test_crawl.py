@@ -0,0 +1,109 @@
+"""Testing whole crawls against the local fixture server
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import pytest
+from urllib.parse import urlsplit
+from parsers import get_base_url
+from parsers import set_base_url
+from pages import get_all_pages_books
+from pages import crawl_all_pages_books
+from pages import get_all_pages_books_pipelined
+from pages import Fetcher
+from pages import RateLimiter
+from pages import AsyncRateLimiter
+from pages import RetryPolicy
+from pages import rateLimiter
+from test.fixtureServer import FixtureServer
+
+#-----------------------------------------------
+# -- HELPERS --
+
+ENGINES = ("sync", "async", "pipeline")
+
+
+def crawl(engine: str, retries: int = 0):
+    """Books of a crawl with one of ENGINES, retrying errors when retries"""
+    retry = RetryPolicy(retries, base=0.01, cap=0.05)
+
+    if engine == "sync":
+        limiter = RateLimiter(retry, rate=None) if retries else None
+        with Fetcher(workers=16, limiter=limiter) as fetcher:
+            yield from get_all_pages_books(fetcher=fetcher)
+    elif engine == "async":
+        limiter = AsyncRateLimiter(retry, rate=None) if retries else None
+        yield from crawl_all_pages_books(limiter=limiter)
+    else:
+        limiter = RateLimiter(retry, rate=None) if retries else None
+        yield from get_all_pages_books_pipelined(parse_workers=2,
+                                                 limiter=limiter)
+
+
+def strip(books) -> list:
+    """Book dict's without stock_checked, which changes every crawl"""
+    return [{key: value for key, value in book.to_dict().items()
+             if key != "stock_checked"} for book in books]
+
+
+def serve(**kwargs):
+    """Start a FixtureServer and point the scraper at it, unpaced"""
+    server = FixtureServer(**kwargs)
+    server.start()
+
+    # the local fixture is not paced, only the real site is
+    host = urlsplit(server.base_url).netloc
+    previous = get_base_url()
+    set_base_url(server.base_url)
+    rateLimiter.HOST_RATES[host] = None
+    try:
+        yield server
+    finally:
+        del rateLimiter.HOST_RATES[host]
+        set_base_url(previous)
+        server.stop()
+
+
+def detail_requests(server) -> int:
+    """Book pages the server was asked for"""
+    return sum(count for path, count in server.requests.items()
+               if "/index.html" in path)
+
+
+@pytest.fixture
+def site():
+    yield from serve(pages=6, per_page=20)
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_crawl(site, engine):
+    """Every book of every page comes back in page order"""
+    assert strip(crawl(engine)) == site.records()
+    assert site.requests["/catalogue/page-7.html"] == 0
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_crawl_without_pager(engine):
+    """Pages are probed until the 404 after the last one"""
+    for server in serve(pages=4, per_page=5, pager=False):
+        assert strip(crawl(engine)) == server.records()
+        assert server.requests["/catalogue/page-5.html"] == 1
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_crawl_with_errors(engine):
+    """Injected 503's are retried away"""
+    for server in serve(pages=4, per_page=10, error_rate=0.2, seed=3):
+        assert strip(crawl(engine, retries=10)) == server.records()
+        assert sum(server.requests.values()) > 4 * 11
+
+
+#-----------------------------------------------
@@ -0,0 +1,36 @@
+"""Testing the pooled Fetcher used by the scraper
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import time
+import pytest
+from pages import Fetcher
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.parametrize("workers", [1, 8])
+def test_map_keeps_order(workers):
+    """Results come back in item order even when later items finish first
+
+    Parameters
+    ----------
+    workers : int
+        threads used by the fetcher
+
+    """
+    def slow(item):
+        time.sleep((10 - item) / 1000)
+        return item * 2
+
+    with Fetcher(workers=workers) as fetcher:
+        assert fetcher.map(slow, range(10)) == [i * 2 for i in range(10)]
+
+
+#-----------------------------------------------
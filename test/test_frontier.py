@@ -0,0 +1,172 @@
+"""Testing crawl checkpoints, a scrape that stopped part way is resumed
+against the local fixture server without fetching a finished page again
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import sqlite3
+import pytest
+import main
+from parsers import BookParser
+from parsers import BookRecord
+from parsers import page_url
+from parsers import page_number
+from pages.bookPages import get_stale_books
+from storage import Frontier
+from storage import iter_books
+from test.test_crawl import serve
+from test.test_shards import strip_dicts
+
+#-----------------------------------------------
+# -- HELPERS --
+
+
+class Stop(Exception):
+    """Raised by a save that gives up part way"""
+
+
+def stop_after(amount: int):
+    """A save that fails once it has been handed amount books"""
+    def save(books):
+        for seen, _ in enumerate(books, 1):
+            if seen == amount:
+                raise Stop(f"STOPPED AFTER {amount} BOOKS")
+    return save
+
+
+def book(idx: int, stock: int = 3) -> BookParser:
+    return BookParser.from_record(BookRecord(
+        title=f"book {idx}", price=1.0, stock=stock, rating=1,
+        link=f"book-{idx}", stock_checked=1.0))
+
+
+def requested(server) -> set:
+    """Urls the server was asked for"""
+    root = server.base_url.split("/catalogue/")[0]
+    return {root + path for path in server.requests}
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    yield from serve(pages=8, per_page=5)
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+def test_page_number():
+    assert page_number(page_url(12)) == 12
+    assert page_number(page_url(1) + "?x") is None
+    assert page_number("http://elsewhere/page-3.html") is None
+
+
+def test_pages_are_written_in_batches(tmp_path):
+    """Nothing is on disk until a batch of pages is done, then all of it"""
+    file_name = tmp_path / "frontier.db"
+
+    with Frontier(file_name, batch=2) as frontier:
+        frontier.page_done(2, page_url(2), [book(2)])
+
+        with sqlite3.connect(file_name) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM books").fetchone() == (0,)
+
+        frontier.page_done(1, page_url(1), [book(0), book(1)])
+
+        with sqlite3.connect(file_name) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM books").fetchone() == (3,)
+
+        assert [record["link"] for record in frontier.iter_books()] == [
+            "book-0", "book-1", "book-2"]
+
+
+def test_only_failures_are_retried(tmp_path):
+    """A reopened frontier reuses every stock but the failed one, and
+    in flight urls of the stopped crawl are pending again"""
+    file_name = tmp_path / "frontier.db"
+
+    with Frontier(file_name) as frontier:
+        assert frontier.plan({1: page_url(1), 2: page_url(2)}) == [1, 2]
+
+        frontier.page_done(1, page_url(1), [book(0), book(1, stock=-1)])
+        assert not frontier.reuse_stock(book(2))
+        frontier.fetching([book(2)])
+
+        # written before the page is done, a crash can not lose it
+        with sqlite3.connect(file_name) as conn:
+            assert conn.execute("SELECT state FROM urls WHERE url = 'book-2'"
+                                ).fetchone() == ("in_flight",)
+
+    with Frontier(file_name) as frontier:
+        assert frontier.todo() == [1, 2]
+        assert frontier.failed() == ["book-1", page_url(1)]
+        assert frontier.counts()[("detail", "pending")] == 1
+
+        assert frontier.reuse_stock(book(0, stock=None))
+        assert not frontier.reuse_stock(book(1, stock=None))
+        frontier.fetching([book(1)])
+        assert (frontier.reused, frontier.refetched) == (1, 1)
+
+        frontier.page_done(1, page_url(1), [book(0), book(1)])
+        assert frontier.todo() == [2]
+        assert frontier.failed() == []
+
+
+def test_checkpoints_keep_page_and_tries(tmp_path):
+    """A url checkpointed again adds up its tries, and keeps its page when
+    the new checkpoint has none"""
+    file_name = tmp_path / "frontier.db"
+
+    with Frontier(file_name, batch=1) as frontier:
+        for stock in (-1, 3):
+            assert not frontier.reuse_stock(book(0))
+            frontier.fetching([book(0)])
+            frontier.page_done(1, page_url(1), [book(0, stock)])
+
+    with sqlite3.connect(file_name) as conn:
+        assert conn.execute("SELECT url, state, page, tries FROM urls "
+                            "ORDER BY url").fetchall() == [
+            ("book-0", "done", 1, 2), (page_url(1), "done", 1, 2)]
+
+
+def test_lazy_books_are_not_fetched(tmp_path):
+    """A lazy crawl fetches no stock, nothing is in flight or refetched"""
+    with Frontier(tmp_path / "frontier.db") as frontier:
+        assert get_stale_books([book(0), book(1)], frontier, lazy_stock=True) == []
+
+        assert frontier.refetched == 0
+        assert ("detail", "in_flight") not in frontier.counts()
+
+
+@pytest.mark.parametrize("engine", ["async", "pipeline"])
+def test_resume(site, engine):
+    """A stopped scrape picks up after its last checkpoint, pages that are
+    done are not fetched again and the books come out in page order"""
+    with pytest.raises(Stop):
+        main.scrape_books(engine=engine, save=stop_after(12))
+
+    with Frontier(main.FRONTIER_FILE_NAME) as frontier:
+        done = {record["link"] for record in frontier.iter_books()}
+    assert len(done) >= 10
+
+    pages = {pos // 5 + 1 for pos, record in enumerate(site.records())
+             if record["link"] in done}
+
+    site.requests.clear()
+    books = main.scrape_books(engine=engine, resume=True)
+
+    assert strip_dicts(books) == site.records()
+    assert strip_dicts(iter_books(main.BOOKS_FILE_NAME)) == site.records()
+
+    # only the first page is asked for again, for its pager
+    again = requested(site) & (done | {page_url(idx) for idx in pages})
+    assert again == {page_url(1)}
+
+
+#-----------------------------------------------
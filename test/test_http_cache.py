@@ -0,0 +1,73 @@
+"""Testing the on disk ResponseCache
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import time
+import asyncio
+from pages import ResponseCache
+from pages import AsyncFetcher
+from test.fixtureServer import FixtureServer
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+def test_round_trip(tmp_path):
+    """A stored page comes back with its validators"""
+    cache = ResponseCache(str(tmp_path), fresh_for=60)
+    url = "http://books.toscrape.com/catalogue/page-1.html"
+
+    assert cache.lookup(url) is None
+
+    cache.put(url, b"<html></html>", {"ETag": '"abc"'})
+    entry = cache.lookup(url)
+
+    assert entry.content == b"<html></html>"
+    assert cache.is_fresh(entry)
+    assert cache.conditional_headers(entry) == {"If-None-Match": '"abc"'}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_async_counts(tmp_path):
+    """Async gets count a miss for a page that is stored and for one that
+    failed, asked again the stored one is a hit"""
+    cache = ResponseCache(str(tmp_path), fresh_for=60)
+
+    async def fetch(urls):
+        async with AsyncFetcher(cache=cache) as fetcher:
+            return [(await fetcher.get(url))[0] for url in urls]
+
+    with FixtureServer(pages=1, per_page=1) as server:
+        page, missing = server.base_url + "page-1.html", server.base_url + "nowhere"
+        assert asyncio.run(fetch([page, missing, page])) == [200, 404, 200]
+        assert (cache.hits, cache.revalidated, cache.misses) == (1, 0, 2)
+
+    # only the page that was fetched is stored
+    assert len(os.listdir(str(tmp_path))) == 1
+
+
+def test_prune(tmp_path):
+    """Old entries go first, then the oldest until under max_size"""
+    cache = ResponseCache(str(tmp_path), max_age=60, max_size=10**6)
+
+    for idx in range(5):
+        cache.put(f"http://example.com/{idx}", os.urandom(1000), {})
+
+    # make the first entry a day old
+    old = os.path.join(str(tmp_path), sorted(os.listdir(str(tmp_path)))[0])
+    os.utime(old, (time.time() - 86400, time.time() - 86400))
+
+    cache.prune()
+    assert len(os.listdir(str(tmp_path))) == 4
+
+    cache.max_size = 2500
+    cache.prune()
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+#-----------------------------------------------
@@ -0,0 +1,48 @@
+"""Testing json lines storage of books
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import json
+from storage import JsonLinesWriter
+from storage import iter_books
+from storage import convert_legacy
+from test.test_book_index import BOOKS
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+def test_round_trip(tmp_path):
+    """Books come back in order, a cut off last line is skipped"""
+    file_name = str(tmp_path / "books.jsonl")
+
+    with JsonLinesWriter(file_name, sync_every=7, mode="w") as writer:
+        for book in BOOKS:
+            writer.write(book)
+
+    # crash while writing the next book
+    with open(file_name, "a") as j_file:
+        j_file.write('{"title": "Book 3')
+
+    assert list(iter_books(file_name)) == BOOKS
+
+
+def test_convert_legacy(tmp_path):
+    """Legacy files load and convert to the same books"""
+    legacy = str(tmp_path / "books.json")
+    with open(legacy, "w") as j_file:
+        json.dump(dict(books=BOOKS), j_file, indent=4)
+
+    assert list(iter_books(legacy)) == BOOKS
+
+    converted = str(tmp_path / "books.jsonl")
+    assert convert_legacy(legacy, converted) == len(BOOKS)
+    assert list(iter_books(converted)) == BOOKS
+
+
+#-----------------------------------------------
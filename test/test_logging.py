@@ -0,0 +1,81 @@
+"""Testing the queued, rotating log file of main.setup_logging
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import logging
+import threading
+import pytest
+import main
+
+#-----------------------------------------------
+# -- FIXTURES --
+
+
+@pytest.fixture
+def root():
+    """Root logger without pytest's handlers, put back afterwards"""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    yield root
+
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+def test_records_written_by_listener(root, tmp_path):
+    """Records of every thread reach the file once the listener stops,
+    records under the level are dropped"""
+    file_name = tmp_path / "logs.txt"
+    listener = main.setup_logging("info", file_name)
+    logger = logging.getLogger("scraper.test")
+
+    def log(idx):
+        logger.info("PAGE %d DONE", idx)
+        logger.debug("PAGE %d BOOKS", idx)
+
+    threads = [threading.Thread(target=log, args=(idx,)) for idx in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    listener.stop()
+
+    lines = file_name.read_text().splitlines()
+    assert sorted(line.split("] ")[1] for line in lines) == [
+        f"PAGE {idx} DONE" for idx in range(8)]
+    assert all("test_logging.py" in line for line in lines)
+
+
+def test_rotation(root, tmp_path, monkeypatch):
+    """The file is rotated at LOG_MAX_BYTES keeping LOG_BACKUPS old files"""
+    monkeypatch.setattr(main, "LOG_MAX_BYTES", 1024)
+    monkeypatch.setattr(main, "LOG_BACKUPS", 2)
+
+    listener = main.setup_logging("DEBUG", tmp_path / "logs.txt")
+    for idx in range(200):
+        logging.getLogger("scraper.test").debug("RECORD %d", idx)
+    listener.stop()
+
+    assert sorted(os.listdir(tmp_path)) == ["logs.txt", "logs.txt.1",
+                                            "logs.txt.2"]
+    assert all(os.path.getsize(tmp_path / name) <= 1024
+               for name in os.listdir(tmp_path))
+
+
+#-----------------------------------------------
@@ -0,0 +1,88 @@
+"""Testing that a crawl's memory stays flat as the catalogue grows, every
+page's response and parse tree is released once its books are handed over
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import gc
+import tracemalloc
+from collections import Counter
+import pytest
+from test.test_crawl import crawl
+from test.test_crawl import serve
+
+#-----------------------------------------------
+# -- GLOBALS --
+
+PER_PAGE = 10
+
+# a crawl of LARGE pages may hold SLACK_KB more then one of SMALL pages,
+# a listing page and its parse tree are about 100KB. Its peak can be
+# further off as it depends on how many pages happen to be parsed at once
+SMALL = 16
+LARGE = 64
+SLACK_KB = 256
+PEAK_GROWTH = 2.0
+
+#-----------------------------------------------
+# -- HELPERS --
+
+
+class Uncounted(Counter):
+    """Request counts that are never stored"""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+def measure_kb(engine: str, pages: int) -> tuple:
+    """KB traced while crawling pages, books are dropped as they arrive
+    the way they are written to storage
+
+    Returns
+    -------
+    tuple
+        (most KB held while a book is handed over, peak KB). The first is
+        what is kept from page to page, the peak also counts the trees of
+        the pages being parsed at that moment
+    """
+    for server in serve(pages=pages, per_page=PER_PAGE):
+        # the server runs in this process, a count per path would be
+        # traced along with the crawl
+        server.requests = Uncounted()
+
+        gc.collect()
+        tracemalloc.start()
+        held = books = 0
+        try:
+            for _ in crawl(engine):
+                held = max(held, tracemalloc.get_traced_memory()[0])
+                books += 1
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert books == pages * PER_PAGE
+    return held // 1024, peak // 1024
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.parametrize("engine", ["sync", "async", "pipeline"])
+def test_memory_is_bounded(engine):
+    """Four times the pages, about the same memory"""
+    small = measure_kb(engine, SMALL)
+    large = measure_kb(engine, LARGE)
+    msg = f"{SMALL} PAGES: {small}KB, {LARGE} PAGES: {large}KB"
+
+    assert large[0] <= small[0] + SLACK_KB, msg
+    assert large[1] <= small[1] * PEAK_GROWTH, msg
+
+
+#-----------------------------------------------
@@ -0,0 +1,88 @@
+"""Testing the metrics registry and the metrics a crawl records
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import json
+import pytest
+import main
+from metrics import Metrics
+from metrics import Histogram
+from metrics import get_metrics
+from test.test_crawl import serve
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+def test_histogram():
+    """Percentiles are the upper bound of their bucket"""
+    hist = Histogram(buckets=(0.1, 1.0))
+    assert hist.percentile(50) == 0.0
+
+    for value in (0.05, 0.05, 0.5, 5.0):
+        hist.observe(value)
+
+    assert hist.count == 4
+    assert hist.sum == pytest.approx(5.6)
+    assert hist.percentile(50) == 0.1
+    assert hist.percentile(75) == 1.0
+    assert hist.percentile(99) == float("inf")
+    assert hist.cumulative() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+
+
+def test_prometheus_format():
+    """Counters, gauges and histograms in the text format"""
+    metrics = Metrics()
+    metrics.inc("scraper_responses_total", kind="listing", status=200)
+    metrics.inc("scraper_responses_total", kind="listing", status=200)
+    metrics.set_max("scraper_queue_depth_max", 3, queue="parse")
+    metrics.set_max("scraper_queue_depth_max", 1, queue="parse")
+    metrics.observe("scraper_request_seconds", 0.2, kind="detail")
+
+    text = metrics.to_prometheus()
+
+    assert "# TYPE scraper_responses_total counter" in text
+    assert 'scraper_responses_total{kind="listing",status="200"} 2' in text
+    assert 'scraper_queue_depth_max{queue="parse"} 3' in text
+    assert "# TYPE scraper_request_seconds histogram" in text
+    assert 'scraper_request_seconds_bucket{kind="detail",le="0.1"} 0' in text
+    assert 'scraper_request_seconds_bucket{kind="detail",le="+Inf"} 1' in text
+    assert 'scraper_request_seconds_count{kind="detail"} 1' in text
+
+    with pytest.raises(TypeError):
+        metrics.set("scraper_responses_total", 1)
+
+
+@pytest.mark.parametrize("engine", ["async", "pipeline"])
+def test_crawl_metrics(tmp_path, monkeypatch, engine):
+    """A scrape records every phase and writes both exports"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+
+    for server in serve(pages=3, per_page=10):
+        books = main.scrape_books(engine=engine)
+
+    metrics = get_metrics()
+    assert len(books) == 30
+    assert metrics.get("scraper_responses_total", kind="listing", status=200) == 3
+    assert metrics.get("scraper_responses_total", kind="detail", status=200) == 30
+    assert metrics.get("scraper_request_seconds", kind="detail").count == 30
+    assert metrics.get("scraper_parse_seconds", kind="listing").count == 3
+    assert metrics.get("scraper_parse_seconds", kind="detail").count == 30
+    assert metrics.total("scraper_books_parsed_total") == 30
+    assert metrics.get("scraper_books_stored_total") == 30
+    assert metrics.get("scraper_cache_total", result="misses") == 33
+    assert metrics.get("scraper_books_per_second") > 0
+
+    with open("data/metrics.json") as j_file:
+        assert json.load(j_file)["scraper_books_stored_total"]["type"] == "counter"
+    with open("data/metrics.prom") as p_file:
+        assert "scraper_crawl_seconds " in p_file.read()
+
+
+#-----------------------------------------------
@@ -0,0 +1,84 @@
+"""Testing the ParsePool of worker processes
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import threading
+from concurrent.futures import Future
+from parsers import get_backend
+from pages import ParsePool
+from pages import parsePool
+from test.test_parser import LISTING_PAGE
+from test.test_parser import BOOK_INFO_STOCK
+
+#-----------------------------------------------
+# -- HELPERS --
+
+
+class HeldExecutor:
+    """Stands in for the worker processes, nothing is parsed until the
+    test finishes a future itself"""
+
+    def __init__(self):
+        self.held = []
+
+    def submit(self, func, *args):
+        future = Future()
+        self.held.append(future)
+        return future
+
+    def shutdown(self, wait: bool = True):
+        pass
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+def test_parse_pool():
+    """Workers give the same records as parsing in process"""
+    listing = LISTING_PAGE.encode("utf-8")
+    stock = BOOK_INFO_STOCK.encode("utf-8")
+
+    with ParsePool(workers=2, queue_size=2) as pool:
+        books = [pool.submit_books(listing) for _ in range(6)]
+        stocks = [pool.submit_stock(stock) for _ in range(6)]
+
+        assert [future.result() for future in books] == [get_backend().books(listing)] * 6
+        assert [future.result() for future in stocks] == [22] * 6
+
+
+def test_submit_waits_for_a_slot(monkeypatch):
+    """With queue_size pages held by the workers a further submit blocks
+    until one of them is parsed"""
+    executor = HeldExecutor()
+    monkeypatch.setattr(parsePool, "ProcessPoolExecutor", lambda max_workers: executor)
+
+    with ParsePool(workers=1, queue_size=2) as pool:
+        first = pool.submit_stock(b"")
+        pool.submit_stock(b"")
+
+        third = threading.Thread(target=pool.submit_stock, args=(b"",))
+        third.start()
+        third.join(0.2)
+
+        assert third.is_alive()
+        assert (pool.depth, len(executor.held)) == (2, 2)
+
+        executor.held[0].set_result((7, 0.0))
+        third.join(5)
+
+        assert not third.is_alive()
+        assert first.result() == 7
+        assert (pool.depth, len(executor.held)) == (2, 3)
+
+        for future in executor.held[1:]:
+            future.set_result((7, 0.0))
+        assert pool.depth == 0
+
+
+#-----------------------------------------------
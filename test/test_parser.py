@@ -12,6 +12,9 @@ import pytest
 from bs4 import BeautifulSoup
 from parsers import BookParser
 from parsers import InnerBookParser
+from parsers import PagerParser
+from parsers import BACKENDS
+from parsers import get_backend
 
 #-----------------------------------------------
 # -- LOCATORS / HTML SAMPLES --
@@ -76,6 +79,24 @@ BOOK_INFO_STOCK = """
 </div>
 """
 
+# LISTING PAGES END WITH A PAGER HOLDING THE PAGE COUNT
+PAGER_INFO = """
+<ul class="pager">
+    <li class="current">
+        Page 3 of 50
+    </li>
+    <li class="next"><a href="page-4.html">next</a></li>
+</ul>
+"""
+
+# A WHOLE LISTING PAGE, BOOKS FOLLOWED BY THE PAGER
+LISTING_PAGE = f"""
+<html><body><section>
+<ol class="row">{BOOK_INFO_LI}</ol>
+<div>{PAGER_INFO}</div>
+</section></body></html>
+"""
+
 #-----------------------------------------------
 # -- TESTING --
 
@@ -114,5 +135,66 @@ def test_parser(title, stock, rating, price):
     assert book.rating == rating
     assert book.price == price
 
+    # fields are read once, the soup tree is not kept
+    assert not hasattr(book, "page")
+    assert book.to_dict() == dict(title=title, price=price, stock=stock, rating=rating,
+                                  link="http://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html",
+                                  stock_checked=0)
+
+
+@pytest.mark.parametrize("html, current, total", [(PAGER_INFO, 3, 50),
+                                                   ("<ul></ul>", None, None)])
+def test_pager_parser(html, current, total):
+    """Test pager parser reads the page count
+
+    Parameters
+    ----------
+    html : str
+        listing page fragment
+    current : int
+        number of the page
+    total : int
+        amount of pages
+
+    """
+    pager = PagerParser(BeautifulSoup(html, "html.parser"))
+
+    assert pager.current == current
+    assert pager.total == total
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("title, stock, rating, price",
+                         [("A Light in the Attic", 22, 3, 51.77)])
+def test_backends(backend, title, stock, rating, price):
+    """Every parser backend gives the same output as the parsers
+
+    Parameters
+    ----------
+    backend : str
+        name of the backend
+    title : str
+        name of the book
+    stock : int
+        amount of books available
+    rating : int
+        score it was given
+    price : float
+        how much it costs
+
+    """
+    parser = get_backend(backend)
+    content = LISTING_PAGE.encode("utf-8")
+
+    books = parser.books(content)
+    expected = BookParser(
+        BeautifulSoup(BOOK_INFO_LI, "html.parser").select_one(BOOK_LOCATOR))
+
+    assert books == [expected.record]
+    assert (books[0].title, books[0].rating, books[0].price) == (title, rating, price)
+    assert parser.stock(BOOK_INFO_STOCK.encode("utf-8")) == stock
+    assert parser.page_count(content) == 50
+    assert parser.page_count(BOOK_INFO_STOCK.encode("utf-8")) is None
+
 
 #-----------------------------------------------
@@ -0,0 +1,182 @@
+"""Testing the query server answers from memory, pages through filtered
+books and swaps in a new snapshot without failing a request
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import json
+import time
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+import pytest
+from queries import BookIndex
+from server import QueryServer
+from storage import JsonLinesWriter
+from storage import iter_books
+
+#-----------------------------------------------
+# -- HELPERS --
+
+
+def make_books(amount: int, price: float = 0.0) -> list:
+    return [dict(title=f"Book {idx}", price=round(price + (idx * 7) % 50 + 0.5, 2),
+                 stock=(idx * 3) % 20, rating=idx % 5 + 1,
+                 link=f"book-{idx}", stock_checked=1.0)
+            for idx in range(amount)]
+
+
+def write_books(file_name, books: list):
+    """Written the way a scrape writes them, swapped in whole"""
+    with JsonLinesWriter(f"{file_name}.partial", mode="w") as writer:
+        for book in books:
+            writer.write(book)
+    os.replace(f"{file_name}.partial", file_name)
+
+
+def get(server, path: str) -> dict:
+    with urlopen(server.base_url + path) as answer:
+        return json.load(answer)
+
+
+@pytest.fixture
+def books_file(tmp_path):
+    file_name = str(tmp_path / "books.jsonl")
+    write_books(file_name, make_books(100))
+    return file_name
+
+
+@pytest.fixture
+def server(books_file):
+    load = lambda: list(iter_books(books_file))
+    with QueryServer(load, books_file, port=0, poll=0.01) as server:
+        yield server
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.parametrize("path, field, reverse", [
+    ("/top-rated", "rating", True),
+    ("/cheapest", "price", False),
+    ("/most-stocked", "stock", True),
+])
+def test_top_queries(server, books_file, path, field, reverse):
+    index = BookIndex(make_books(100))
+
+    assert get(server, f"{path}?amount=7")["books"] == index.top(field, 7, reverse)
+    assert len(get(server, path)["books"]) == 10
+
+
+def test_filtered_pages(server):
+    """Pages of a filtered query add up to the whole query"""
+    where = lambda book: book["rating"] >= 4 and book["price"] <= 30
+    expected = BookIndex(make_books(100)).top("stock", 100, True, where)
+
+    books, offset, more = [], 0, True
+    while more:
+        page = get(server, f"/books?sort=stock&reverse=1&min_rating=4"
+                           f"&max_price=30&offset={offset}&limit=6")
+        books += page["books"]
+        offset, more = offset + 6, page["more"]
+
+    assert books == expected
+    assert get(server, "/books?title=book+42")["books"][0]["link"] == "book-42"
+
+    stocked = get(server, "/books?min_stock=5&max_stock=7&limit=100")["books"]
+    assert stocked == BookIndex(make_books(100)).top(
+        "price", 100, where=lambda book: 5 <= book["stock"] <= 7)
+
+
+@pytest.mark.parametrize("path", ["/books?sort=title", "/books?min_price=x",
+                                  "/cheapest?amount=-1", "/nowhere"])
+def test_bad_requests(server, path):
+    with pytest.raises(HTTPError) as err:
+        get(server, path)
+    assert err.value.code == (404 if path == "/nowhere" else 400)
+
+
+def test_failed_answer(server):
+    """An error answering is a 500 and the server keeps answering"""
+    server.index = BookIndex(make_books(10) + [dict(title=42, price=1.0)])
+
+    with pytest.raises(HTTPError) as err:
+        get(server, "/books?title=book")
+    assert err.value.code == 500
+    assert "AttributeError" in json.load(err.value)["error"]
+
+    assert len(get(server, "/cheapest")["books"]) == 10
+
+
+def test_stop_without_start():
+    """A server that never started stops at once and frees its port"""
+    server = QueryServer(lambda: make_books(3), port=0)
+    stopper = threading.Thread(target=server.stop)
+    stopper.start()
+    stopper.join(5)
+
+    assert not stopper.is_alive()
+    assert server.httpd.socket.fileno() == -1
+
+
+def test_reload_keeps_answering(server, books_file):
+    """Requests made while new snapshots are swapped in all succeed, and
+    the newest books are served once it is written"""
+    failures = []
+    stop = threading.Event()
+
+    def ask():
+        while not stop.is_set():
+            try:
+                assert len(get(server, "/cheapest?amount=50")["books"]) == 50
+            except Exception as err:
+                failures.append(err)
+
+    askers = [threading.Thread(target=ask) for _ in range(4)]
+    for asker in askers:
+        asker.start()
+
+    try:
+        for version in range(1, 6):
+            write_books(books_file, make_books(100 + version, price=100.0))
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        for asker in askers:
+            asker.join()
+
+    deadline = time.time() + 5
+    while get(server, "/stats")["books"] != 105 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert not failures
+    assert get(server, "/cheapest?amount=1")["books"][0]["price"] == 100.5
+    assert get(server, "/stats")["loads"] >= 2
+
+
+def test_bad_snapshot_keeps_old_books(server, books_file):
+    loads = server.loads
+    with open(books_file, "w") as file:
+        file.write("{not json\n")
+
+    time.sleep(0.2)
+    assert server.loads == loads
+    assert get(server, "/stats")["books"] == 100
+
+
+def test_latency_percentiles(server):
+    for _ in range(20):
+        get(server, "/top-rated")
+
+    latency = get(server, "/stats")["latency"]["/top-rated"]
+
+    assert latency["count"] == 20
+    assert 0 < latency["p50"] <= latency["p90"] <= latency["p99"]
+
+
+#-----------------------------------------------
@@ -0,0 +1,217 @@
+"""Testing the rate limiter and retries of the fetchers against a stub
+server that injects errors and latency
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import time
+import asyncio
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import pytest
+from pages import Fetcher
+from pages import AsyncFetcher
+from pages import RateLimiter
+from pages import AsyncRateLimiter
+from pages import RetryPolicy
+from pages import FetchError
+from pages import rateLimiter
+from pages.rateLimiter import TokenBucket
+from pages.rateLimiter import AimdLimit
+from pages.bookPages import get_books_stock
+
+#-----------------------------------------------
+# -- STUB SERVER --
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers /ok/N with 200 after failing it `failures` times with
+    `status`, /gone with 404 and /broken with 503 every time"""
+
+    failures = 2
+    status = 503
+    latency = 0.005
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.seen[self.path] += 1
+            seen = server.seen[self.path]
+
+        time.sleep(self.latency)
+
+        if self.path == "/gone":
+            code = 404
+        elif self.path == "/broken" or seen <= self.failures:
+            code = self.status
+        else:
+            code = 200
+
+        body = b"<p class='instock availability'>In stock (7 available)</p>"
+        self.send_response(code)
+        if code == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        with server.lock:
+            server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    httpd.lock = threading.Lock()
+    httpd.in_flight = httpd.max_in_flight = 0
+    httpd.seen = Counter()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fast_retries(retries: int = 3) -> RetryPolicy:
+    return RetryPolicy(retries=retries, base=0.01, cap=0.05)
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+def test_token_bucket():
+    """Burst is free, then requests are spaced by 1 / rate"""
+    bucket = TokenBucket(rate=10, burst=2)
+    now = time.monotonic()
+
+    assert [bucket.reserve(now) for _ in range(2)] == [0, 0]
+    assert bucket.reserve(now) == pytest.approx(0.1)
+    assert bucket.reserve(now) == pytest.approx(0.2)
+
+    # a second later it is full again
+    assert bucket.reserve(now + 1.3) == 0
+
+    bucket.pause(1.0, now + 1.3)
+    assert bucket.reserve(now + 1.3) == pytest.approx(1.1)
+
+
+def test_host_rates(monkeypatch):
+    """Hosts are paced at RATE unless HOST_RATES or the limiter say other"""
+    monkeypatch.setitem(rateLimiter.HOST_RATES, "slow:80", 2)
+    limiter = RateLimiter(hosts={"fast:80": dict(rate=None)})
+
+    assert limiter.host("http://books.toscrape.com/").bucket.rate == rateLimiter.RATE
+    assert limiter.host("http://slow:80/").bucket.rate == 2
+    assert limiter.host("http://fast:80/").bucket.rate is None
+    assert RateLimiter(rate=5).host("http://slow:80/").bucket.rate == 5
+
+
+def test_aimd_limit():
+    """Overload halves the limit once per window, healthy answers add one
+    per limit requests"""
+    aimd = AimdLimit(initial=8, minimum=1, maximum=10, latency_target=1.0)
+
+    for _ in range(3):
+        assert aimd.try_start()
+        aimd.finish(0.1, overloaded=True, now=100.0)
+    assert aimd.limit == 4
+
+    aimd.finish(0.1, overloaded=True, now=101.5)
+    assert aimd.limit == 2
+
+    for _ in range(2):
+        aimd.finish(0.1, overloaded=False)
+    assert aimd.limit == pytest.approx(3, abs=0.2)
+
+    # slow answers hold the limit
+    aimd.finish(5.0, overloaded=False)
+    assert aimd.limit == pytest.approx(3, abs=0.2)
+
+    aimd.in_flight = int(aimd.limit)
+    assert not aimd.try_start()
+
+
+def test_retry_delay():
+    """Jittered delays stay under the exponential bound and the cap"""
+    retry = RetryPolicy(base=0.5, cap=4.0)
+
+    for attempt in range(1, 8):
+        delay = retry.delay(attempt)
+        assert 0 <= delay <= min(4.0, 0.5 * 2 ** (attempt - 1))
+
+    assert retry.delay(1, "2") >= 2
+    assert retry.delay(1, "120") == 4.0
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_fetcher_retries(server, status):
+    """Every page comes back once its failures are retried, the limit on
+    pages in flight is kept"""
+    StubHandler.status = status
+    limiter = RateLimiter(fast_retries(), rate=500, initial=4, maximum=4)
+    urls = [f"{server.url}/ok/{idx}" for idx in range(20)]
+
+    with Fetcher(workers=16, limiter=limiter) as fetcher:
+        pages = fetcher.map(fetcher.get, urls)
+
+    assert [page.status_code for page in pages] == [200] * 20
+    assert server.max_in_flight <= 4
+    assert limiter.overloaded == 40
+
+    # cut while pages failed, grown back once they were answered
+    assert limiter.host(urls[0]).aimd.limit == 4
+
+
+def test_fetcher_gives_up(server):
+    """A page failing every attempt raises, stock falls back to -1"""
+    limiter = RateLimiter(fast_retries(2), rate=None)
+
+    with Fetcher(limiter=limiter) as fetcher:
+        with pytest.raises(FetchError):
+            fetcher.get(f"{server.url}/broken")
+
+        assert get_books_stock(f"{server.url}/broken", fetcher) == -1
+        assert fetcher.get(f"{server.url}/gone").status_code == 404
+
+    assert server.seen["/broken"] == 6
+    assert server.seen["/gone"] == 1
+    assert limiter.failed == 2
+
+
+def test_async_fetcher_retries(server):
+    """Same as the threaded fetcher on one event loop"""
+    StubHandler.status = 503
+    limiter = AsyncRateLimiter(fast_retries(), rate=500, initial=4, maximum=4)
+    urls = [f"{server.url}/ok/{idx}" for idx in range(20)]
+
+    async def crawl():
+        async with AsyncFetcher(limiter=limiter) as fetcher:
+            pages = await asyncio.gather(*(fetcher.get(url) for url in urls))
+
+            with pytest.raises(FetchError):
+                await fetcher.get(f"{server.url}/broken")
+        return pages
+
+    pages = asyncio.run(crawl())
+
+    assert [status for status, _ in pages] == [200] * 20
+    assert server.max_in_flight <= 4
+    assert limiter.failed == 1
+
+
+#-----------------------------------------------
@@ -0,0 +1,121 @@
+"""Testing sharded crawls and merging their books against the local
+fixture server
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import pytest
+import main
+from pages import get_shard_pages
+from pages import find_shard_pages
+from pages import get_all_pages_books
+from pages import crawl_all_pages_books
+from pages import get_all_pages_books_pipelined
+from pages import Fetcher
+from storage import JsonLinesWriter
+from storage import iter_books
+from storage import shard_file_name
+from storage import find_shard_files
+from storage import merge_shards
+from test.test_crawl import strip
+from test.test_crawl import serve
+
+#-----------------------------------------------
+# -- HELPERS --
+
+
+def crawl_shard(engine: str, shard: int, shards: int):
+    """Books of one shard with one of the engines"""
+    with Fetcher(workers=8) as fetcher:
+        if engine == "sync":
+            yield from get_all_pages_books(fetcher=fetcher, shard=(shard, shards))
+            return
+        pages = find_shard_pages(shard, shards, fetcher)
+
+    if engine == "async":
+        yield from crawl_all_pages_books(pages=pages)
+    else:
+        yield from get_all_pages_books_pipelined(parse_workers=2, pages=pages)
+
+
+def strip_dicts(books) -> list:
+    """Book dict's without stock_checked"""
+    return [{key: value for key, value in book.items()
+             if key != "stock_checked"} for book in books]
+
+
+@pytest.fixture
+def site():
+    yield from serve(pages=7, per_page=5)
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.parametrize("total", [0, 1, 7, 50])
+@pytest.mark.parametrize("shards", [1, 3, 8])
+def test_shard_pages(total, shards):
+    """Shards cover every page once, in order, and differ by at most one"""
+    ranges = [get_shard_pages(shard, shards, total) for shard in range(shards)]
+
+    assert [page for pages in ranges for page in pages] == list(range(1, total + 1))
+    assert max(map(len, ranges)) - min(map(len, ranges)) <= 1
+
+    with pytest.raises(ValueError):
+        get_shard_pages(shards, shards, total)
+
+
+@pytest.mark.parametrize("engine", ["sync", "async", "pipeline"])
+def test_shards_cover_the_site(site, engine):
+    """The shards of every engine add up to the whole crawl"""
+    books = [book for shard in range(3)
+             for book in strip(crawl_shard(engine, shard, 3))]
+
+    assert books == site.records()
+
+
+def test_shards_need_a_pager():
+    for server in serve(pages=3, per_page=2, pager=False):
+        with pytest.raises(ValueError):
+            find_shard_pages(0, 2, Fetcher())
+
+
+def test_merge_drops_repeats(tmp_path):
+    """A book seen by two shards is kept where it was first seen"""
+    books = [dict(title=f"book {idx}", price=1.0, stock=1, rating=1,
+                  link=f"book-{idx}") for idx in range(6)]
+
+    for shard, part in ((1, books[2:]), (0, books[:3])):
+        with JsonLinesWriter(shard_file_name(tmp_path, shard, 2)) as writer:
+            for book in part:
+                writer.write(book)
+
+    shards, files = find_shard_files(tmp_path)
+
+    assert shards == 2
+    assert list(merge_shards(files.values())) == books
+
+
+def test_scrape_sharded(site, tmp_path, monkeypatch):
+    """Shards run in their own processes and are merged into storage,
+    a missing shard stops the merge until it is scraped again"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+
+    assert main.scrape_sharded(3) == 35
+    assert strip_dicts(iter_books(main.BOOKS_FILE_NAME)) == site.records()
+
+    os.remove(shard_file_name(main.SHARD_DIR, 1, 3))
+    with pytest.raises(main.MissingShardsError):
+        main.merge_shard_books()
+
+    assert len(main.scrape_shard(1, 3)) == 10
+    assert main.merge_shard_books() == 35
+
+
+#-----------------------------------------------
@@ -0,0 +1,131 @@
+"""Testing Snapshot decides which books need their stock fetched again
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import shutil
+from types import SimpleNamespace
+import pytest
+import main
+from pages import Snapshot
+from pages.bookPages import listing_fingerprint
+from metrics import get_metrics
+from test.test_crawl import serve
+from test.test_crawl import detail_requests
+
+#-----------------------------------------------
+# -- SAMPLES --
+
+OLD_BOOK = dict(title="A Light in the Attic", price=51.77, stock=22, rating=3,
+                link="http://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html",
+                stock_checked=1000.0)
+
+LISTING = b"""<html><body><section><div class="alert">{}</div>
+<ol class="row"><li class="col-xs-6">{}</li></ol>
+<ul class="pager"><li class="current">Page 1 of 2</li></ul></section></body></html>"""
+
+#-----------------------------------------------
+# -- HELPERS --
+
+
+def refresh(server, engine: str) -> list:
+    """Scrape again with a fresh http cache, so every page is asked for"""
+    shutil.rmtree("data/http_cache", ignore_errors=True)
+    server.requests.clear()
+    return main.scrape_books(incremental=True, engine=engine)
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.parametrize("changes, now, reused", [
+    ({}, 1030.0, True),
+    ({"price": 40.0}, 1030.0, False),
+    ({"link": "http://books.toscrape.com/catalogue/new/index.html"}, 1030.0, False),
+    ({}, 1000.0 + 61, False),
+])
+def test_reuse_stock(changes, now, reused):
+    """Stock is only reused for the same, recently checked book
+
+    Parameters
+    ----------
+    changes : dict
+        fields of the fresh book that differ from the snapshot
+    now : float
+        time of the re-scrape
+    reused : bool
+        if the old stock should be reused
+
+    """
+    snapshot = Snapshot([OLD_BOOK], ttl=60)
+    fields = {**OLD_BOOK, **changes, "stock": 0, "stock_checked": 0}
+    book = SimpleNamespace(**fields)
+
+    assert snapshot.reuse_stock(book, now) == reused
+    assert book.stock == (22 if reused else 0)
+
+
+def test_listing_fingerprint():
+    """Only the list of books counts towards the fingerprint"""
+    page = LISTING.replace(b"{}", b"book", 1)
+
+    assert listing_fingerprint(page.replace(b"{}", b"a")) == \
+        listing_fingerprint(page.replace(b"{}", b"a").replace(b"Page 1", b"Page 3"))
+    assert listing_fingerprint(page.replace(b"{}", b"a")) != \
+        listing_fingerprint(page.replace(b"{}", b"b"))
+    assert listing_fingerprint(b"<html></html>") is None
+
+
+def test_reuse_page():
+    """A page is reused when its fingerprint matches and every one of its
+    books is in the snapshot"""
+    url = "http://books.toscrape.com/catalogue/page-1.html"
+    snapshot = Snapshot([OLD_BOOK], pages={
+        url: dict(fingerprint="abc", links=[OLD_BOOK["link"]])})
+
+    (record,) = snapshot.reuse_page(url, "abc")
+    assert record._asdict() == OLD_BOOK
+
+    assert snapshot.reuse_page(url, "abd") is None
+    assert snapshot.reuse_page(url.replace("-1", "-2"), "abc") is None
+    assert (snapshot.page_hits, snapshot.page_misses) == (1, 2)
+
+    snapshot.books.clear()
+    assert snapshot.reuse_page(url, "abc") is None
+
+
+@pytest.mark.parametrize("engine", ["async", "pipeline"])
+def test_refresh_skips_unchanged_pages(tmp_path, monkeypatch, engine):
+    """A refresh reuses the books of unchanged listing pages without
+    parsing them, a changed page is parsed and its detail pages fetched"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+
+    for site in serve(pages=4, per_page=5):
+        main.scrape_books(engine=engine)
+
+        site.books[7]["price"] = 1.5
+        books = refresh(site, engine)
+
+        assert [book["price"] for book in books] == [
+            book["price"] for book in site.records()]
+        assert get_metrics().get("scraper_fingerprint_total", result="hit") == 3
+        assert get_metrics().get("scraper_fingerprint_total", result="miss") == 1
+
+        # the changed book is on page 2, the only page parsed
+        assert get_metrics().total("scraper_books_parsed_total") == 5
+        assert detail_requests(site) == 1
+
+        refresh(site, engine)
+
+        assert get_metrics().get("scraper_fingerprint_total", result="hit") == 4
+        assert get_metrics().total("scraper_books_parsed_total") == 0
+        assert detail_requests(site) == 0
+
+
+#-----------------------------------------------
@@ -0,0 +1,133 @@
+"""Testing binary snapshot files
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import pytest
+from queries import BookIndex
+from storage import JsonLinesWriter
+from storage import SnapshotFile
+from storage import SnapshotFileError
+from storage import iter_books
+from storage import import_json
+from storage import export_json
+from storage import write_snapshot_file
+from test.test_book_index import BOOKS
+
+#-----------------------------------------------
+# -- SAMPLES --
+
+FULL_BOOKS = [
+    dict(book, link=f"http://books.toscrape.com/catalogue/{idx}/index.html",
+         stock_checked=None if idx % 3 else 1700000000.5 + idx)
+    for idx, book in enumerate(BOOKS)
+]
+FULL_BOOKS[0]["title"] = "Ça, ünïcode"
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+def test_json_round_trip(tmp_path):
+    """json to snapshot and back gives the same books"""
+    jsonl_file = str(tmp_path / "books.jsonl")
+    with JsonLinesWriter(jsonl_file, mode="w") as writer:
+        for book in FULL_BOOKS:
+            writer.write(book)
+
+    snapshot_file = str(tmp_path / "books.bin")
+    assert import_json(jsonl_file, snapshot_file) == len(FULL_BOOKS)
+
+    with SnapshotFile(snapshot_file) as snapshot:
+        assert len(snapshot) == len(FULL_BOOKS)
+        assert snapshot[0] == FULL_BOOKS[0]
+        assert list(snapshot) == FULL_BOOKS
+
+    out_file = str(tmp_path / "out.jsonl")
+    assert export_json(snapshot_file, out_file) == len(FULL_BOOKS)
+    assert list(iter_books(out_file)) == FULL_BOOKS
+
+
+def test_json_round_trip_unknown_stock(tmp_path):
+    """A lazy crawl's None stock comes back as None through json, a
+    snapshot and json again, not as a failed -1"""
+    books = [dict(book) for book in FULL_BOOKS[:20]]
+    for book in books[::3]:
+        book.update(stock=None, stock_checked=0)
+
+    jsonl_file = str(tmp_path / "books.jsonl")
+    with JsonLinesWriter(jsonl_file, mode="w") as writer:
+        for book in books:
+            writer.write(book)
+
+    snapshot_file = str(tmp_path / "books.bin")
+    out_file = str(tmp_path / "out.jsonl")
+    import_json(jsonl_file, snapshot_file)
+    export_json(snapshot_file, out_file)
+
+    assert list(iter_books(out_file)) == books
+
+
+@pytest.mark.parametrize("field, reverse", [("price", False), ("rating", True),
+                                            ("stock", True)])
+def test_top_matches_index(tmp_path, field, reverse):
+    """Top-k from the mapped columns matches BookIndex"""
+    snapshot_file = str(tmp_path / "books.bin")
+    write_snapshot_file(snapshot_file, FULL_BOOKS)
+
+    index = BookIndex(FULL_BOOKS)
+    where = lambda book: book["stock"] > 10
+
+    with SnapshotFile(snapshot_file) as snapshot:
+        for amount in (0, 1, 10, 500):
+            assert snapshot.top(field, amount, reverse) == \
+                index.top(field, amount, reverse)
+            assert snapshot.top(field, amount, reverse, where) == \
+                index.top(field, amount, reverse, where)
+
+
+def test_unknown_stock(tmp_path):
+    """A None stock or rating reads back as None, apart from a failed
+    stock of -1, and is ordered last like BookIndex"""
+    books = [dict(book) for book in FULL_BOOKS[:30]]
+    books[0].update(stock=None, stock_checked=0)
+    books[1].update(stock=-1, stock_checked=0)
+    books[2]["rating"] = None
+
+    snapshot_file = str(tmp_path / "books.bin")
+    write_snapshot_file(snapshot_file, books)
+
+    with SnapshotFile(snapshot_file) as snapshot:
+        assert list(snapshot) == books
+        assert snapshot.top("stock", 30, True)[-1] == books[0]
+        assert snapshot.top("stock", 30) == BookIndex(books).top("stock", 30)
+
+
+def test_bad_files(tmp_path):
+    """Corrupt or foreign files are refused"""
+    snapshot_file = str(tmp_path / "books.bin")
+    write_snapshot_file(snapshot_file, FULL_BOOKS)
+
+    with open(snapshot_file, "r+b") as b_file:
+        b_file.seek(-1, os.SEEK_END)
+        b_file.write(b"?")
+
+    with pytest.raises(SnapshotFileError):
+        SnapshotFile(snapshot_file, verify=True)
+    with pytest.raises(SnapshotFileError):
+        export_json(snapshot_file, str(tmp_path / "out.jsonl"))
+
+    # not checked by default, opens without reading the body
+    SnapshotFile(snapshot_file).close()
+
+    other = tmp_path / "books.jsonl"
+    other.write_text('{"title": "Book 0"}\n' * 10)
+    with pytest.raises(SnapshotFileError):
+        SnapshotFile(str(other))
+
+
+#-----------------------------------------------
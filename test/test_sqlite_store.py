@@ -0,0 +1,87 @@
+"""Testing sqlite storage of books
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import pytest
+from queries import BookIndex
+from storage import SqliteStore
+from test.test_book_index import BOOKS
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+def _fields(books: list) -> list:
+    return [(b["title"], b["price"], b["stock"], b["rating"]) for b in books]
+
+
+@pytest.mark.parametrize("field, reverse", [("price", False), ("price", True),
+                                            ("rating", True), ("stock", True)])
+def test_top_matches_index(tmp_path, field, reverse):
+    """Pushed down top-k gives the same books, in the same order, as
+    BookIndex"""
+    index = BookIndex(BOOKS)
+    where = lambda book: book["rating"] >= 3
+
+    with SqliteStore(str(tmp_path / "books.db")) as store:
+        store.save(iter(BOOKS))
+
+        for amount in (0, 1, 10, 500):
+            assert _fields(store.top(field, amount, reverse)) == \
+                _fields(index.top(field, amount, reverse))
+            assert _fields(store.top(field, amount, reverse, where)) == \
+                _fields(index.top(field, amount, reverse, where))
+
+        with pytest.raises(IndexError):
+            store.top(field, -1)
+
+
+@pytest.mark.parametrize("field", ["price", "rating", "stock"])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_missing_fields_last(tmp_path, field, reverse):
+    """Books without the field are last, the same as in BookIndex"""
+    books = [dict(book) for book in BOOKS[:40]]
+    for book in books[::6]:
+        book[field] = None
+
+    with SqliteStore(str(tmp_path / "books.db")) as store:
+        store.save(iter(books))
+
+        assert _fields(store.top(field, 40, reverse)) == \
+            _fields(BookIndex(books).top(field, 40, reverse))
+        assert store.top(field, 40, reverse)[-1][field] is None
+
+
+def test_crawls_and_search(tmp_path):
+    """Every save is its own crawl, a failed save is rolled back"""
+    with SqliteStore(str(tmp_path / "books.db")) as store:
+        assert len(store) == 0
+
+        first = store.save(BOOKS)
+        second = store.save(BOOKS[:10])
+
+        def failing():
+            yield BOOKS[0]
+            raise RuntimeError("CRAWL FAILED")
+
+        with pytest.raises(RuntimeError):
+            store.save(failing())
+
+        assert [crawl[0] for crawl in store.crawls()] == [first, second]
+        assert [crawl[3] for crawl in store.crawls()] == [len(BOOKS), 10]
+        assert len(store) == 10
+        assert _fields(store.iter_books(first)) == _fields(BOOKS)
+
+        assert [b["title"] for b in store.search('"Book 7"')] == ["Book 7"]
+
+        store.drop_crawl(second)
+        assert len(store) == len(BOOKS)
+        assert [b["title"] for b in store.search('"Book 7"')] == ["Book 7"]
+
+
+#-----------------------------------------------
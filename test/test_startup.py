@@ -0,0 +1,51 @@
+"""Testing main.py starts without the scraping stack, how long it takes
+is in test_benchmarks
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import subprocess
+
+#-----------------------------------------------
+# -- GLOBALS --
+
+ROOT = os.path.abspath(f"{__file__}/../..")
+
+# modules only a scrape or a numpy table needs
+HEAVY = ("pages", "parsers", "locators", "requests", "aiohttp", "bs4",
+         "lxml", "selectolax", "numpy")
+
+#-----------------------------------------------
+# -- HELPERS --
+
+
+def import_times() -> dict:
+    """Cumulative microseconds of each module imported by 'import main',
+    read from python -X importtime"""
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                          "import main"],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+
+    times = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+def test_offline_imports():
+    """Nothing of the scraping stack is imported by main"""
+    loaded = {name.split(".")[0] for name in import_times()}
+
+    assert not loaded & set(HEAVY)
@@ -0,0 +1,139 @@
+"""Testing lazy stock, crawls without detail pages and resolving the stock
+of only the books a query returns
+"""
+#-----------------------------------------------
+# -- IMPORTS --
+
+import sys
+import os
+sys.path.append(os.path.abspath(f"{__file__}/../.."))  # help with imports
+
+import time
+import pytest
+import main
+from pages import get_all_pages_books
+from pages import crawl_all_pages_books
+from pages import get_all_pages_books_pipelined
+from pages import Fetcher
+from pages import StockResolver
+from queries import BookIndex
+from test.test_crawl import serve
+from test.test_crawl import detail_requests
+
+#-----------------------------------------------
+# -- HELPERS --
+
+
+@pytest.fixture
+def site():
+    yield from serve(pages=5, per_page=20)
+
+
+#-----------------------------------------------
+# -- TESTING --
+
+
+@pytest.mark.parametrize("engine", ["sync", "async", "pipeline"])
+def test_lazy_crawl(site, engine):
+    """No detail page is fetched, every stock is left unknown"""
+    if engine == "sync":
+        with Fetcher(workers=8) as fetcher:
+            books = list(get_all_pages_books(fetcher=fetcher, lazy_stock=True))
+    elif engine == "async":
+        books = list(crawl_all_pages_books(lazy_stock=True))
+    else:
+        books = list(get_all_pages_books_pipelined(parse_workers=2,
+                                                   lazy_stock=True))
+
+    assert [book.link for book in books] == [book["link"] for book in site.records()]
+    assert {(book.stock, book.stock_checked) for book in books} == {(None, 0)}
+    assert detail_requests(site) == 0
+
+
+def test_scrape_then_cheapest(site, tmp_path, monkeypatch):
+    """Listing pages plus the ten books shown, instead of every book"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+
+    books = main.scrape_books(lazy_stock=True)
+    stocks = {book["link"]: book["stock"] for book in site.records()}
+
+    with StockResolver() as resolver:
+        cheapest = main.resolve_query(main.get_cheepest_books, books, 10,
+                                      resolver)
+
+        assert sum(site.requests.values()) == 5 + 10
+        assert [book["stock"] for book in cheapest] == [stocks[book["link"]]
+                                                       for book in cheapest]
+
+        # asked again the stock is remembered
+        main.resolve_query(main.get_cheepest_books, books, 10, resolver)
+        assert sum(site.requests.values()) == 5 + 10
+
+        # ordering by stock needs every stock, only the other 90 are fetched
+        most = main.resolve_query(main.get_most_stocked_books, books, 10,
+                                  resolver)
+        assert detail_requests(site) == 100
+        assert [book["stock"] for book in most] == sorted(stocks.values(),
+                                                          reverse=True)[:10]
+
+        # the resolved index is kept, asking again builds nothing
+        every = resolver.resolve_every(books, BookIndex)
+        assert resolver.resolve_every(books, BookIndex) is every
+        assert main.resolve_query(main.get_most_stocked_books, books, 10,
+                                  resolver) == most
+        assert detail_requests(site) == 100
+
+
+def test_resolve_every_ttl(site):
+    """Every book is resolved again once the oldest stock is too old"""
+    books = [dict(book, stock=None, stock_checked=0) for book in site.records()[:4]]
+
+    with StockResolver(ttl=60) as resolver:
+        every = resolver.resolve_every(books)
+        assert [book["stock"] for book in every] == [
+            book["stock"] for book in site.records()[:4]]
+        assert books[0]["stock"] is None
+
+        assert resolver.resolve_every(books) is every
+        assert resolver.resolve_every(list(books)) is not every
+
+        later = resolver.resolve_every(books, now=time.time() + 61)
+        assert later is not every
+        assert detail_requests(site) == 8
+
+
+def test_resolver_ttl(site):
+    """Stock older then ttl is fetched again, each link only once"""
+    books = [dict(book, stock=0, stock_checked=0) for book in site.records()[:3]]
+
+    with StockResolver(ttl=60) as resolver:
+        resolver.resolve(books + [dict(books[0])])
+        assert detail_requests(site) == 3
+        assert resolver.fetched == 3
+
+        resolver.resolve([dict(book, stock_checked=0) for book in books])
+        assert detail_requests(site) == 3
+        assert resolver.hits == 3
+
+        resolver.resolve(books, now=time.time() + 61)
+        assert detail_requests(site) == 6
+
+
+def test_resolver_legacy_books(site):
+    """Legacy json books have no stock_checked, and some no link. Those
+    without a link are passed through, the rest are resolved"""
+    record = site.records()[0]
+    unlinked = dict(title="Frankenstein", price=38.0, stock=1, rating=2)
+    linked = {key: value for key, value in record.items()}
+    linked["stock"] = 0
+
+    with StockResolver() as resolver:
+        books = resolver.resolve([dict(unlinked), linked])
+
+    assert books[0] == unlinked
+    assert books[1]["stock"] == record["stock"]
+    assert detail_requests(site) == 1
+
+
+#-----------------------------------------------